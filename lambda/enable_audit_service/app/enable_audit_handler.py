@@ -4,7 +4,7 @@ Ingress Lambda. Entry point to the RDS Audit Log Enable API
 import os
 import sys
 import json
-import boto3
+import time
 from datetime import datetime, timedelta
 
 from botocore.exceptions import ClientError
@@ -16,11 +16,12 @@ sys.path.append(THIS_DIR)
 sys.path.append(API_DIR)
 sys.path.append(UTIL_DIR)
 
-from client_utilities import ClientUtilities
+from client_utilities import ClientUtilities, LazyClient, client_pool
 from auth_utilities import auth, Logger
-from rds_utilities import set_log_types_db_instance
+from rds_utilities import set_log_types_db_instance, clear_group_name_index
 from aurora_utilities import set_log_types_db_cluster
 from exceptions import InvalidInputError, InvalidDataOrConfigurationError, FailedAuditLogEnableError
+from sync_status import VALIDATION_WAIT_MODE, initial_poll_state
 
 
 def handler(event, context):
@@ -98,6 +99,8 @@ def entry_point(event):
         status_code
     """
     logger.info('Entering entry_point()')
+    # Groups found in an earlier warm invocation may have been deleted since
+    clear_group_name_index()
 
     # Extract body for POST request
     body = json.loads(event.get('body'))
@@ -119,11 +122,16 @@ def entry_point(event):
 
     # RDS and IAM resources will be created in the accounts
     target_client = ClientUtilities()
+    start = time.perf_counter()
     rds_client = target_client.boto3_client(account_id, 'rds', region)  # Target account client
-    iam_client = target_client.boto3_client(account_id, 'iam', region)
-    lambda_client = boto3_client('lambda', region)
-    sfn_client = boto3_client( 'stepfunctions', region)
-    sm_client = target_client.boto3_client(account_id, 'secretsmanager', region)
+    rds_setup_seconds = time.perf_counter() - start
+
+    # Remaining clients are only built if the engine path needs them: IAM for SQL Server, Lambda for Oracle and
+    # Secrets Manager for non-Aurora instances
+    iam_client = LazyClient('iam', lambda: target_client.boto3_client(account_id, 'iam', region))
+    lambda_client = LazyClient('lambda', lambda: boto3_client('lambda', region))
+    sfn_client = LazyClient('stepfunctions', lambda: boto3_client('stepfunctions', region))
+    sm_client = LazyClient('secretsmanager', lambda: target_client.boto3_client(account_id, 'secretsmanager', region))
 
     if db_type == 'cluster':
         logger.info('In db_type == "cluster"')
@@ -193,14 +201,18 @@ def entry_point(event):
     else:
         raise InvalidDataOrConfigurationError('Unknown incoming event. Not cluster or instance')
 
+    log_client_setup(rds_setup_seconds, [iam_client, lambda_client, sm_client])
     logger.info(f"db_type={db_type}, db_identifier={db_identifier}, db_apply_immediate={db_apply_immediate}")
 
     if db_apply_immediate:
         # wait to allow DB to apply mods from above. If DB still locked then backoff/retry used to wait
         wait_till_seconds = 300
+        # poll: the state machine validates as soon as the DB status shows the mods applied
+        wait_mode = VALIDATION_WAIT_MODE
     else:
         # wait based on DB specific scheduled maintenance window
         wait_till_seconds = get_time_in_seconds_till_next_scheduled_window(db_maint_window)
+        wait_mode = 'fixed'
 
     # If status=success start step fn validation else return err
     status = rsp_audit_status.get('status')
@@ -212,7 +224,8 @@ def entry_point(event):
             logger.info(f'region for validation state machine - {region}')
             response = start_validation_step_function(db_identifier, db_type, region,
                                                       sfn_audit_log_validation_arn,
-                                                      sfn_client, wait_till_seconds, account_id, logger.get_uuid())
+                                                      sfn_client, wait_till_seconds, account_id, logger.get_uuid(),
+                                                      wait_mode)
             if 'executionArn' in response:
                 sfn_execution_arn = response.get('executionArn')
                 logger.info(f'Step function started {sfn_execution_arn}')
@@ -226,11 +239,25 @@ def entry_point(event):
 
 
 def boto3_client(service, region):
-    client = boto3.client(
-        region_name=region,
-        service_name=service,
-    )
-    return client
+    return client_pool.get_client(None, service, region)
+
+
+def log_client_setup(rds_setup_seconds, lazy_clients):
+    """
+    Log client setup time spent and avoided by the engine path
+    Credentials are cached per account and the rds client has already assumed the role, so skipped clients save
+    client construction time only
+    @param rds_setup_seconds: time taken to build the rds client
+    @param lazy_clients: LazyClient instances handed to the engine path
+    @return:
+    """
+    created = [client for client in lazy_clients if client.created]
+    skipped = [client for client in lazy_clients if not client.created]
+    setup_seconds = rds_setup_seconds + sum(client.setup_seconds for client in created)
+    avg_setup_seconds = setup_seconds / (len(created) + 1)
+    logger.info(f'Client setup: created={["rds"] + [client.name for client in created]}, '
+                f'skipped={[client.name for client in skipped]}, setup_ms={round(setup_seconds * 1000)}, '
+                f'avoided_setup_ms~={round(avg_setup_seconds * len(skipped) * 1000)}')
 
 
 def enable_instance_audit_log(db_apply_immediate, db_instance, db_instance_identifier, db_password, db_user,
@@ -285,7 +312,7 @@ def enable_aurora_audit_log(db_apply_immediate, db_cluster, rds_client):
 
 
 def start_validation_step_function(db_identifier, db_type, region, sfn_audit_log_validation_arn, sfn_client,
-                                   wait_till_seconds, account_id, logger_uuid):
+                                   wait_till_seconds, account_id, logger_uuid, wait_mode='fixed'):
     """
     Function triggers step function execution
     @param db_identifier:
@@ -296,6 +323,7 @@ def start_validation_step_function(db_identifier, db_type, region, sfn_audit_log
     @param wait_till_seconds:
     @param account_id:
     @param logger_uuid:
+    @param wait_mode: 'poll' to validate once the DB is in sync, 'fixed' to wait wait_till_seconds
     @return:
     """
     try:
@@ -307,7 +335,9 @@ def start_validation_step_function(db_identifier, db_type, region, sfn_audit_log
                 "wait_till_seconds": wait_till_seconds,  # 60s for immediate or custom for scheduled
                 "db_region": region,
                 "db_account_id": account_id,
-                "logger_uuid": logger_uuid
+                "logger_uuid": logger_uuid,
+                "wait_mode": wait_mode,
+                "sync": initial_poll_state()
             })
         )
     except sfn_client.exceptions.InvalidArn as err:
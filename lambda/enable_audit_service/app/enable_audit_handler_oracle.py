@@ -2,7 +2,6 @@ import cx_Oracle
 import os
 import sys
 import json
-import jinja2
 
 THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # app/
 API_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../'))  # lambda/
@@ -11,6 +10,8 @@ sys.path.append(THIS_DIR)
 sys.path.append(API_DIR)
 sys.path.append(UTIL_DIR)
 from auth_utilities import Logger
+import sql_templates
+from oracle_utilities import split_statements, pending_statements, run_statements
 
 
 def handler(event, context):
@@ -42,7 +43,7 @@ def handler(event, context):
 #
 def render_sql(logger, sql_file, engine_type, kwargs=None):
     """
-    Renders the sql file located in the path ./sql/<engine>/<sql_file>
+    Renders the sql file located in the path ./sql/<engine>/<sql_file> using the compiled template cache
 
     Args
         sql_file (str): The sql file name.
@@ -54,21 +55,7 @@ def render_sql(logger, sql_file, engine_type, kwargs=None):
         statement as a string otherwise.
     """
     logger.info('Entering render_sql()')
-
-    if not kwargs:
-        kwargs = {}
-    this_dir = os.path.dirname(__file__)
-    parent_dir = os.path.dirname(this_dir)  # Parent directory
-    try:
-        f = open(os.path.join(os.path.dirname(parent_dir), 'util', 'sql', engine_type, sql_file))
-    except Exception as err:    # pylint: disable=broad-except
-        print(f'render_sql() exception: {err}')
-        return ''
-
-    raw = f.read()
-    t = jinja2.Template(raw)
-    result = t.render(**kwargs)
-
+    result = sql_templates.render_sql(logger, sql_file, engine_type, kwargs)
     logger.info('Exiting render_sql()')
 
     return result
@@ -96,19 +83,21 @@ def oracle_server_run_sql_cmds(logger, host, user, pwd, db_name, db_engine_versi
         kwargs = {'VERSION': db_engine_version, 'MASTER_USERNAME': user}
         sql_query = render_sql(logger, 'set-audit-parameters.sql', 'oracle', kwargs=kwargs)
 
-        sql_statement_list = []
-        for sql in sql_query.split("\n"):
-            if sql:
-                sql_statement_list.append(sql)
+        # Statements already in effect are skipped after one read of the audit configuration
+        sql_statement_list = pending_statements(logger, csr, split_statements(sql_query))
 
-        for sql_statement in sql_statement_list:
-            try:
-                csr.execute(sql_statement)
-                print('set audit parameters for RDS Database {} for sql {}'.format(host, sql_statement))
-            except Exception as err:  # pylint: disable=broad-except
+        # Statements run in a few PL/SQL blocks, each statement's error is captured. The first error is raised once
+        # all statements have run
+        errors = []
+        for sql_statement, err in run_statements(logger, csr, sql_statement_list):
+            if err:
                 print(
                     f'Error while setting audit parameters for RDS Database={host}, SQL={sql_statement}. Details={err}')
-                raise Exception(str(err))
+                errors.append(err)
+            else:
+                print('set audit parameters for RDS Database {} for sql {}'.format(host, sql_statement))
+        if errors:
+            raise Exception(str(errors[0]))
 
     except Exception as err:
         logger.error(f"connecting {host}:{port} exception: {err}")
@@ -0,0 +1,106 @@
+"""
+Unit tests for Aurora cluster member handling
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import os
+import sys
+import threading
+import logging
+import unittest
+from unittest.mock import Mock
+
+from botocore.exceptions import ClientError
+from nose.tools import assert_equal
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+import aurora_utilities
+import engine_capabilities
+from concurrency_utilities import run_concurrently
+
+logger = logging.getLogger()
+
+
+class TestClusterMembers(unittest.TestCase):
+
+    def test_members_read_with_one_filtered_describe(self):
+        rds_client = Mock()
+        rds_client.get_paginator.return_value.paginate.return_value = [
+            {'DBInstances': [{'DBInstanceIdentifier': 'writer'}, {'DBInstanceIdentifier': 'reader-1'}]},
+            {'DBInstances': [{'DBInstanceIdentifier': 'reader-2'}]},
+        ]
+        db_cluster = {'DBClusterIdentifier': 'orders', 'DBClusterMembers': [{'DBInstanceIdentifier': 'writer'}]}
+        members = aurora_utilities.describe_cluster_members(rds_client, db_cluster)
+        assert_equal([member['DBInstanceIdentifier'] for member in members], ['writer', 'reader-1', 'reader-2'])
+        rds_client.get_paginator.assert_called_once_with('describe_db_instances')
+        rds_client.get_paginator.return_value.paginate.assert_called_once_with(
+            Filters=[{'Name': 'db-cluster-id', 'Values': ['orders']}])
+        rds_client.describe_db_instances.assert_not_called()
+
+    def test_serverless_cluster_not_described(self):
+        rds_client = Mock()
+        assert_equal(aurora_utilities.describe_cluster_members(
+            rds_client, {'DBClusterIdentifier': 'orders', 'DBClusterMembers': []}), [])
+        rds_client.get_paginator.assert_not_called()
+
+
+class TestSharedMemberParameterGroup(unittest.TestCase):
+
+    def setUp(self):
+        engine_capabilities.clear_capabilities()
+
+    def test_shared_group_created_once_and_attached_to_members(self):
+        rds_client = Mock()
+        rds_client.meta.region_name = 'us-east-1'
+        rds_client.get_paginator.return_value.paginate.side_effect = [
+            [{'DBInstances': [{'DBInstanceIdentifier': name,
+                               'DBParameterGroups': [{'DBParameterGroupName': 'default.aurora-mysql5.7'}]}
+                              for name in ('writer', 'reader-1', 'reader-2')]}],
+            [{'DBEngineVersions': [{'EngineVersion': '5.7.mysql_aurora.2.11.2',
+                                    'DBParameterGroupFamily': 'aurora-mysql5.7'}]}],
+        ]
+        rds_client.describe_db_parameter_groups.side_effect = ClientError(
+            {'Error': {'Code': 'DBParameterGroupNotFound', 'Message': 'not found'}}, 'DescribeDBParameterGroups')
+        db_cluster = {'DBClusterIdentifier': 'orders', 'EngineVersion': '5.7.mysql_aurora.2.11.2',
+                      'DBClusterMembers': [{'DBInstanceIdentifier': 'writer'}]}
+
+        db_cluster_instances = aurora_utilities.describe_cluster_members(rds_client, db_cluster)
+        aurora_utilities.shared_member_parameter_group_changes(logger, rds_client, db_cluster, db_cluster_instances,
+                                                               'aurora-mysql', '5', '7', True)
+
+        rds_client.create_db_parameter_group.assert_called_once()
+        assert_equal(rds_client.create_db_parameter_group.call_args[1]['DBParameterGroupName'],
+                     'orders-aurora-mysql-5-7-members')
+        assert_equal(rds_client.create_db_parameter_group.call_args[1]['DBParameterGroupFamily'], 'aurora-mysql5.7')
+        rds_client.modify_db_parameter_group.assert_called_once()
+        assert_equal(sorted(call[1]['DBInstanceIdentifier'] for call in rds_client.modify_db_instance.call_args_list),
+                     ['reader-1', 'reader-2', 'writer'])
+        for call in rds_client.modify_db_instance.call_args_list:
+            assert_equal(call[1]['DBParameterGroupName'], 'orders-aurora-mysql-5-7-members')
+
+
+class TestRunConcurrently(unittest.TestCase):
+
+    def test_results_in_item_order(self):
+        assert_equal(run_concurrently(lambda item: item * 2, [3, 1, 2], max_workers=3), [6, 2, 4])
+
+    def test_workers_run_in_parallel(self):
+        barrier = threading.Barrier(3, timeout=5)
+        assert_equal(run_concurrently(lambda item: barrier.wait() is not None, range(3), max_workers=3),
+                     [True, True, True])
+
+    def test_first_error_raised_after_all_calls(self):
+        calls = []
+
+        def work(item):
+            calls.append(item)
+            if item == 'b':
+                raise ValueError(item)
+            return item
+
+        with self.assertRaises(ValueError):
+            run_concurrently(work, ['a', 'b', 'c'], max_workers=2)
+        assert_equal(sorted(calls), ['a', 'b', 'c'])
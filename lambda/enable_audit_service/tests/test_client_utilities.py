@@ -0,0 +1,137 @@
+"""
+Unit tests for client utilities
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring, protected-access
+
+import os
+import sys
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+from nose.tools import assert_equal, assert_true, assert_false
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+from client_utilities import ClientUtilities, ClientPool, LazyClient, credentials_expiring, clear_credentials_cache
+
+
+def mock_credentials(expires_in):
+    return {
+        'AccessKeyId': 'AKIAMOCK',
+        'SecretAccessKey': 'mock',
+        'SessionToken': 'mock',
+        'Expiration': datetime.now(timezone.utc) + expires_in
+    }
+
+
+class TestCredentialCache(unittest.TestCase):
+
+    def setUp(self):
+        clear_credentials_cache()
+
+    @patch.object(ClientUtilities, 'assume_role')
+    def test_credentials_reused_across_clients(self, mock_assume_role):
+        mock_assume_role.return_value = mock_credentials(timedelta(hours=1))
+        target_client = ClientUtilities()
+        target_client.get_credentials_for_account('111111111111')
+        ClientUtilities().get_credentials_for_account('111111111111')
+        assert_equal(mock_assume_role.call_count, 1)
+
+    @patch.object(ClientUtilities, 'assume_role')
+    def test_credentials_refreshed_before_expiry(self, mock_assume_role):
+        mock_assume_role.side_effect = [mock_credentials(timedelta(minutes=2)), mock_credentials(timedelta(hours=1))]
+        target_client = ClientUtilities()
+        target_client.get_credentials_for_account('111111111111')
+        target_client.get_credentials_for_account('111111111111')
+        assert_equal(mock_assume_role.call_count, 2)
+
+    def test_credentials_expiring(self):
+        assert_true(credentials_expiring(mock_credentials(timedelta(minutes=1))))
+        assert_false(credentials_expiring(mock_credentials(timedelta(minutes=30))))
+        assert_true(credentials_expiring({}))
+
+
+class TestClientPool(unittest.TestCase):
+
+    def test_client_reused_for_same_key(self):
+        pool = ClientPool(max_size=4)
+        credentials = mock_credentials(timedelta(hours=1))
+        first = pool.get_client('111111111111', 'rds', 'us-east-1', credentials)
+        second = pool.get_client('111111111111', 'rds', 'us-east-1', credentials)
+        assert_true(first is second)
+        assert_equal(pool.stats()['hits'], 1)
+        assert_equal(pool.stats()['misses'], 1)
+
+    def test_client_rebuilt_after_credentials_refresh(self):
+        pool = ClientPool(max_size=4)
+        first = pool.get_client('111111111111', 'rds', 'us-east-1', mock_credentials(timedelta(hours=1)))
+        refreshed = dict(mock_credentials(timedelta(hours=1)), AccessKeyId='AKIAREFRESHED')
+        second = pool.get_client('111111111111', 'rds', 'us-east-1', refreshed)
+        assert_false(first is second)
+        assert_equal(pool.stats()['misses'], 2)
+
+    def test_least_recently_used_client_evicted(self):
+        pool = ClientPool(max_size=2)
+        credentials = mock_credentials(timedelta(hours=1))
+        pool.get_client('111111111111', 'rds', 'us-east-1', credentials)
+        pool.get_client('111111111111', 'iam', 'us-east-1', credentials)
+        pool.get_client('111111111111', 'rds', 'us-east-1', credentials)
+        pool.get_client('111111111111', 'secretsmanager', 'us-east-1', credentials)
+        pool.get_client('111111111111', 'rds', 'us-east-1', credentials)
+        assert_equal(pool.stats()['size'], 2)
+        assert_equal(pool.stats()['evictions'], 1)
+        assert_equal(pool.stats()['hits'], 2)
+
+    def test_clients_for_different_keys_built_concurrently(self):
+        pool = ClientPool(max_size=4)
+        # Each build waits for the other one, so the barrier breaks if builds are serialized
+        barrier = threading.Barrier(2, timeout=5)
+
+        def build_client(service_name, region_name):
+            barrier.wait()
+            return Mock(name=f'{service_name}-{region_name}')
+
+        def new_session(_credentials):
+            return Mock(**{'client.side_effect': build_client})
+
+        clients = {}
+        errors = []
+
+        def get_client(service):
+            try:
+                clients[service] = pool.get_client('111111111111', service, 'us-east-1')
+            except Exception as err:  # pylint: disable=broad-except
+                errors.append(err)
+
+        with patch.object(pool, '_new_session', side_effect=new_session):
+            threads = [threading.Thread(target=get_client, args=(service,)) for service in ['rds', 'iam']]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert_equal(errors, [])
+        assert_equal(sorted(clients), ['iam', 'rds'])
+        assert_equal(pool.stats()['misses'], 2)
+        assert_true(pool.get_client('111111111111', 'rds', 'us-east-1') is clients['rds'])
+
+
+class TestLazyClient(unittest.TestCase):
+
+    def test_client_built_on_first_use_only(self):
+        factory = Mock()
+        lazy_client = LazyClient('iam', factory)
+        assert_false(lazy_client.created)
+        lazy_client.get_role(RoleName='mock')
+        lazy_client.get_role(RoleName='mock')
+        assert_true(lazy_client.created)
+        assert_equal(factory.call_count, 1)
+        assert_equal(factory.return_value.get_role.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Unit tests for the engine capability cache
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import logging
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from botocore.exceptions import ClientError
+from nose.tools import assert_equal, assert_true, assert_is_none
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+import engine_capabilities
+
+logger = logging.getLogger()
+
+
+def rds_client_for(region, engine_versions):
+    rds_client = Mock()
+    rds_client.meta.region_name = region
+    rds_client.get_paginator.return_value.paginate.return_value = [{'DBEngineVersions': engine_versions}]
+    return rds_client
+
+
+MYSQL_VERSIONS = [
+    {'EngineVersion': '8.0.28', 'DBParameterGroupFamily': 'mysql8.0', 'MajorEngineVersion': '8.0',
+     'ExportableLogTypes': ['audit', 'error', 'general', 'slowquery'], 'SupportsLogExportsToCloudwatchLogs': True},
+    {'EngineVersion': '5.7.38', 'DBParameterGroupFamily': 'mysql5.7', 'MajorEngineVersion': '5.7',
+     'ExportableLogTypes': ['error', 'general', 'slowquery'], 'SupportsLogExportsToCloudwatchLogs': True},
+]
+
+
+class TestEngineCapabilities(unittest.TestCase):
+
+    def setUp(self):
+        engine_capabilities.clear_capabilities()
+
+    def test_versions_compare_numerically(self):
+        assert_true(engine_capabilities.version_tuple('8.0.9') < engine_capabilities.version_tuple('8.0.25'))
+        assert_equal(engine_capabilities.version_tuple('15.00.4043.16.v1'), (15, 0, 4043, 16))
+
+    def test_engine_loaded_once_per_region(self):
+        rds_client = rds_client_for('us-east-1', MYSQL_VERSIONS)
+        assert_equal(engine_capabilities.parameter_group_family(logger, rds_client, 'mysql', '8.0.28'), 'mysql8.0')
+        assert_equal(engine_capabilities.parameter_group_family(logger, rds_client, 'mysql', '5.7.38'), 'mysql5.7')
+        rds_client.get_paginator.return_value.paginate.assert_called_once_with(Engine='mysql', IncludeAll=True)
+
+        other_region = rds_client_for('eu-west-1', MYSQL_VERSIONS)
+        engine_capabilities.parameter_group_family(logger, other_region, 'mysql', '8.0.28')
+        other_region.get_paginator.return_value.paginate.assert_called_once()
+
+    def test_log_types_filtered_by_exportable(self):
+        rds_client = rds_client_for('us-east-1', MYSQL_VERSIONS)
+        assert_equal(engine_capabilities.resolve_log_types(logger, rds_client, 'mysql', '8.0.28', ['audit']), ['audit'])
+        assert_equal(engine_capabilities.resolve_log_types(logger, rds_client, 'mysql', '5.7.38', ['audit']), [])
+
+    def test_unknown_version_falls_back(self):
+        rds_client = rds_client_for('us-east-1', MYSQL_VERSIONS)
+        assert_is_none(engine_capabilities.parameter_group_family(logger, rds_client, 'mysql', '8.0.11'))
+        assert_equal(engine_capabilities.resolve_log_types(logger, rds_client, 'mysql', '8.0.11', ['audit']), ['audit'])
+
+    def test_describe_failure_cached_until_ttl(self):
+        rds_client = rds_client_for('us-east-1', MYSQL_VERSIONS)
+        rds_client.get_paginator.return_value.paginate.side_effect = [
+            ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'denied'}}, 'DescribeDBEngineVersions'),
+            [{'DBEngineVersions': MYSQL_VERSIONS}],
+        ]
+        with patch.object(engine_capabilities.time, 'monotonic', return_value=1000.0) as monotonic:
+            assert_is_none(engine_capabilities.parameter_group_family(logger, rds_client, 'mysql', '8.0.28'))
+            assert_is_none(engine_capabilities.parameter_group_family(logger, rds_client, 'mysql', '8.0.28'))
+            assert_equal(rds_client.get_paginator.return_value.paginate.call_count, 1)
+
+            monotonic.return_value += engine_capabilities.CAPABILITY_FAILURE_TTL_SECONDS + 1
+            assert_equal(engine_capabilities.parameter_group_family(logger, rds_client, 'mysql', '8.0.28'),
+                         'mysql8.0')
+        assert_equal(rds_client.get_paginator.return_value.paginate.call_count, 2)
+
+    def test_engines_loaded_concurrently(self):
+        # Each load waits for the other one, so the barrier breaks if loads are serialized
+        barrier = threading.Barrier(2, timeout=5)
+
+        def paginate(**_kwargs):
+            barrier.wait()
+            return [{'DBEngineVersions': MYSQL_VERSIONS}]
+
+        rds_client = rds_client_for('us-east-1', MYSQL_VERSIONS)
+        rds_client.get_paginator.return_value.paginate.side_effect = paginate
+        families = {}
+        threads = [threading.Thread(target=lambda engine=engine: families.update(
+            {engine: engine_capabilities.parameter_group_family(logger, rds_client, engine, '8.0.28')}))
+            for engine in ('mysql', 'aurora-mysql')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert_equal(families, {'mysql': 'mysql8.0', 'aurora-mysql': 'mysql8.0'})
+
+    def test_unsupported_options(self):
+        rds_client = rds_client_for('us-east-1', [])
+        rds_client.get_paginator.return_value.paginate.return_value = [
+            {'OptionGroupOptions': [{'Name': 'MARIADB_AUDIT_PLUGIN'}, {'Name': 'MEMCACHED'}]}]
+        assert_equal(engine_capabilities.unsupported_options(logger, rds_client, 'mysql', '8.0',
+                                                             ['MARIADB_AUDIT_PLUGIN']), [])
+        assert_equal(engine_capabilities.unsupported_options(logger, rds_client, 'mysql', '8.0',
+                                                             ['MARIADB_AUDIT_PLUGIN', 'SQLSERVER_AUDIT']),
+                     ['SQLSERVER_AUDIT'])
+        rds_client.get_paginator.assert_called_once_with('describe_option_group_options')
+        rds_client.get_paginator.return_value.paginate.assert_called_once_with(EngineName='mysql',
+                                                                               MajorEngineVersion='8.0')
+
+    def test_options_unknown_when_describe_fails(self):
+        rds_client = rds_client_for('us-east-1', [])
+        rds_client.get_paginator.return_value.paginate.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDenied', 'Message': 'denied'}}, 'DescribeOptionGroupOptions')
+        assert_equal(engine_capabilities.unsupported_options(logger, rds_client, 'mysql', '8.0',
+                                                             ['MARIADB_AUDIT_PLUGIN']), [])
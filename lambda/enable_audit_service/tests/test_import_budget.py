@@ -0,0 +1,83 @@
+"""
+Cold start import budget for each Lambda handler entry point
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from nose.tools import assert_equal, assert_true, assert_false
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+ROOT_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../../'))  # repository root, same layout as the image
+
+DB_DRIVERS = ['cx_Oracle', 'pyodbc', 'psycopg2']
+# Loaded by sql_templates on first render, never at handler import
+TEMPLATE_ENGINE = 'jinja2'
+
+# handler module: (import budget in ms, DB drivers the handler is allowed to load at import)
+HANDLER_IMPORT_BUDGETS = {
+    'lambda.enable_audit_service.app.enable_audit_handler': (1500, []),
+    'lambda.enable_audit_service.app.enable_audit_handler_oracle': (1500, ['cx_Oracle']),
+    'lambda.validate_audit_log_settings.app.validate_audit_log_settings_handler': (1000, []),
+    'lambda.validate_audit_log_settings.app.sync_status_handler': (1000, []),
+    'lambda.validate_audit_log_settings.app.fleet_scan_handler': (1000, []),
+    'lambda.event_bridge.app.event_bridge_lambda': (1000, []),
+}
+
+# DB drivers are replaced by empty stub modules that record being imported, so the result depends on what the handler
+# imports and not on which drivers are installed
+MEASURE_IMPORT = '''
+import importlib, importlib.abc, importlib.util, json, sys, time, types
+from unittest.mock import MagicMock
+
+drivers = set(sys.argv[3:])
+imported = []
+
+class DriverStub(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def find_spec(self, name, path, target=None):
+        return importlib.util.spec_from_loader(name, self) if name in drivers else None
+
+    def create_module(self, spec):
+        module = types.ModuleType(spec.name)
+        module.__getattr__ = lambda attribute: MagicMock(name=spec.name + "." + attribute)
+        return module
+
+    def exec_module(self, module):
+        imported.append(module.__name__)
+
+sys.meta_path.insert(0, DriverStub())
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({"elapsed_ms": elapsed_ms, "drivers": imported, "template_engine": sys.argv[2] in sys.modules}))
+'''
+
+
+def measure_import(module):
+    """
+    Import module in a fresh interpreter, as a Lambda cold start would
+    @param module: handler module
+    @return: import time in ms, DB drivers imported and whether the template engine was loaded
+    """
+    output = subprocess.run([sys.executable, '-c', MEASURE_IMPORT, module, TEMPLATE_ENGINE, *DB_DRIVERS],
+                            cwd=ROOT_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestImportBudget(unittest.TestCase):
+
+    def test_handlers_within_import_budget(self):
+        for module, (budget_ms, allowed_drivers) in HANDLER_IMPORT_BUDGETS.items():
+            result = measure_import(module)
+            assert_equal([driver for driver in result['drivers'] if driver not in allowed_drivers], [])
+            assert_false(result['template_engine'], f'{module} loaded {TEMPLATE_ENGINE} at import')
+            assert_true(result['elapsed_ms'] <= budget_ms,
+                        f"{module} import took {result['elapsed_ms']:.0f}ms, budget is {budget_ms}ms")
+
+
+if __name__ == '__main__':
+    unittest.main()
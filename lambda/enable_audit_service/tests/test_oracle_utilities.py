@@ -0,0 +1,153 @@
+"""
+Unit tests for batched Oracle audit statement execution
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import os
+import sys
+import unittest
+from unittest.mock import Mock
+
+from nose.tools import assert_equal, assert_in
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+import sql_templates
+from oracle_utilities import split_statements, batch_block, run_statements, pending_statements, AUDIT_STATE_QUERY
+
+
+class FakeVar:
+
+    def __init__(self):
+        self.value = None
+
+    def getvalue(self):
+        return self.value
+
+
+class FakeCursor:
+    """
+    Records round trips and fails every statement containing FAIL
+    """
+
+    def __init__(self):
+        self.round_trips = 0
+
+    def var(self, *_):
+        return FakeVar()
+
+    def execute(self, sql, binds=None):
+        self.round_trips += 1
+        if binds is None:
+            if 'FAIL' in sql:
+                raise Exception('ORA-00942: table or view does not exist')
+            return
+        for line in sql.split('\n'):
+            if 'FAIL' in line:
+                binds[line.split(':')[1].split(' ')[0]].value = 'ORA-00942: table or view does not exist'
+
+
+def audit_statements():
+    kwargs = {'VERSION': '19.0.0.0.ru-2022-01.rur-2022-01.r1', 'MASTER_USERNAME': 'admin'}
+    return split_statements(sql_templates.render_sql(Mock(), 'set-audit-parameters.sql', 'oracle', kwargs))
+
+
+def audited_state(statements):
+    """
+    Audit state rows of an instance where every statement has run
+    """
+    rows = [('TABLESPACE', 'AUDIT_TBLSPACE', None, None, None), ('JOB', 'UNIFIED_AUDIT', None, None, None),
+            ('CLEANUP', 'STANDARD AUDIT TRAIL', None, None, None), ('CLEANUP', 'FGA AUDIT TRAIL', None, None, None)]
+    rows += [('TRAIL', trail, 'AUDIT_TBLSPACE', None, None)
+             for trail in ('STANDARD AUDIT TRAIL', 'FGA AUDIT TRAIL', 'UNIFIED AUDIT TRAIL')]
+    for statement in statements:
+        if statement.startswith('AUDIT '):
+            option, _, user = statement[len('AUDIT '):].upper().partition(' BY ')
+            rows.append(('OPTION', option, user or None, 'BY SESSION', 'BY SESSION'))
+    return rows
+
+
+class TestOracleUtilities(unittest.TestCase):
+
+    def test_audit_script_runs_in_a_few_round_trips(self):
+        statements = audit_statements()
+        csr = FakeCursor()
+        results = run_statements(Mock(), csr, statements, mode='batch', batch_size=30)
+        assert_equal(len(results), len(statements))
+        assert_equal(csr.round_trips, -(-len(statements) // 30))
+        assert_equal([error for _, error in results if error], [])
+
+    def test_statement_errors_are_captured(self):
+        statements = ['AUDIT CREATE SESSION', 'AUDIT FAIL', 'AUDIT CREATE USER']
+        results = run_statements(Mock(), FakeCursor(), statements, mode='batch')
+        assert_equal([error for _, error in results], [None, 'ORA-00942: table or view does not exist', None])
+        assert_equal(results, run_statements(Mock(), FakeCursor(), statements, mode='statement'))
+
+    def test_round_trips_logged_after_failed_block(self):
+        statements = [f'AUDIT OPTION {index}' for index in range(5)]
+        csr = FakeCursor()
+        execute = csr.execute
+
+        def execute_failing_second_block(sql, binds=None):
+            if binds is not None and 'OPTION 2' in sql:
+                csr.round_trips += 1
+                raise Exception('PLS-00103: Encountered the symbol')
+            execute(sql, binds)
+
+        csr.execute = execute_failing_second_block
+        logger = Mock()
+        results = run_statements(logger, csr, statements, mode='batch', batch_size=2)
+        assert_equal([error for _, error in results], [None] * 5)
+        assert_equal(csr.round_trips, 5)
+        logger.info.assert_called_with('Ran 5 Oracle statements in 5 round trips: 3 PL/SQL blocks and 2 statements '
+                                       'run one at a time after a block failed')
+
+    def test_quotes_are_escaped(self):
+        block = batch_block(["begin x(interval => ''DAY''); end;"])
+        assert_in("EXECUTE IMMEDIATE 'begin x(interval => ''''DAY''''); end;'", block)
+        assert_in(':e0 := SQLERRM', block)
+
+    def test_audited_instance_costs_one_read(self):
+        statements = audit_statements()
+        csr = Mock()
+        csr.fetchall.return_value = audited_state(statements)
+        assert_equal(pending_statements(Mock(), csr, statements), [])
+        csr.execute.assert_called_once_with(AUDIT_STATE_QUERY)
+
+    def test_only_missing_statements_are_issued(self):
+        statements = audit_statements()
+        csr = Mock()
+        csr.fetchall.return_value = [row for row in audited_state(statements)
+                                     if row[:3] not in (('OPTION', 'CREATE SESSION', None),
+                                                        ('OPTION', 'DELETE TABLE', 'ADMIN'),
+                                                        ('TRAIL', 'UNIFIED AUDIT TRAIL', 'AUDIT_TBLSPACE'))]
+        pending = pending_statements(Mock(), csr, statements)
+        assert_equal([statement[:40] for statement in pending],
+                     [statement[:40] for statement in statements
+                      if 'AUDIT_TRAIL_UNIFIED' in statement or 'ALTER_PARTITION_INTERVAL' in statement or
+                      statement in ('AUDIT CREATE SESSION', 'AUDIT DELETE TABLE BY admin')])
+        assert_equal(len(pending), 4)
+
+    def test_options_audited_whenever_successful_or_not_are_issued(self):
+        statements = audit_statements()
+        rows = audited_state(statements)
+        for index, row in enumerate(rows):
+            if row[:3] == ('OPTION', 'CREATE USER', None):
+                rows[index] = row[:3] + ('NOT SET', 'BY ACCESS')
+            elif row[:3] == ('OPTION', 'CREATE VIEW', None):
+                rows[index] = row[:3] + ('BY ACCESS', 'NOT SET')
+        csr = Mock()
+        csr.fetchall.return_value = rows
+        assert_equal(pending_statements(Mock(), csr, statements), ['AUDIT CREATE USER', 'AUDIT CREATE VIEW'])
+
+    def test_all_statements_kept_when_state_unreadable(self):
+        statements = audit_statements()
+        csr = Mock()
+        csr.execute.side_effect = Exception('ORA-00942: table or view does not exist')
+        assert_equal(pending_statements(Mock(), csr, statements), statements)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Unit tests for the Postgres extension rollout
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from nose.tools import assert_equal
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+import sql_templates
+from postgres_utilities import created_roles, created_extensions, missing_roles, list_databases, install_extensions
+
+
+def render(sql_file):
+    return sql_templates.render_sql(Mock(), sql_file, 'postgres')
+
+
+def database_connection(installed):
+    csr = Mock()
+    csr.fetchall.return_value = [(extension,) for extension in installed]
+    conn = Mock()
+    conn.cursor.return_value = csr
+    return conn
+
+
+class TestPostgresUtilities(unittest.TestCase):
+
+    def test_templates_are_parsed(self):
+        assert_equal(created_roles(render('create-role.sql')), ['rds_pgaudit'])
+        assert_equal(created_extensions(render('create-extension.sql')), ['pg_stat_statements'])
+        assert_equal(created_extensions('-- CREATE EXTENSION pgaudit;\nCREATE EXTENSION "pgaudit";'), ['pgaudit'])
+
+    def test_existing_role_is_not_created(self):
+        csr = Mock()
+        csr.fetchall.return_value = [('rds_pgaudit',)]
+        assert_equal(missing_roles(csr, 'CREATE ROLE rds_pgaudit'), [])
+        csr.fetchall.return_value = []
+        assert_equal(missing_roles(csr, 'CREATE ROLE rds_pgaudit'), ['rds_pgaudit'])
+
+    def test_list_databases(self):
+        csr = Mock()
+        csr.fetchall.return_value = [('postgres',), ('sales',)]
+        assert_equal(list_databases(csr), ['postgres', 'sales'])
+
+    def test_extension_installed_only_where_missing(self):
+        connections = {'postgres': database_connection(['pg_stat_statements']), 'sales': database_connection([]),
+                       'hr': Mock(**{'cursor.return_value.execute.side_effect': Exception('denied')})}
+        sql = 'CREATE EXTENSION IF NOT EXISTS pg_stat_statements;'
+        results = install_extensions(Mock(), connections.get, ['postgres', 'sales', 'hr'], sql)
+        assert_equal(results, {'postgres': 'verified', 'sales': 'installed', 'hr': 'denied'})
+        connections['sales'].cursor.return_value.execute.assert_called_with(sql)
+        assert_equal(connections['postgres'].cursor.return_value.execute.call_count, 1)
+        for conn in connections.values():
+            conn.close.assert_called_once_with()
+
+    def test_connections_are_bounded(self):
+        lock = threading.Lock()
+        state = {'open': 0, 'peak': 0}
+
+        def connect(_database):
+            with lock:
+                state['open'] += 1
+                state['peak'] = max(state['peak'], state['open'])
+            time.sleep(0.01)
+            conn = database_connection(['pg_stat_statements'])
+
+            def close():
+                with lock:
+                    state['open'] -= 1
+            conn.close.side_effect = close
+            return conn
+
+        databases = [f'db{index}' for index in range(10)]
+        results = install_extensions(Mock(), connect, databases, 'CREATE EXTENSION pg_stat_statements;', pool_size=3)
+        assert_equal(set(results.values()), {'verified'})
+        assert_equal(state['open'], 0)
+        self.assertLessEqual(state['peak'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Unit tests for RDS enablement utilities
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import logging
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+from botocore.exceptions import ClientError
+from nose.tools import assert_equal, assert_true, assert_false, assert_raises
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+import engine_capabilities
+import parameter_utilities
+import rds_config
+import rds_utilities
+from exceptions import InvalidDataOrConfigurationError
+
+logger = logging.getLogger()
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'operation')
+
+
+class TestGroupNameIndex(unittest.TestCase):
+
+    def setUp(self):
+        rds_utilities.clear_group_name_index()
+
+    def test_group_exists_uses_single_targeted_describe(self):
+        rds_client = Mock()
+        rds_client.describe_db_parameter_groups.return_value = {
+            'DBParameterGroups': [{'DBParameterGroupName': 'mydb-postgres-14-7'}]}
+        assert_true(rds_utilities.group_exists(logger, rds_client, 'db_parameter_group', 'mydb-postgres-14-7'))
+        assert_true(rds_utilities.group_exists(logger, rds_client, 'db_parameter_group', 'mydb-postgres-14-7'))
+        rds_client.describe_db_parameter_groups.assert_called_once_with(DBParameterGroupName='mydb-postgres-14-7')
+
+    def test_group_not_found(self):
+        rds_client = Mock()
+        rds_client.describe_option_groups.side_effect = client_error('OptionGroupNotFoundFault')
+        assert_false(rds_utilities.group_exists(logger, rds_client, 'option_group', 'audit-log-mysql-8-0'))
+
+    def test_unexpected_error_raised(self):
+        rds_client = Mock()
+        rds_client.describe_db_cluster_parameter_groups.side_effect = client_error('AccessDenied')
+        with self.assertRaises(ClientError):
+            rds_utilities.group_exists(logger, rds_client, 'db_cluster_parameter_group', 'cluster-aurora-mysql-5-7')
+
+    def test_index_cleared_between_invocations(self):
+        rds_client = Mock()
+        rds_client.describe_option_groups.return_value = {
+            'OptionGroupsList': [{'OptionGroupName': 'audit-log-mysql-8-0'}]}
+        assert_true(rds_utilities.group_exists(logger, rds_client, 'option_group', 'audit-log-mysql-8-0'))
+        rds_utilities.clear_group_name_index()
+        # deleted out of band before the next warm invocation
+        rds_client.describe_option_groups.side_effect = client_error('OptionGroupNotFoundFault')
+        assert_false(rds_utilities.group_exists(logger, rds_client, 'option_group', 'audit-log-mysql-8-0'))
+        assert_equal(rds_client.describe_option_groups.call_count, 2)
+
+
+class TestParameterDiff(unittest.TestCase):
+
+    def setUp(self):
+        parameter_utilities.clear_engine_defaults()
+
+    def test_update_skipped_when_parameters_match(self):
+        rds_client = Mock()
+        rds_client.describe_db_parameters.return_value = {'Parameters': [
+            {'ParameterName': 'pgaudit.log', 'ParameterValue': 'all'},
+            {'ParameterName': 'shared_preload_libraries', 'ParameterValue': 'pgaudit'},
+        ]}
+        parameters = [{'ParameterName': 'pgaudit.log', 'ParameterValue': 'all', 'ApplyMethod': 'immediate'},
+                      {'ParameterName': 'shared_preload_libraries', 'ParameterValue': 'pgaudit',
+                       'ApplyMethod': 'pending-reboot'}]
+        assert_false(rds_utilities.create_modify_parameter_groups(logger, rds_client, 'update', 'mydb-postgres-14-7',
+                                                                  'postgres14', parameters, 'audit'))
+        rds_client.describe_db_parameters.assert_called_once_with(DBParameterGroupName='mydb-postgres-14-7',
+                                                                  Source='user')
+        rds_client.modify_db_parameter_group.assert_not_called()
+
+    def test_update_sends_only_differing_parameters(self):
+        rds_client = Mock()
+        rds_client.meta.region_name = 'us-east-1'
+        rds_client.describe_db_parameters.return_value = {'Parameters': [
+            {'ParameterName': 'pgaudit.log', 'ParameterValue': 'ddl'}]}
+        rds_client.describe_engine_default_parameters.return_value = {'EngineDefaults': {'Parameters': [
+            {'ParameterName': 'pgaudit.role'}]}}
+        parameters = [{'ParameterName': 'pgaudit.log', 'ParameterValue': 'all', 'ApplyMethod': 'immediate'},
+                      {'ParameterName': 'pgaudit.role', 'ParameterValue': '', 'ApplyMethod': 'immediate'}]
+        assert_true(rds_utilities.create_modify_parameter_groups(logger, rds_client, 'update', 'mydb-postgres-14-7',
+                                                                 'postgres14', parameters, 'audit'))
+        rds_client.modify_db_parameter_group.assert_called_once_with(DBParameterGroupName='mydb-postgres-14-7',
+                                                                     Parameters=parameters[:1])
+        # pgaudit.role is not user-modified and empty by default, so the full list is not read
+        rds_client.describe_db_parameters.assert_called_once_with(DBParameterGroupName='mydb-postgres-14-7',
+                                                                  Source='user')
+        rds_client.describe_engine_default_parameters.assert_called_once_with(DBParameterGroupFamily='postgres14')
+
+    def test_instance_in_sync(self):
+        db_instance = {'DBParameterGroups': [{'DBParameterGroupName': 'mydb-mysql-8-0'}],
+                       'OptionGroupMemberships': [{'OptionGroupName': 'audit-log-mysql-8-0'}],
+                       'EnabledCloudwatchLogsExports': ['audit', 'error']}
+        assert_true(rds_utilities.instance_in_sync(db_instance, ['audit'], parameter_group_name='mydb-mysql-8-0'))
+        assert_true(rds_utilities.instance_in_sync(db_instance, ['audit'], option_group_name='audit-log-mysql-8-0'))
+        assert_false(rds_utilities.instance_in_sync(db_instance, ['audit'], parameter_group_name='default.mysql8.0'))
+        assert_false(rds_utilities.instance_in_sync(db_instance, ['postgresql'],
+                                                    parameter_group_name='mydb-mysql-8-0'))
+
+
+class TestInstanceChangeSet(unittest.TestCase):
+
+    def setUp(self):
+        self.db_instance = {'DBInstanceIdentifier': 'oracle-db',
+                            'DBParameterGroups': [{'DBParameterGroupName': 'default.oracle-ee-19'}],
+                            'OptionGroupMemberships': [{'OptionGroupName': 'default:oracle-ee-19'}],
+                            'EnabledCloudwatchLogsExports': []}
+
+    def test_changes_sent_in_one_modify(self):
+        rds_client = Mock()
+        change_set = rds_utilities.InstanceChangeSet(self.db_instance)
+        change_set.add(parameter_group_name='oracle-db-oracle-ee-19-0', enable_log_types=['audit'])
+        change_set.add(option_group_name='audit-log-oracle-ee-19', enable_log_types=['audit'], apply_immediately=True)
+        assert_true(change_set.apply(logger, rds_client))
+        rds_client.modify_db_instance.assert_called_once_with(
+            DBInstanceIdentifier='oracle-db',
+            ApplyImmediately=True,
+            DBParameterGroupName='oracle-db-oracle-ee-19-0',
+            OptionGroupName='audit-log-oracle-ee-19',
+            CloudwatchLogsExportConfiguration={'EnableLogTypes': ['audit']},
+        )
+
+    def test_modify_skipped_when_in_sync(self):
+        rds_client = Mock()
+        self.db_instance['DBParameterGroups'] = [{'DBParameterGroupName': 'oracle-db-oracle-ee-19-0'}]
+        self.db_instance['OptionGroupMemberships'] = [{'OptionGroupName': 'audit-log-oracle-ee-19'}]
+        self.db_instance['EnabledCloudwatchLogsExports'] = ['audit']
+        change_set = rds_utilities.InstanceChangeSet(self.db_instance)
+        change_set.add(parameter_group_name='oracle-db-oracle-ee-19-0', option_group_name='audit-log-oracle-ee-19',
+                       enable_log_types=['audit'])
+        assert_false(change_set.apply(logger, rds_client))
+        rds_client.modify_db_instance.assert_not_called()
+
+
+def option_rds_client(option_names):
+    rds_client = Mock()
+    rds_client.meta.region_name = 'us-east-1'
+    rds_client.get_paginator.return_value.paginate.return_value = [
+        {'OptionGroupOptions': [{'Name': option_name} for option_name in option_names]}]
+    return rds_client
+
+
+class TestSqlServerOptionSettings(unittest.TestCase):
+
+    def setUp(self):
+        engine_capabilities.clear_capabilities()
+
+    @patch.object(rds_utilities, 'create_or_update_option_groups')
+    def test_unsupported_option_fails_before_modify(self, create_or_update):
+        with assert_raises(InvalidDataOrConfigurationError):
+            rds_utilities.modify_option_groups(logger, option_rds_client(['MEMCACHED']), 'update', 'mysql', '8.0',
+                                               'audit-log-mysql-8-0')
+        create_or_update.assert_not_called()
+
+    @patch.object(rds_utilities, 'create_or_update_option_groups')
+    def test_bucket_and_role_passed_without_changing_config(self, create_or_update):
+        for account_id in ('111111111111', '222222222222'):
+            option_settings = {'S3_BUCKET_ARN': f'arn:aws:s3:::bucket/AWSLogs/{account_id}/rds',
+                               'IAM_ROLE_ARN': f'arn:aws:iam::{account_id}:role/service-role/r'}
+            rds_utilities.modify_option_groups(logger, option_rds_client(['SQLSERVER_AUDIT']), 'update',
+                                               'sqlserver-se', '15.00', 'audit-log', option_settings)
+            options = create_or_update.call_args[0][4]
+            settings = {setting['Name']: setting['Value'] for setting in options[0]['OptionSettings']}
+            assert_equal(settings['S3_BUCKET_ARN'], option_settings['S3_BUCKET_ARN'])
+            assert_equal(settings['IAM_ROLE_ARN'], option_settings['IAM_ROLE_ARN'])
+        assert_equal(rds_config.MSSQL_S3_BUCKET_ARN, '')
+        assert_equal(rds_config.AUDIT_LOG_PARAMS['SQLSERVER_OPTIONS'][0]['OptionSettings'][0]['Value'], '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Unit tests for the retry policy
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import logging
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+from nose.tools import assert_equal, assert_true, assert_false
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+import retry_policy
+from exceptions import ResourceNotInStateError
+
+logger = logging.getLogger()
+
+NO_DELAY_SETTINGS = {retry_policy.THROTTLING: (4, 0, 0), retry_policy.WAIT_FOR_STATE: (4, 0, 0)}
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'ModifyDBInstance')
+
+
+def rds_client_in(region):
+    rds_client = Mock()
+    rds_client.meta.region_name = region
+    return rds_client
+
+
+class TestClassify(unittest.TestCase):
+
+    def test_error_categories(self):
+        assert_equal(retry_policy.classify(client_error('Throttling')), retry_policy.THROTTLING)
+        assert_equal(retry_policy.classify(EndpointConnectionError(endpoint_url='https://rds')),
+                     retry_policy.THROTTLING)
+        assert_equal(retry_policy.classify(client_error('InvalidDBInstanceState')), retry_policy.WAIT_FOR_STATE)
+        assert_equal(retry_policy.classify(ResourceNotInStateError('modifying')), retry_policy.WAIT_FOR_STATE)
+        assert_equal(retry_policy.classify(client_error('InvalidParameterCombination')), retry_policy.FAIL_FAST)
+        assert_equal(retry_policy.classify(client_error('DBParameterGroupQuotaExceeded')), retry_policy.FAIL_FAST)
+        assert_equal(retry_policy.classify(ValueError('bad input')), retry_policy.FAIL_FAST)
+
+    def test_backoff_is_jittered_and_capped(self):
+        delays = [retry_policy.backoff_delay(10, 2, 60) for _ in range(50)]
+        assert_true(all(0 <= delay <= 60 for delay in delays))
+        assert_true(len(set(delays)) > 1)
+
+
+@patch.dict(retry_policy.RETRY_SETTINGS, NO_DELAY_SETTINGS)
+class TestRetryWithPolicy(unittest.TestCase):
+
+    def setUp(self):
+        retry_policy.clear_retry_budgets()
+
+    def test_fail_fast_not_retried(self):
+        rds_client = rds_client_in('us-east-1')
+        rds_client.modify_db_instance.side_effect = client_error('InvalidParameterCombination')
+
+        @retry_policy.retry_with_policy()
+        def modify(logger, rds_client):
+            return rds_client.modify_db_instance()
+
+        with self.assertRaises(ClientError):
+            modify(logger, rds_client)
+        assert_equal(rds_client.modify_db_instance.call_count, 1)
+
+    def test_busy_instance_retried_until_success(self):
+        rds_client = rds_client_in('us-east-1')
+        rds_client.modify_db_instance.side_effect = [client_error('InvalidDBInstanceState'),
+                                                     client_error('Throttling'), {'DBInstance': {}}]
+
+        @retry_policy.retry_with_policy()
+        def modify(logger, rds_client):
+            return rds_client.modify_db_instance()
+
+        assert_equal(modify(logger, rds_client), {'DBInstance': {}})
+        assert_equal(rds_client.modify_db_instance.call_count, 3)
+
+    def test_budget_shared_per_account_and_region(self):
+        first, second, other_region = (rds_client_in('us-east-1'), rds_client_in('us-east-1'),
+                                       rds_client_in('eu-west-1'))
+        retry_policy.register_client(first, '111111111111')
+        retry_policy.register_client(second, '111111111111')
+        retry_policy.register_client(other_region, '111111111111')
+        assert_true(retry_policy.retry_budget_for(first) is retry_policy.retry_budget_for(second))
+        assert_false(retry_policy.retry_budget_for(first) is retry_policy.retry_budget_for(other_region))
+
+    def test_throttling_stops_when_budget_exhausted(self):
+        rds_client = rds_client_in('us-east-1')
+        rds_client.describe_db_instances.side_effect = client_error('Throttling')
+        bucket = retry_policy.retry_budget_for(rds_client)
+        bucket.refill_per_second = 0
+        while bucket.acquire():
+            pass
+
+        with self.assertRaises(ClientError):
+            retry_policy.call(rds_client.describe_db_instances, client=rds_client)
+        assert_equal(rds_client.describe_db_instances.call_count, 1)
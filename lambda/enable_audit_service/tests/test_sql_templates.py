@@ -0,0 +1,51 @@
+"""
+Unit tests for the compiled SQL template cache
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from nose.tools import assert_equal, assert_true
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+import sql_templates
+
+logger = logging.getLogger()
+
+
+class TestSqlTemplates(unittest.TestCase):
+
+    def test_render_matches_template_file(self):
+        import jinja2
+        kwargs = {'VERSION': '19.0', 'MASTER_USERNAME': 'admin'}
+        with open(os.path.join(sql_templates.SQL_DIR, 'oracle', 'set-audit-parameters.sql')) as sql_file:
+            expected = jinja2.Template(sql_file.read()).render(**kwargs)
+        assert_equal(sql_templates.render_sql(logger, 'set-audit-parameters.sql', 'oracle', kwargs), expected)
+
+    def test_environment_created_once(self):
+        assert_true(sql_templates.get_environment() is sql_templates.get_environment())
+
+    def test_missing_template_renders_blank(self):
+        assert_equal(sql_templates.render_sql(logger, 'missing.sql', 'postgres'), '')
+
+    def test_precompiled_templates_render_without_template_files(self):
+        with tempfile.TemporaryDirectory() as target_dir:
+            assert_equal(sql_templates.precompile(target_dir), len(sql_templates.create_environment(False)
+                                                                   .list_templates()))
+            with patch.object(sql_templates, 'COMPILED_DIR', target_dir), \
+                    patch.object(sql_templates, 'SQL_DIR', os.path.join(target_dir, 'missing')):
+                environment = sql_templates.create_environment()
+                sql = environment.get_template('postgres/create-role.sql').render()
+        assert_equal(sql, 'CREATE ROLE rds_pgaudit')
+
+
+if __name__ == '__main__':
+    unittest.main()
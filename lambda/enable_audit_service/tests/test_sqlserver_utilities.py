@@ -0,0 +1,144 @@
+"""
+Unit tests for the SQL Server audit script fast path
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from nose.tools import assert_equal, assert_in
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+import sql_templates
+import sqlserver_utilities
+from sqlserver_utilities import action_groups, audit_settings, read_audit_fingerprint, plan_audit_scripts, \
+    ALL_SCRIPTS, SERVER_SPEC_SCRIPT, SINGLE_DATABASE_SPEC_SCRIPT, DATABASE_SPEC_SCRIPT, JOB_SCRIPT, \
+    SERVER_AUDIT_SCRIPT, expand_database_specs, apply_database_specs
+
+
+def render(sql_file, kwargs=None):
+    return sql_templates.render_sql(Mock(), sql_file, 'sqlserver', kwargs)
+
+
+SERVER_GROUPS = action_groups(render(SERVER_SPEC_SCRIPT))
+DATABASE_GROUPS = action_groups(render(SINGLE_DATABASE_SPEC_SCRIPT, {'DBNAME': 'db'}))
+AUDIT_SETTINGS = audit_settings(render(SERVER_AUDIT_SCRIPT))
+
+
+def fingerprint_rows(predicate="([database_name]<>'rdsadmin')", on_failure='CONTINUE',
+                     server_groups=SERVER_GROUPS, database_groups=None):
+    database_groups = database_groups or {'sales': DATABASE_GROUPS, 'hr': DATABASE_GROUPS}
+    return [('AUDIT', 'SQL_NATIVE_AUDIT', '1'), ('AUDIT_QUEUE_DELAY', 'SQL_NATIVE_AUDIT', '1000'),
+            ('AUDIT_ON_FAILURE', 'SQL_NATIVE_AUDIT', on_failure),
+            ('AUDIT_PREDICATE', 'SQL_NATIVE_AUDIT', predicate),
+            ('SERVER_SPEC', 'SERVER_MGMT_SPEC', ','.join(sorted(server_groups))),
+            ('JOB', 'SQLNATIVEAUDIT_JOB', '1')] + \
+        [('DB_SPEC', database, ','.join(sorted(groups)) or None) for database, groups in database_groups.items()]
+
+
+def plan(rows):
+    csr = Mock()
+    csr.fetchall.return_value = rows
+    return plan_audit_scripts(read_audit_fingerprint(csr, 'fingerprint'), SERVER_GROUPS, DATABASE_GROUPS,
+                              AUDIT_SETTINGS)
+
+
+class TestSqlServerUtilities(unittest.TestCase):
+
+    def test_single_database_spec_matches_database_level_script(self):
+        assert_equal(action_groups(render(SINGLE_DATABASE_SPEC_SCRIPT, {'DBNAME': 'sales'})),
+                     action_groups(render(DATABASE_SPEC_SCRIPT)))
+        assert_equal(len(action_groups(render(SERVER_SPEC_SCRIPT))), 23)
+
+    def test_database_name_is_escaped(self):
+        sql = render(SINGLE_DATABASE_SPEC_SCRIPT, {'DBNAME': "o'brien]db"})
+        assert_in("USE [o'brien]]db]", sql)
+        assert_in("name = N'o''brien]db_DB_MGMT_SPEC'", sql)
+
+    def test_configured_instance_runs_nothing(self):
+        assert_equal(plan(fingerprint_rows()), [])
+        # SQL Server stores the predicate in its own layout
+        assert_equal(plan(fingerprint_rows(predicate="([database_name] <> 'rdsadmin')")), [])
+
+    def test_only_missing_objects_are_configured(self):
+        fingerprint = {'audit': True, 'audit_settings': AUDIT_SETTINGS, 'server_spec_groups': SERVER_GROUPS,
+                       'job': False, 'database_spec_groups': {'sales': DATABASE_GROUPS, 'hr': set(), 'new_db': set()}}
+        assert_equal(plan_audit_scripts(fingerprint, SERVER_GROUPS, DATABASE_GROUPS, AUDIT_SETTINGS),
+                     [(SINGLE_DATABASE_SPEC_SCRIPT, {'DBNAME': 'hr'}),
+                      (SINGLE_DATABASE_SPEC_SCRIPT, {'DBNAME': 'new_db'}),
+                      (JOB_SCRIPT, None)])
+
+    def test_specs_with_other_groups_of_same_size_are_reapplied(self):
+        server_groups = set(SERVER_GROUPS)
+        server_groups.remove('LOGOUT_GROUP')
+        server_groups.add('BACKUP_RESTORE_GROUP')
+        database_groups = set(DATABASE_GROUPS)
+        database_groups.remove('AUDIT_CHANGE_GROUP')
+        database_groups.add('SELECT')
+        assert_equal(plan(fingerprint_rows(server_groups=server_groups,
+                                           database_groups={'sales': DATABASE_GROUPS, 'hr': database_groups})),
+                     [(SERVER_SPEC_SCRIPT, None), (SINGLE_DATABASE_SPEC_SCRIPT, {'DBNAME': 'hr'})])
+
+    def test_audit_with_other_settings_is_recreated(self):
+        assert_equal([script for script, _ in plan(fingerprint_rows(predicate="([database_name]<>'master')"))],
+                     ALL_SCRIPTS)
+        assert_equal([script for script, _ in plan(fingerprint_rows(on_failure='SHUTDOWN'))], ALL_SCRIPTS)
+
+    def test_every_script_runs_without_server_audit(self):
+        fingerprint = {'audit': False, 'audit_settings': AUDIT_SETTINGS, 'server_spec_groups': set(), 'job': True,
+                       'database_spec_groups': {}}
+        assert_equal([script for script, _ in plan_audit_scripts(fingerprint, SERVER_GROUPS, DATABASE_GROUPS)],
+                     ALL_SCRIPTS)
+        assert_equal([script for script, _ in plan_audit_scripts(None, SERVER_GROUPS, DATABASE_GROUPS)], ALL_SCRIPTS)
+        assert_equal(render(sqlserver_utilities.FINGERPRINT_SCRIPT).count('sp_executesql'), 1)
+
+    def test_database_list_fetched_once(self):
+        csr = Mock()
+        csr.fetchall.return_value = [('hr',), ('sales',)]
+        scripts = expand_database_specs(plan_audit_scripts(None, SERVER_GROUPS, DATABASE_GROUPS), csr)
+        assert_equal(scripts, [(SERVER_AUDIT_SCRIPT, None), (SERVER_SPEC_SCRIPT, None),
+                               (SINGLE_DATABASE_SPEC_SCRIPT, {'DBNAME': 'hr'}),
+                               (SINGLE_DATABASE_SPEC_SCRIPT, {'DBNAME': 'sales'}), (JOB_SCRIPT, None)])
+        csr.execute.assert_called_once_with(sqlserver_utilities.USER_DATABASES_QUERY)
+
+    def test_database_specs_applied_over_bounded_pool(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+        connections = []
+
+        def execute(sql):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+            if 'broken' in sql:
+                raise Exception('Cannot open database')
+
+        def connect():
+            conn = Mock()
+            conn.cursor.return_value.execute.side_effect = execute
+            connections.append(conn)
+            return conn
+
+        database_sqls = [(f'db{index}', f'USE [db{index}]') for index in range(12)] + [('broken', 'USE [broken]')]
+        results = apply_database_specs(Mock(), connect, database_sqls, pool_size=3)
+        assert_equal(len(results), 13)
+        assert_equal(results['broken'], 'Cannot open database')
+        assert_equal([database for database, error in results.items() if error], ['broken'])
+        assert_equal(state['peak'], 3)
+        assert_equal(len(connections), 3)
+        for conn in connections:
+            conn.close.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
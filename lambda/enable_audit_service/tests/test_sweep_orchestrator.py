@@ -0,0 +1,81 @@
+"""
+Unit tests for the multi-account sweep orchestrator
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from nose.tools import assert_equal, assert_true
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+from sweep_orchestrator import sweep
+
+REGIONS = ['us-east-1', 'us-east-2', 'us-west-1', 'us-west-2', 'eu-west-1']
+
+
+class TestSweepOrchestrator(unittest.TestCase):
+
+    def test_per_account_concurrency_is_capped(self):
+        lock = threading.Lock()
+        running = {}
+        peak = {}
+
+        def task(account_id, region):
+            with lock:
+                running[account_id] = running.get(account_id, 0) + 1
+                peak[account_id] = max(peak.get(account_id, 0), running[account_id])
+            time.sleep(0.02)
+            with lock:
+                running[account_id] -= 1
+            return region
+
+        results = list(sweep(['111', '222'], REGIONS, task, max_workers=8, account_concurrency=2,
+                             client_utilities=Mock()))
+        assert_equal(len(results), 10)
+        assert_true(all(result['status'] == 'success' for result in results))
+        assert_equal(peak, {'111': 2, '222': 2})
+
+    def test_role_and_task_failures_are_reported(self):
+        def get_credentials_for_account(account_id):
+            if account_id == '222':
+                raise Exception('AccessDenied')
+            return {}
+
+        client_utilities = Mock()
+        client_utilities.get_credentials_for_account.side_effect = get_credentials_for_account
+
+        def task(account_id, region):
+            if region == 'us-east-2':
+                raise Exception('Throttling')
+            return {'status': 'success'}
+
+        results = list(sweep(['111', '222'], REGIONS[:2], task, client_utilities=client_utilities))
+        statuses = sorted((result['account_id'], result['region'], result['status']) for result in results)
+        assert_equal(statuses, [('111', 'us-east-1', 'success'), ('111', 'us-east-2', 'failed'),
+                                ('222', 'us-east-1', 'failed'), ('222', 'us-east-2', 'failed')])
+
+    def test_results_stream_as_tasks_finish(self):
+        release = threading.Event()
+
+        def task(account_id, region):
+            if account_id == 'slow':
+                release.wait(5)
+            return region
+
+        results = sweep(['fast', 'slow'], ['us-east-1'], task, client_utilities=Mock())
+        first = next(results)
+        assert_equal(first['account_id'], 'fast')
+        release.set()
+        assert_equal(next(results)['account_id'], 'slow')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,6 @@ import requests
 import logging
 import os
 import sys
-import boto3
 
 THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # app/
 API_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../'))  # lambda/
@@ -16,7 +15,7 @@ UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
 sys.path.append(THIS_DIR)
 sys.path.append(API_DIR)
 sys.path.append(UTIL_DIR)
-from client_utilities import ClientUtilities
+from client_utilities import ClientUtilities, client_pool
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -27,9 +26,7 @@ def get_serverless_api_host(
         endpoint_type='api_gateway',
         endpoint_stack_key='ServiceEndpoint'
 ):
-    cf_client = boto3.client(
-        service_name='cloudformation', region_name=region,
-    )
+    cf_client = client_pool.get_client(None, 'cloudformation', region)
 
     stack_info = {}
     try:
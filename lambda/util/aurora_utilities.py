@@ -3,12 +3,15 @@ Utilities to enable audit logging for Aurora Clusters
 """
 import os
 import sys
-from retry import retry
+from botocore.exceptions import ClientError
 
 THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
 sys.path.append(THIS_DIR)
 
-import rds_utilities, rds_config
+import rds_utilities, rds_config, engine_capabilities
+from retry_policy import retry_with_policy
+from concurrency_utilities import run_concurrently
+from parameter_utilities import read_parameter_values, parameters_to_apply, log_types_enabled
 from exceptions import InvalidInputError, InvalidDataOrConfigurationError
 
 
@@ -43,12 +46,18 @@ def set_log_types_db_cluster(rds_client, db_cluster_identifier, logger, apply_im
     # MySQL v5.x (8.0 not released)
     if "mysql" in db_engine:
         # v5.7 has audit log types
-        enable_log_types = ["audit"] if db_engine_mode == "provisioned" else [""]
+        enable_log_types = [""]
+        if db_engine_mode == "provisioned":
+            enable_log_types = engine_capabilities.resolve_log_types(logger, rds_client, db_engine, db_engine_version,
+                                                                     ["audit"])
         logger.info(f'LogType={enable_log_types}, "mysql" in db_engine AND db_engine_version.startswith("5.")')
     #
     # Postgres 9.6, 10, 11, 12
     elif "postgres" in db_engine:
-        enable_log_types = ["postgresql"] if db_engine_mode == "provisioned" else [""]
+        enable_log_types = [""]
+        if db_engine_mode == "provisioned":
+            enable_log_types = engine_capabilities.resolve_log_types(logger, rds_client, db_engine, db_engine_version,
+                                                                     ["postgresql"])
         logger.info(f'LogType={enable_log_types}, "postgres" in db_engine')
     else:
         logger.error('Error: in enable_aurora_handler > logTypes_db_cluster: unsupported engine type')
@@ -65,22 +74,101 @@ def set_log_types_db_cluster(rds_client, db_cluster_identifier, logger, apply_im
         # apply changes to cluster
         cluster_parameter_group_changes(logger, rds_client, db_cluster, db_engine, major, minor,
                                         db_cluster_identifier, enable_log_types)
-        # apply changes to instance
-        for db_cluster_member in db_cluster["DBClusterMembers"]:
-            db_instance_identifier = db_cluster_member["DBInstanceIdentifier"]
-            db_cluster_instance = \
-                rds_client.describe_db_instances(DBInstanceIdentifier=db_instance_identifier)["DBInstances"][0]
+        # apply changes to instances, all members are read with one describe and updated concurrently
+        def member_parameter_group_changes(db_cluster_instance):
+            db_instance_identifier = db_cluster_instance["DBInstanceIdentifier"]
             logger.info(
                 f'db_instance_identifier = {db_instance_identifier}, db_cluster_instance = {db_cluster_instance}')
             rds_utilities.instance_parameter_group_changes(logger, rds_client, db_cluster_instance, db_engine,
                                                            major, minor, db_instance_identifier, is_cluster=True,
                                                            apply_immediately=apply_immediately)
+
+        db_cluster_instances = describe_cluster_members(rds_client, db_cluster)
+        if rds_config.SHARED_MEMBER_PARAMETER_GROUP:
+            shared_member_parameter_group_changes(logger, rds_client, db_cluster, db_cluster_instances, db_engine,
+                                                  major, minor, apply_immediately)
+        else:
+            run_concurrently(member_parameter_group_changes, db_cluster_instances)
     else:
         logger.info('No db_cluster_members in db_cluster')
         cluster_parameter_group_changes(logger, rds_client, db_cluster, db_engine, major, minor, db_cluster_identifier)
     logger.info('Exiting set_log_types_db_cluster')
 
 
+def describe_cluster_members(rds_client, db_cluster):
+    """
+    Describe all member instances of a DB cluster with one describe_db_instances filtered on db-cluster-id
+    @param rds_client:
+    @param db_cluster: DB cluster description
+    @return: list of DB instance descriptions
+    """
+    if not db_cluster["DBClusterMembers"]:
+        return []
+    db_cluster_instances = []
+    paginator = rds_client.get_paginator('describe_db_instances')
+    for page in paginator.paginate(Filters=[{'Name': 'db-cluster-id',
+                                             'Values': [db_cluster["DBClusterIdentifier"]]}]):
+        db_cluster_instances.extend(page['DBInstances'])
+    return db_cluster_instances
+
+
+def shared_member_parameter_group_changes(logger, rds_client, db_cluster, db_cluster_instances, db_engine, major, minor,
+                                          apply_immediately):
+    """
+    function to apply one instance-level audit parameter group to every cluster member
+    Members on a default group get the shared <cluster>-<engine>-<major>-<minor>-members group. Members on a custom
+    group keep it. Each distinct group is created or updated once, then attached to the members concurrently
+    @param logger:
+    @param rds_client:
+    @param db_cluster:
+    @param db_cluster_instances: member descriptions from describe_cluster_members
+    @param db_engine:
+    @param major:
+    @param minor:
+    @param apply_immediately:
+    @return:
+    """
+    logger.info('Entering shared_member_parameter_group_changes')
+    shared_parameter_group_name = (
+            rds_utilities.valid_file_name_creator(db_cluster["DBClusterIdentifier"])
+            + "-" + db_engine + "-" + major + "-" + minor + rds_config.SHARED_MEMBER_PARAMETER_GROUP_SUFFIX
+    )
+    db_engine_version = db_cluster.get("EngineVersion")
+
+    # member: parameter group to attach
+    member_parameter_groups = {}
+    default_parameter_group_name = None
+    for db_cluster_instance in db_cluster_instances:
+        db_parameter_group_name = db_cluster_instance["DBParameterGroups"][0]["DBParameterGroupName"]
+        if db_parameter_group_name.startswith("default."):
+            default_parameter_group_name = db_parameter_group_name
+            db_parameter_group_name = shared_parameter_group_name
+        member_parameter_groups[db_cluster_instance["DBInstanceIdentifier"]] = db_parameter_group_name
+
+    for db_parameter_group_name in sorted(set(member_parameter_groups.values())):
+        if db_parameter_group_name == shared_parameter_group_name and \
+                not rds_utilities.group_exists(logger, rds_client, 'db_parameter_group', shared_parameter_group_name):
+            # create shared_parameter_group_name and assign params
+            rds_utilities.modify_instance_parameter_groups(logger, rds_client, "create", db_engine, major, minor,
+                                                           shared_parameter_group_name, True,
+                                                           default_parameter_group_name,
+                                                           db_engine_version=db_engine_version)
+        else:
+            # update db_parameter_group_name and assign params
+            rds_utilities.modify_instance_parameter_groups(logger, rds_client, "update", db_engine, major, minor,
+                                                           db_parameter_group_name, True,
+                                                           db_engine_version=db_engine_version)
+
+    def attach_parameter_group(db_cluster_instance):
+        change_set = rds_utilities.InstanceChangeSet(db_cluster_instance)
+        change_set.add(parameter_group_name=member_parameter_groups[db_cluster_instance["DBInstanceIdentifier"]],
+                       apply_immediately=apply_immediately)
+        return change_set.apply(logger, rds_client)
+
+    run_concurrently(attach_parameter_group, db_cluster_instances)
+    logger.info('Exiting shared_member_parameter_group_changes')
+
+
 # Start Cluster Parameter Group changes
 def cluster_parameter_group_changes(logger, rds_client, db_cluster, db_engine, major, minor, db_instance_identifier,
                                     enable_log_types=None):
@@ -98,12 +186,6 @@ def cluster_parameter_group_changes(logger, rds_client, db_cluster, db_engine, m
     """
     logger.info('Entering cluster_parameter_group_changes')
 
-    val = rds_client.describe_db_cluster_parameter_groups()
-    cluster_parameter_group_names = [
-        cluster_parameter_group["DBClusterParameterGroupName"]
-        for cluster_parameter_group in val["DBClusterParameterGroups"]
-    ]
-
     logger.info('In db_cluster["DBClusterParameterGroup"]')
     db_cluster_parameter_group_name = db_cluster["DBClusterParameterGroup"]
     # create cluster parameter group name
@@ -121,33 +203,44 @@ def cluster_parameter_group_changes(logger, rds_client, db_cluster, db_engine, m
     ###
     if db_cluster_parameter_group_name.startswith("default."):
         logger.info('In db_cluster_parameter_group_name.startswith("default.")')
-        if new_cluster_parameter_group_name not in cluster_parameter_group_names:
+        if not rds_utilities.group_exists(logger, rds_client, 'db_cluster_parameter_group',
+                                          new_cluster_parameter_group_name):
             # create new_cluster_parameter_group_name and assign params
             modify_cluster_parameter_groups(logger, rds_client, "create", db_engine, major, minor,
-                                            new_cluster_parameter_group_name, db_cluster_parameter_group_name)
-        # update new_cluster_parameter_group_name and assign params
-        modify_cluster_parameter_groups(logger, rds_client, "update", db_engine, major, minor,
-                                        new_cluster_parameter_group_name)
+                                            new_cluster_parameter_group_name, db_cluster_parameter_group_name,
+                                            db_engine_version=db_cluster.get("EngineVersion"))
+        else:
+            # update new_cluster_parameter_group_name and assign params
+            modify_cluster_parameter_groups(logger, rds_client, "update", db_engine, major, minor,
+                                            new_cluster_parameter_group_name,
+                                            db_engine_version=db_cluster.get("EngineVersion"))
         db_parameter_group_name = new_cluster_parameter_group_name
     else:
         logger.info('db_cluster_parameter_group_name does not startswith("default.")')
         # update existing db_cluster_parameter_group_name and assign params
         modify_cluster_parameter_groups(logger, rds_client, "update", db_engine, major, minor,
-                                        db_cluster_parameter_group_name)
+                                        db_cluster_parameter_group_name,
+                                        db_engine_version=db_cluster.get("EngineVersion"))
         db_parameter_group_name = db_cluster_parameter_group_name
 
-    create_modify_database_parameter_groups(logger, db_instance_identifier, db_parameter_group_name, enable_log_types,
-                                            rds_client)
+    if rds_config.PARAMETER_APPLY_MODE == 'diff' and \
+            db_cluster["DBClusterParameterGroup"] == db_parameter_group_name and \
+            log_types_enabled(enable_log_types, db_cluster.get("EnabledCloudwatchLogsExports")):
+        logger.info(f'Cluster parameter group {db_parameter_group_name} and log types already applied to '
+                    f'{db_instance_identifier}. Skipping modify_db_cluster')
+    else:
+        create_modify_database_parameter_groups(logger, db_instance_identifier, db_parameter_group_name,
+                                                enable_log_types, rds_client)
 
     logger.info('Exiting cluster_parameter_group_changes')
 
 
-@retry(tries=15, delay=2, backoff=1.5)
+@retry_with_policy()
 def create_modify_database_parameter_groups(logger, db_instance_identifier, db_parameter_group_name, enable_log_types,
                                             rds_client):
     """
     Function to create or update database_parameter_groups
-    Retry settings provides a duration sufficient for database to be available before raising an exception
+    Retried by retry_policy while the database is busy, throttled or briefly unavailable
     @param logger:
     @param db_instance_identifier:
     @param db_parameter_group_name:
@@ -178,9 +271,12 @@ def create_modify_database_parameter_groups(logger, db_instance_identifier, db_p
 
 
 def get_cluster_parameter_group_family(logger, cluster_parameter_group_name, db_engine,
-                                       default_cluster_parameter_group_name, major, minor, rds_client, task):
+                                       default_cluster_parameter_group_name, major, minor, rds_client, task,
+                                       db_engine_version=None):
     """
     Function to return cluster parameter group family
+    The family comes from the engine capability cache. The parameter group or engine name is only used when the
+    engine version is not listed by describe_db_engine_versions
     @param logger:
     @param cluster_parameter_group_name:
     @param db_engine:
@@ -189,9 +285,17 @@ def get_cluster_parameter_group_family(logger, cluster_parameter_group_name, db_
     @param minor:
     @param rds_client:
     @param task:
+    @param db_engine_version:
     @return:
     """
     logger.info('Entering get_cluster_parameter_group_family')
+    if db_engine_version:
+        cluster_parameter_group_family = engine_capabilities.parameter_group_family(logger, rds_client, db_engine,
+                                                                                    db_engine_version)
+        if cluster_parameter_group_family:
+            logger.info(f'cluster_parameter_group_family = {cluster_parameter_group_family}')
+            return cluster_parameter_group_family
+
     if db_engine in rds_config.POSTGRESQL_FAMILY:
         # During 'create' use default_cluster_parameter_group, else use existing or newly created
         if default_cluster_parameter_group_name and task == 'create':
@@ -212,7 +316,7 @@ def get_cluster_parameter_group_family(logger, cluster_parameter_group_name, db_
 
 
 def modify_cluster_parameter_groups(logger, rds_client, task, db_engine, major, minor, cluster_parameter_group_name,
-                                    default_cluster_parameter_group_name=None):
+                                    default_cluster_parameter_group_name=None, db_engine_version=None):
     """
     Function to set parameters based on engine type
     @param logger:
@@ -223,6 +327,7 @@ def modify_cluster_parameter_groups(logger, rds_client, task, db_engine, major,
     @param minor:
     @param cluster_parameter_group_name:
     @param default_cluster_parameter_group_name:
+    @param db_engine_version:
     @return:
     """
     logger.info('Entering modify_cluster_parameter_groups')
@@ -231,7 +336,7 @@ def modify_cluster_parameter_groups(logger, rds_client, task, db_engine, major,
     # Get cluster param group family
     cluster_parameter_group_family = get_cluster_parameter_group_family(logger, cluster_parameter_group_name, db_engine,
                                                                         default_cluster_parameter_group_name, major,
-                                                                        minor, rds_client, task)
+                                                                        minor, rds_client, task, db_engine_version)
     #
     # Engine= MySQL
     #
@@ -253,12 +358,12 @@ def modify_cluster_parameter_groups(logger, rds_client, task, db_engine, major,
     logger.info('Exiting modify_cluster_parameter_groups')
 
 
-@retry(tries=15, delay=2, backoff=1.5)
+@retry_with_policy()
 def create_modify_cluster_parameter_groups(logger, cluster_parameter_group_family, cluster_parameter_group_name,
                                            description, parameters, rds_client, task):
     """
     Function to create or update changes to cluster parameter groups
-    Retry settings provides a duration sufficient for database to be available before raising an exception
+    Retried by retry_policy while the database is busy, throttled or briefly unavailable
     @param logger:
     @param cluster_parameter_group_family:
     @param cluster_parameter_group_name:
@@ -266,17 +371,34 @@ def create_modify_cluster_parameter_groups(logger, cluster_parameter_group_famil
     @param parameters:
     @param rds_client:
     @param task:
-    @return:
+    @return: True if parameters were modified
     """
     logger.info('Entering create_modify_cluster_parameter_groups()')
+    if task == "update" and rds_config.PARAMETER_APPLY_MODE == 'diff':
+        current_values = read_parameter_values(rds_client, cluster_parameter_group_name, parameters, is_cluster=True,
+                                               family=cluster_parameter_group_family)
+        parameters = parameters_to_apply(parameters, current_values)
+        if not parameters:
+            logger.info(f'Cluster parameter group {cluster_parameter_group_name} already has audit parameters. '
+                        f'Skipping modify')
+            return False
+        logger.info(f'Modifying {[parameter["ParameterName"] for parameter in parameters]} in '
+                    f'{cluster_parameter_group_name}')
     if task == "create":
         logger.info('In task == "create"')
         # Create RDS Cluster Parameter Group
-        rds_client.create_db_cluster_parameter_group(
-            DBClusterParameterGroupName=cluster_parameter_group_name,
-            DBParameterGroupFamily=cluster_parameter_group_family,
-            Description=description,
-        )
+        try:
+            rds_client.create_db_cluster_parameter_group(
+                DBClusterParameterGroupName=cluster_parameter_group_name,
+                DBParameterGroupFamily=cluster_parameter_group_family,
+                Description=description,
+            )
+        except ClientError as err:
+            # Created by a concurrent enablement or an earlier attempt of this retry loop
+            if err.response['Error']['Code'] != 'DBParameterGroupAlreadyExists':
+                raise
+            logger.info(f'Cluster parameter group {cluster_parameter_group_name} already exists')
+        rds_utilities.record_group_name(rds_client, 'db_cluster_parameter_group', cluster_parameter_group_name)
     if task in ["create", "update"]:
         logger.info('In task == "create" or task == "update"')
         # Add options to RDS Cluster Parameter Group
@@ -284,6 +406,7 @@ def create_modify_cluster_parameter_groups(logger, cluster_parameter_group_famil
             DBClusterParameterGroupName=cluster_parameter_group_name, Parameters=parameters
         )
     logger.info('Exiting create_modify_cluster_parameter_groups()')
+    return True
 
 
 def failure_message(err):
@@ -1,8 +1,14 @@
 # pylint: disable=logging-format-interpolation, redefined-outer-name, redefined-builtin, bad-option-value, import-error, missing-module-docstring
 import os
 import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 
 import boto3
+import botocore.loaders
+import botocore.session
 import logging
 
 THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # util/
@@ -11,9 +17,22 @@ APP_DIR = os.path.normpath(os.path.join(THIS_DIR, '../enable_audit_service/app')
 sys.path.append(UTIL_DIR)
 sys.path.append(APP_DIR)
 
+import retry_policy
+
 lgr = logging.getLogger()
 lgr.setLevel(logging.INFO)
 
+# Assumed-role credentials are cached per account for the life of the Lambda container and refreshed
+# once they are within CREDENTIALS_REFRESH_WINDOW of expiring
+CREDENTIALS_REFRESH_WINDOW = timedelta(minutes=5)
+_credentials_cache = {}
+_credentials_locks = {}
+_credentials_lock = threading.Lock()
+
+# Clients are pooled per (account, service, region) for the life of the Lambda container. The pool is bounded and
+# evicts the least recently used client once CLIENT_POOL_MAX_SIZE is reached
+CLIENT_POOL_MAX_SIZE = 64
+
 
 class ClientUtilities:
     def __init__(self, logger=None):
@@ -30,23 +49,42 @@ class ClientUtilities:
         @return:
         """
         rds_credentials = self.get_credentials_for_account(account_id)
-        rds_client = boto3.client(
-            region_name=region,
-            service_name=service,
-            aws_access_key_id=rds_credentials.get('AccessKeyId', ''),
-            aws_secret_access_key=rds_credentials.get('SecretAccessKey', ''),
-            aws_session_token=rds_credentials.get('SessionToken', '')
-        )
-        self.logger.info('Returning boto3 client')
+        rds_client = client_pool.get_client(account_id, service, region, rds_credentials)
+        self.logger.info(f'Returning boto3 client. Pool stats={client_pool.stats()}')
         return rds_client
 
-    def get_credentials_for_account(self, account_id) -> str:
+    def get_credentials_for_account(self, account_id) -> dict:
+        """
+        Obtain credentials for specified account. Credentials are served from the container-wide cache
+        until they are about to expire
+        @param account_id:
+        @return: credentials
+        """
+        credentials = _credentials_cache.get(account_id)
+        if credentials and not credentials_expiring(credentials):
+            return credentials
+
+        # One lock per account so concurrent callers for the same account share a single AssumeRole
+        with _credentials_lock:
+            account_lock = _credentials_locks.setdefault(account_id, threading.Lock())
+        with account_lock:
+            credentials = _credentials_cache.get(account_id)
+            if credentials and not credentials_expiring(credentials):
+                return credentials
+
+            self.logger.info(f'Assuming rds_audit_log_role in account {account_id}')
+            credentials = self.assume_role(account_id)
+            _credentials_cache[account_id] = credentials
+            return credentials
+
+    @staticmethod
+    def assume_role(account_id) -> dict:
         """
-        Obtain credentials for specified account
+        Assume the audit log role in specified account
         @param account_id:
         @return: credentials
         """
-        sts_client = boto3.client('sts')
+        sts_client = client_pool.get_client(None, 'sts', None)
 
         # Call the assume_role method of the STSConnection object and pass the role
         # ARN and a role session name.
@@ -58,3 +96,149 @@ class ClientUtilities:
         # From the response that contains the assumed role, get the temporary
         # credentials that can be used to make subsequent API calls
         return assumed_role_object['Credentials']
+
+
+def credentials_expiring(credentials, window=CREDENTIALS_REFRESH_WINDOW):
+    """
+    Check if assumed-role credentials expire within the refresh window
+    @param credentials: credentials returned by sts.assume_role
+    @param window: timedelta before expiry at which credentials are refreshed
+    @return: True if credentials should be refreshed
+    """
+    expiration = credentials.get('Expiration')
+    if not expiration:
+        return True
+    if isinstance(expiration, str):
+        expiration = datetime.fromisoformat(expiration.replace('Z', '+00:00'))
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return expiration - window <= datetime.now(timezone.utc)
+
+
+class ClientPool:
+    """
+    Bounded LRU pool of boto3 clients keyed by (account, service, region)
+    """
+
+    def __init__(self, max_size=CLIENT_POOL_MAX_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clients = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        # Service models are loaded once per container and shared by every session
+        self._loader = botocore.loaders.create_loader()
+
+    def get_client(self, account_id, service, region, credentials=None):
+        """
+        Return a pooled client, creating it on first use or when the account credentials were refreshed
+        @param account_id: target account, None for the Lambda's own account
+        @param service:
+        @param region:
+        @param credentials: credentials returned by sts.assume_role, None for the default credential chain
+        @return: boto3 client
+        """
+        key = (account_id, service, region)
+        access_key_id = credentials.get('AccessKeyId') if credentials else None
+        client = self._pooled_client(key, access_key_id)
+        if client:
+            return client
+
+        # One lock per key, so clients for different keys are built in parallel while concurrent callers for the same
+        # key share a single client
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            client = self._pooled_client(key, access_key_id)
+            if client:
+                return client
+
+            client = self._new_session(credentials).client(service_name=service, region_name=region)
+            retry_policy.register_client(client, account_id)
+            with self._lock:
+                self.misses += 1
+                self._clients[key] = (access_key_id, client)
+                self._clients.move_to_end(key)
+                while len(self._clients) > self.max_size:
+                    self._clients.popitem(last=False)
+                    self.evictions += 1
+            return client
+
+    def _pooled_client(self, key, access_key_id):
+        # Pooled client for key if it was built with the same credentials, else None
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry and entry[0] == access_key_id:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            return None
+
+    def stats(self):
+        """
+        Return pool counters
+        @return: dict with hits, misses, evictions and size
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._clients)}
+
+    def clear(self):
+        """
+        Drop all pooled clients and reset counters
+        """
+        with self._lock:
+            self._clients.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def _new_session(self, credentials):
+        botocore_session = botocore.session.get_session()
+        botocore_session.register_component('data_loader', self._loader)
+        if not credentials:
+            return boto3.session.Session(botocore_session=botocore_session)
+        return boto3.session.Session(
+            aws_access_key_id=credentials.get('AccessKeyId', ''),
+            aws_secret_access_key=credentials.get('SecretAccessKey', ''),
+            aws_session_token=credentials.get('SessionToken', ''),
+            botocore_session=botocore_session
+        )
+
+
+client_pool = ClientPool()
+
+
+class LazyClient:
+    """
+    Stand-in for a boto3 client that is only built when an engine path first uses it
+    """
+
+    def __init__(self, name, factory):
+        """
+        @param name: service name, used for logging
+        @param factory: callable returning the boto3 client
+        """
+        self.name = name
+        self.setup_seconds = 0.0
+        self._factory = factory
+        self._client = None
+
+    @property
+    def created(self):
+        return self._client is not None
+
+    def __getattr__(self, item):
+        if self._client is None:
+            start = time.perf_counter()
+            self._client = self._factory()
+            self.setup_seconds = time.perf_counter() - start
+        return getattr(self._client, item)
+
+
+def clear_credentials_cache():
+    """
+    Drop all cached credentials, e.g. after a role change in the target account
+    """
+    with _credentials_lock:
+        _credentials_cache.clear()
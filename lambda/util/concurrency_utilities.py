@@ -0,0 +1,27 @@
+"""
+Run independent per-instance work on a bounded thread pool
+boto3 clients are thread safe, so one client is shared by all workers
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Upper bound on worker threads for one call to run_concurrently
+MAX_CONCURRENCY = int(os.environ.get('max_concurrency', '8'))
+
+
+def run_concurrently(func, items, max_workers=None):
+    """
+    Call func for each item on a bounded thread pool
+    @param func: function taking one item
+    @param items: iterable of items
+    @param max_workers: worker limit, MAX_CONCURRENCY when None
+    @return: list of results in item order. The first exception, in item order, is re-raised once every call is done
+    """
+    items = list(items)
+    workers = min(max_workers or MAX_CONCURRENCY, len(items))
+    if workers <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(func, item) for item in items]
+    return [future.result() for future in futures]
@@ -0,0 +1,164 @@
+"""
+Engine capabilities read from describe_db_engine_versions
+Capabilities are cached per region and engine for the life of the Lambda container, so enablement and validation
+resolve the parameter group family, exportable log types and available options with a dict lookup instead of
+guessing from the version string
+Each (region, engine) is loaded under its own lock, so loads for different regions and engines run in parallel. A
+failed load, e.g. AccessDenied before the workload account role has the describe grants, is cached for
+CAPABILITY_FAILURE_TTL_SECONDS so it is not repeated for every database
+"""
+import os
+import re
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+CAPABILITY_FAILURE_TTL_SECONDS = int(os.environ.get('capability_failure_ttl_seconds', '300'))
+
+# (kind, region, engine[, major engine version]): (expires at, None for loaded values, value)
+_capabilities = {}
+_capability_locks = {}
+_capabilities_lock = threading.Lock()
+
+
+def version_tuple(engine_version):
+    """
+    Convert an engine version to a tuple of ints so versions compare numerically ('8.0.9' < '8.0.25')
+    Parsing stops at the first part that does not start with a digit, e.g. the 'v1' in '15.00.4043.16.v1'
+    @param engine_version:
+    @return: tuple of ints
+    """
+    parts = []
+    for part in engine_version.split('.'):
+        match = re.match(r'\d+', part)
+        if not match:
+            break
+        parts.append(int(match.group()))
+    return tuple(parts)
+
+
+def get_engine_capability(logger, rds_client, engine, engine_version):
+    """
+    Return the capabilities of an engine version in the rds_client region
+    @param logger:
+    @param rds_client:
+    @param engine: e.g. 'mysql', 'aurora-postgresql'
+    @param engine_version: e.g. '8.0.28'
+    @return: dict with family, major_engine_version, exportable_log_types and supports_log_exports. None if the
+    engine version is not listed
+    """
+    return _engine_versions(logger, rds_client, engine).get(engine_version)
+
+
+def resolve_log_types(logger, rds_client, engine, engine_version, log_types):
+    """
+    Keep only the log types the engine version can export to CloudWatch Logs
+    If the engine version is not listed, log_types is returned as is
+    @param logger:
+    @param rds_client:
+    @param engine:
+    @param engine_version:
+    @param log_types: log types wanted for audit logging
+    @return: list of log types to enable
+    """
+    capability = get_engine_capability(logger, rds_client, engine, engine_version)
+    if capability is None:
+        return log_types
+    exportable = [log_type for log_type in log_types if log_type in capability['exportable_log_types']]
+    if exportable != log_types:
+        logger.info(f'{engine} {engine_version} exports {capability["exportable_log_types"]}. '
+                    f'Using log types {exportable} instead of {log_types}')
+    return exportable
+
+
+def parameter_group_family(logger, rds_client, engine, engine_version):
+    """
+    Return the parameter group family of an engine version, None if the engine version is not listed
+    The same family applies to DB and DB cluster parameter groups
+    @param logger:
+    @param rds_client:
+    @param engine:
+    @param engine_version:
+    @return:
+    """
+    capability = get_engine_capability(logger, rds_client, engine, engine_version)
+    return capability['family'] if capability else None
+
+
+def unsupported_options(logger, rds_client, engine, major_engine_version, option_names):
+    """
+    Return the options an option group of the engine major version cannot include
+    Option groups are created per engine and major engine version, so that is what option support is recorded for
+    @param logger:
+    @param rds_client:
+    @param engine:
+    @param major_engine_version: e.g. '8.0', '15.00'
+    @param option_names: names of the options to include
+    @return: list of option names. Empty if the available options could not be read
+    """
+    available = _cached(logger, ('options', rds_client.meta.region_name, engine, major_engine_version),
+                        lambda: _load_option_names(logger, rds_client, engine, major_engine_version))
+    if available is None:
+        return []
+    return [option_name for option_name in option_names if option_name not in available]
+
+
+def clear_capabilities():
+    with _capabilities_lock:
+        _capabilities.clear()
+        _capability_locks.clear()
+
+
+def _engine_versions(logger, rds_client, engine):
+    versions = _cached(logger, ('versions', rds_client.meta.region_name, engine),
+                       lambda: _load_engine_versions(logger, rds_client, engine))
+    # Callers fall back to their own family and log type defaults
+    return versions or {}
+
+
+def _cached(logger, key, load):
+    entry = _capabilities.get(key)
+    if entry and (entry[0] is None or entry[0] > time.monotonic()):
+        return entry[1]
+
+    # One lock per key, the shared lock only guards the dicts
+    with _capabilities_lock:
+        key_lock = _capability_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        entry = _capabilities.get(key)
+        if entry and (entry[0] is None or entry[0] > time.monotonic()):
+            return entry[1]
+        try:
+            entry = (None, load())
+        except ClientError as err:
+            logger.info(f'Unable to load {key[0]} capabilities for {key[2:]} in {key[1]}, retrying after '
+                        f'{CAPABILITY_FAILURE_TTL_SECONDS}s: {err}')
+            entry = (time.monotonic() + CAPABILITY_FAILURE_TTL_SECONDS, None)
+        with _capabilities_lock:
+            _capabilities[key] = entry
+        return entry[1]
+
+
+def _load_engine_versions(logger, rds_client, engine):
+    logger.info(f'Loading engine capabilities for {engine} in {rds_client.meta.region_name}')
+    versions = {}
+    paginator = rds_client.get_paginator('describe_db_engine_versions')
+    for page in paginator.paginate(Engine=engine, IncludeAll=True):
+        for engine_version in page.get('DBEngineVersions', []):
+            versions[engine_version['EngineVersion']] = {
+                'family': engine_version.get('DBParameterGroupFamily'),
+                'major_engine_version': engine_version.get('MajorEngineVersion'),
+                'exportable_log_types': engine_version.get('ExportableLogTypes', []),
+                'supports_log_exports': engine_version.get('SupportsLogExportsToCloudwatchLogs', False),
+            }
+    return versions
+
+
+def _load_option_names(logger, rds_client, engine, major_engine_version):
+    logger.info(f'Loading options of {engine} {major_engine_version} in {rds_client.meta.region_name}')
+    option_names = set()
+    paginator = rds_client.get_paginator('describe_option_group_options')
+    for page in paginator.paginate(EngineName=engine, MajorEngineVersion=major_engine_version):
+        option_names.update(option['Name'] for option in page.get('OptionGroupOptions', []))
+    return option_names
@@ -10,6 +10,10 @@ class FailedAuditLogEnableError(Exception):
     pass
 
 
+class ResourceNotInStateError(FailedAuditLogEnableError):
+    pass
+
+
 class FailedAuditExportToS3(Exception):
     pass
 
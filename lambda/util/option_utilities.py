@@ -0,0 +1,83 @@
+"""
+Utilities to compare option groups with the audit settings
+The expected options in rds_config.AUDIT_LOG_PARAMS are compiled once into {option name: {setting name: value}}, so
+each setting of an option group is checked with a dict lookup
+"""
+import os
+import sys
+import threading
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # util/
+sys.path.append(THIS_DIR)
+
+import rds_config
+
+# (AUDIT_LOG_PARAMS key, setting overrides): compiled options
+_compiled_options = {}
+_compiled_options_lock = threading.Lock()
+
+
+def with_option_settings(options, setting_values):
+    """
+    Return a copy of options with empty setting values filled in, leaving rds_config untouched
+    @param options: list of options from rds_config.AUDIT_LOG_PARAMS
+    @param setting_values: dict of setting name to value, used where the configured value is ''
+    @return: list of options
+    """
+    return [dict(option, OptionSettings=[
+        dict(setting, Value=setting_values.get(setting['Name'], ''))
+        if setting['Value'] == '' else dict(setting)
+        for setting in option['OptionSettings']
+    ]) if 'OptionSettings' in option else dict(option) for option in options]
+
+
+def compile_options(options):
+    """
+    Compile a list of options into nested dicts
+    @param options: list of options from rds_config.AUDIT_LOG_PARAMS
+    @return: dict of option name to dict of setting name to value
+    """
+    return {option['OptionName']: {setting['Name']: setting['Value'] for setting in option.get('OptionSettings', [])}
+            for option in options}
+
+
+def expected_options(options_key, setting_values=None):
+    """
+    Return the compiled options of rds_config.AUDIT_LOG_PARAMS[options_key], compiling them on first use
+    @param options_key: e.g. 'MYSQL_OPTIONS'
+    @param setting_values: values for settings configured as '', e.g. the SQL Server S3 bucket and IAM role ARNs
+    @return: dict of option name to dict of setting name to value
+    """
+    key = (options_key, tuple(sorted((setting_values or {}).items())))
+    compiled = _compiled_options.get(key)
+    if compiled is None:
+        options = rds_config.AUDIT_LOG_PARAMS[options_key]
+        if setting_values:
+            options = with_option_settings(options, setting_values)
+        compiled = compile_options(options)
+        with _compiled_options_lock:
+            _compiled_options[key] = compiled
+    return compiled
+
+
+def count_matching_options(expected, option_group):
+    """
+    Count the expected option settings found in an option group
+    An expected option without settings counts once, whether or not the option group has it
+    @param expected: compiled options returned by expected_options
+    @param option_group: describe_option_groups item
+    @return: (checked_count, valid_count)
+    """
+    current = {option['OptionName']: option.get('OptionSettings', []) for option in option_group['Options']}
+    checked_count = 0
+    valid_count = 0
+    for option_name, settings in expected.items():
+        if not settings:
+            checked_count += 1
+            valid_count += 1
+            continue
+        valid_count += len(settings)
+        for setting in current.get(option_name, []):
+            if setting['Name'] in settings and settings[setting['Name']] == setting.get('Value'):
+                checked_count += 1
+    return checked_count, valid_count
@@ -0,0 +1,175 @@
+"""
+Run the Oracle audit statements in a few round trips
+Statements are grouped into anonymous PL/SQL blocks. Each statement runs through EXECUTE IMMEDIATE in its own
+BEGIN ... EXCEPTION block, so one failing statement does not stop the rest, and its SQLERRM is returned through an
+out bind. ORACLE_SQL_EXECUTION_MODE=statement runs one statement per round trip as before
+
+read_audit_state() reads the audit options, audit tablespace, audit trail locations, cleanup settings and cleanup job
+already in place with one query, and pending_statements() drops the statements whose effect is already there
+"""
+import os
+import re
+
+# 'batch' groups statements into PL/SQL blocks, 'statement' runs each statement on its own
+ORACLE_SQL_EXECUTION_MODE = os.environ.get('oracle_sql_execution_mode', 'batch')
+# Statements per PL/SQL block. ~95 audit statements take 4 round trips
+ORACLE_BATCH_SIZE = int(os.environ.get('oracle_batch_size', '30'))
+# Size of each out bind holding SQLERRM
+ORACLE_ERROR_SIZE = 512
+# 'true' issues only the statements whose effect is missing, 'false' issues every statement on every run
+ORACLE_AUDIT_DELTA_CHECK = os.environ.get('oracle_audit_delta_check', 'true').lower() == 'true'
+
+AUDIT_TABLESPACE = 'AUDIT_TBLSPACE'
+
+# One read of everything set-audit-parameters.sql configures, as (kind, name, value, success, failure) rows. User
+# names are NULL for options audited for all users. success and failure are only set for options
+AUDIT_STATE_QUERY = (
+    "SELECT 'OPTION', audit_option, user_name, success, failure FROM dba_stmt_audit_opts "
+    "UNION ALL SELECT 'OPTION', privilege, user_name, success, failure FROM dba_priv_audit_opts "
+    "UNION ALL SELECT 'TABLESPACE', tablespace_name, NULL, NULL, NULL FROM dba_tablespaces "
+    f"WHERE tablespace_name = '{AUDIT_TABLESPACE}' "
+    "UNION ALL SELECT 'TRAIL', audit_trail, parameter_value, NULL, NULL FROM dba_audit_mgmt_config_params "
+    "WHERE parameter_name = 'DB AUDIT TABLESPACE' "
+    "UNION ALL SELECT 'CLEANUP', audit_trail, NULL, NULL, NULL FROM dba_audit_mgmt_config_params "
+    "WHERE parameter_name = 'DEFAULT CLEAN UP INTERVAL' "
+    "UNION ALL SELECT 'JOB', job_name, NULL, NULL, NULL FROM dba_scheduler_jobs WHERE job_name = 'UNIFIED_AUDIT'"
+)
+# success or failure of an option audited only WHENEVER SUCCESSFUL or WHENEVER NOT SUCCESSFUL
+NOT_AUDITED = 'NOT SET'
+
+# DBMS_AUDIT_MGMT trail type: audit_trail in dba_audit_mgmt_config_params
+AUDIT_TRAILS = {
+    'AUDIT_TRAIL_AUD_STD': 'STANDARD AUDIT TRAIL',
+    'AUDIT_TRAIL_FGA_STD': 'FGA AUDIT TRAIL',
+    'AUDIT_TRAIL_UNIFIED': 'UNIFIED AUDIT TRAIL',
+}
+
+
+def split_statements(sql_query):
+    """
+    Split rendered set-audit-parameters.sql into statements, one per non-empty line
+    @param sql_query:
+    @return: list of statements
+    """
+    return [sql for sql in sql_query.split("\n") if sql.strip()]
+
+
+def batch_block(statements):
+    """
+    Build an anonymous PL/SQL block running each statement with EXECUTE IMMEDIATE
+    The error of statement i is returned in bind :e<i>, NULL when it succeeded
+    @param statements:
+    @return: PL/SQL block
+    """
+    lines = ['BEGIN']
+    for index, statement in enumerate(statements):
+        sql = statement.replace("'", "''")
+        lines.append(f"  BEGIN EXECUTE IMMEDIATE '{sql}'; EXCEPTION WHEN OTHERS THEN :e{index} := SQLERRM; END;")
+    lines.append('END;')
+    return '\n'.join(lines)
+
+
+def read_audit_state(csr):
+    """
+    Read the audit configuration already in place with one query. AUDIT without WHENEVER audits both successful and
+    failed statements, so an option is only in place when neither success nor failure is NOT SET
+    @param csr: cx_Oracle cursor
+    @return: set of (kind, name, value) tuples, upper case
+    """
+    csr.execute(AUDIT_STATE_QUERY)
+    rows = [tuple((column or '').upper() for column in row) for row in csr.fetchall()]
+    return {row[:3] for row in rows if row[0] != 'OPTION' or NOT_AUDITED not in row[3:]}
+
+
+def statement_requirements(statement):
+    """
+    Return the audit state rows that show a statement has already taken effect
+    @param statement: statement from set-audit-parameters.sql
+    @return: list of (kind, name, value) tuples, None if the statement must always run
+    """
+    sql = ' '.join(statement.split()).upper()
+    if sql.startswith(f'CREATE BIGFILE TABLESPACE {AUDIT_TABLESPACE}'):
+        return [('TABLESPACE', AUDIT_TABLESPACE, '')]
+    if 'SET_AUDIT_TRAIL_LOCATION' in sql:
+        return [('TRAIL', trail, AUDIT_TABLESPACE) for trail_type, trail in AUDIT_TRAILS.items() if trail_type in sql]
+    if 'ALTER_PARTITION_INTERVAL' in sql:
+        # Set together with the unified audit trail location
+        return [('TRAIL', AUDIT_TRAILS['AUDIT_TRAIL_UNIFIED'], AUDIT_TABLESPACE)]
+    if 'INIT_CLEANUP' in sql:
+        return [('CLEANUP', AUDIT_TRAILS[trail_type], '')
+                for trail_type in ('AUDIT_TRAIL_AUD_STD', 'AUDIT_TRAIL_FGA_STD')]
+    if 'DBMS_SCHEDULER.CREATE_JOB' in sql and '"UNIFIED_AUDIT"' in sql:
+        return [('JOB', 'UNIFIED_AUDIT', '')]
+    match = re.fullmatch(r'AUDIT (.+?)(?: BY (\S+))?', sql)
+    if match:
+        return [('OPTION', match.group(1), match.group(2) or '')]
+    return None
+
+
+def pending_statements(logger, csr, statements):
+    """
+    Drop the statements whose effect is already in place. Every statement is kept if the audit state cannot be read
+    @param logger:
+    @param csr: cx_Oracle cursor
+    @param statements:
+    @return: list of statements to run
+    """
+    if not ORACLE_AUDIT_DELTA_CHECK:
+        return statements
+    try:
+        audit_state = read_audit_state(csr)
+    except Exception as err:  # pylint: disable=broad-except
+        logger.info(f'Unable to read the audit configuration, running every statement. Details={err}')
+        return statements
+
+    pending = []
+    for statement in statements:
+        requirements = statement_requirements(statement)
+        if requirements is None or not set(requirements) <= audit_state:
+            pending.append(statement)
+    logger.info(f'{len(statements) - len(pending)} of {len(statements)} Oracle audit statements already in place')
+    return pending
+
+
+def run_statements(logger, csr, statements, mode=None, batch_size=None):
+    """
+    Run statements on a cx_Oracle cursor
+    @param logger:
+    @param csr: cx_Oracle cursor
+    @param statements:
+    @param mode: 'batch' or 'statement', ORACLE_SQL_EXECUTION_MODE when None
+    @param batch_size: statements per PL/SQL block, ORACLE_BATCH_SIZE when None
+    @return: list of (statement, error message or None) in statement order
+    """
+    mode = mode or ORACLE_SQL_EXECUTION_MODE
+    batch_size = batch_size or ORACLE_BATCH_SIZE
+    if mode != 'batch':
+        return [_run_statement(csr, statement) for statement in statements]
+
+    results = []
+    blocks = single_statements = 0
+    for start in range(0, len(statements), batch_size):
+        batch = statements[start:start + batch_size]
+        error_vars = {f'e{index}': csr.var(str, ORACLE_ERROR_SIZE) for index in range(len(batch))}
+        blocks += 1
+        try:
+            csr.execute(batch_block(batch), error_vars)
+        except Exception as err:  # pylint: disable=broad-except
+            # The block itself failed, e.g. it did not parse. Run its statements one at a time instead
+            logger.info(f'PL/SQL batch failed, running {len(batch)} statements one at a time. Details={err}')
+            results.extend(_run_statement(csr, statement) for statement in batch)
+            single_statements += len(batch)
+            continue
+        results.extend((statement, error_vars[f'e{index}'].getvalue()) for index, statement in enumerate(batch))
+
+    logger.info(f'Ran {len(statements)} Oracle statements in {blocks + single_statements} round trips: {blocks} '
+                f'PL/SQL blocks and {single_statements} statements run one at a time after a block failed')
+    return results
+
+
+def _run_statement(csr, statement):
+    try:
+        csr.execute(statement)
+        return statement, None
+    except Exception as err:  # pylint: disable=broad-except
+        return statement, str(err)
@@ -0,0 +1,172 @@
+"""
+Utilities to read parameter group values and compare them with the audit settings
+"""
+import os
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+# A failed engine defaults read is retried after this long rather than for every parameter group
+ENGINE_DEFAULTS_FAILURE_TTL_SECONDS = int(os.environ.get('capability_failure_ttl_seconds', '300'))
+
+# (region, family, is_cluster): (expires at, None for loaded values, {parameter name: default value})
+_engine_defaults = {}
+_engine_defaults_locks = {}
+_engine_defaults_lock = threading.Lock()
+
+
+def read_parameter_values(rds_client, parameter_group_name, parameters, is_cluster=False, family=None):
+    """
+    Read the current values of the expected parameters from a DB or DB cluster parameter group.
+    User-modified parameters are read first; paging stops as soon as every expected parameter has been seen. A
+    parameter expected to be empty that is not user-modified has its engine default value, read once per family.
+    Other parameters not found among user-modified parameters, and expected-empty ones when the engine defaults
+    cannot be read, are looked up in the full parameter list, again stopping early
+    @param rds_client:
+    @param parameter_group_name:
+    @param parameters: expected parameters from rds_config.AUDIT_LOG_PARAMS
+    @param is_cluster: True for a DB cluster parameter group
+    @param family: parameter group family, read from the parameter group when None
+    @return: dict of parameter name to value, None when the parameter has no value
+    """
+    values = {}
+    remaining = {parameter['ParameterName'] for parameter in parameters}
+    expected_empty = {parameter['ParameterName'] for parameter in parameters if parameter.get('ParameterValue') == ""}
+    for source in ('user', None):
+        if source is None and remaining & expected_empty:
+            defaults = _defaults_of_group(rds_client, parameter_group_name, is_cluster, family)
+            for name in remaining & expected_empty & set(defaults):
+                values[name] = defaults[name]
+                remaining.discard(name)
+        if not remaining:
+            break
+        for parameter in _iter_parameters(rds_client, parameter_group_name, is_cluster, source):
+            name = parameter['ParameterName']
+            if name in remaining:
+                values[name] = parameter.get('ParameterValue')
+                remaining.discard(name)
+                if not remaining:
+                    break
+    return values
+
+
+def clear_engine_defaults():
+    with _engine_defaults_lock:
+        _engine_defaults.clear()
+        _engine_defaults_locks.clear()
+
+
+def parameter_matches(parameter, current_values):
+    """
+    Check if a parameter from rds_config.AUDIT_LOG_PARAMS matches the current value.
+    An expected empty value matches a parameter with no value set
+    @param parameter: dict with ParameterName and ParameterValue
+    @param current_values: dict returned by read_parameter_values
+    @return: True if the current value matches
+    """
+    name = parameter['ParameterName']
+    if name not in current_values:
+        return False
+    expected = parameter.get('ParameterValue')
+    current = current_values[name]
+    if expected == "":
+        return current in (None, "")
+    return current == expected
+
+
+def parameters_to_apply(parameters, current_values):
+    """
+    Return the parameters whose current value differs from the audit setting
+    @param parameters: list of dicts from rds_config.AUDIT_LOG_PARAMS
+    @param current_values: dict returned by read_parameter_values
+    @return: list of parameters to modify
+    """
+    return [parameter for parameter in parameters if not parameter_matches(parameter, current_values)]
+
+
+def log_types_enabled(enable_log_types, enabled_log_exports):
+    """
+    Check if every requested CloudWatch log type is already exported
+    @param enable_log_types: log types to enable, None or empty when none are requested
+    @param enabled_log_exports: EnabledCloudwatchLogsExports of the DB instance or cluster
+    @return: True if nothing needs enabling
+    """
+    requested = {log_type for log_type in (enable_log_types or []) if log_type}
+    return requested <= set(enabled_log_exports or [])
+
+
+def _iter_parameters(rds_client, parameter_group_name, is_cluster, source):
+    if is_cluster:
+        describe = rds_client.describe_db_cluster_parameters
+        kwargs = {'DBClusterParameterGroupName': parameter_group_name}
+    else:
+        describe = rds_client.describe_db_parameters
+        kwargs = {'DBParameterGroupName': parameter_group_name}
+    if source:
+        kwargs['Source'] = source
+
+    marker = None
+    while True:
+        response = describe(**kwargs, Marker=marker) if marker else describe(**kwargs)
+        yield from response.get('Parameters', [])
+        marker = response.get('Marker')
+        if not marker:
+            break
+
+
+def _defaults_of_group(rds_client, parameter_group_name, is_cluster, family):
+    # Engine default values of the group's family, {} when they cannot be read
+    try:
+        if family is None and is_cluster:
+            response = rds_client.describe_db_cluster_parameter_groups(DBClusterParameterGroupName=parameter_group_name)
+            family = response['DBClusterParameterGroups'][0]['DBParameterGroupFamily']
+        elif family is None:
+            response = rds_client.describe_db_parameter_groups(DBParameterGroupName=parameter_group_name)
+            family = response['DBParameterGroups'][0]['DBParameterGroupFamily']
+    except ClientError:
+        return {}
+    return _engine_default_values(rds_client, family, is_cluster)
+
+
+def _engine_default_values(rds_client, family, is_cluster):
+    key = (rds_client.meta.region_name, family, is_cluster)
+    entry = _engine_defaults.get(key)
+    if entry and (entry[0] is None or entry[0] > time.monotonic()):
+        return entry[1]
+
+    # One lock per family, the shared lock only guards the dicts
+    with _engine_defaults_lock:
+        key_lock = _engine_defaults_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        entry = _engine_defaults.get(key)
+        if entry and (entry[0] is None or entry[0] > time.monotonic()):
+            return entry[1]
+        try:
+            entry = (None, _load_engine_default_values(rds_client, family, is_cluster))
+        except ClientError:
+            entry = (time.monotonic() + ENGINE_DEFAULTS_FAILURE_TTL_SECONDS, {})
+        with _engine_defaults_lock:
+            _engine_defaults[key] = entry
+        return entry[1]
+
+
+def _load_engine_default_values(rds_client, family, is_cluster):
+    if is_cluster:
+        describe = rds_client.describe_engine_default_cluster_parameters
+    else:
+        describe = rds_client.describe_engine_default_parameters
+
+    defaults = {}
+    marker = None
+    while True:
+        kwargs = {'DBParameterGroupFamily': family}
+        if marker:
+            kwargs['Marker'] = marker
+        engine_defaults = describe(**kwargs)['EngineDefaults']
+        defaults.update((parameter['ParameterName'], parameter.get('ParameterValue'))
+                        for parameter in engine_defaults.get('Parameters', []))
+        marker = engine_defaults.get('Marker')
+        if not marker:
+            break
+    return defaults
@@ -0,0 +1,105 @@
+"""
+Roll the audit extensions out to every database on a Postgres instance
+Extensions are per database, so create-extension.sql only covers the database it runs in. Roles are checked once in
+pg_roles, then every database listed in pg_database is checked in pg_extension and the extension script runs only
+where an extension is missing. Databases are handled concurrently over a small number of connections
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# 'all' installs or verifies the extensions in every database, 'postgres' only in the postgres database as before
+POSTGRES_EXTENSION_SCOPE = os.environ.get('postgres_extension_scope', 'all')
+# Databases handled at once, each holding one connection
+POSTGRES_CONNECTION_POOL_SIZE = int(os.environ.get('postgres_connection_pool_size', '4'))
+
+DATABASES_QUERY = ("SELECT datname FROM pg_database "
+                   "WHERE datallowconn AND NOT datistemplate AND datname <> 'rdsadmin' ORDER BY datname")
+ROLES_QUERY = "SELECT rolname FROM pg_roles WHERE rolname = ANY(%s)"
+EXTENSIONS_QUERY = "SELECT extname FROM pg_extension WHERE extname = ANY(%s)"
+
+
+def _statements(sql):
+    # Statements outside -- comments
+    return '\n'.join(line for line in sql.split('\n') if not line.strip().startswith('--'))
+
+
+def created_roles(sql):
+    """
+    Return the roles a script creates
+    @param sql: rendered create-role.sql
+    @return: list of role names
+    """
+    return re.findall(r'CREATE ROLE\s+"?(\w+)"?', _statements(sql), re.IGNORECASE)
+
+
+def created_extensions(sql):
+    """
+    Return the extensions a script creates
+    @param sql: rendered create-extension.sql
+    @return: list of extension names
+    """
+    return re.findall(r'CREATE EXTENSION\s+(?:IF NOT EXISTS\s+)?"?(\w+)"?', _statements(sql), re.IGNORECASE)
+
+
+def missing_roles(csr, role_sql):
+    """
+    Check pg_roles for the roles of create-role.sql
+    @param csr: psycopg2 cursor
+    @param role_sql: rendered create-role.sql
+    @return: list of roles that do not exist
+    """
+    roles = created_roles(role_sql)
+    if not roles:
+        return []
+    csr.execute(ROLES_QUERY, (roles,))
+    existing = {row[0] for row in csr.fetchall()}
+    return [role for role in roles if role not in existing]
+
+
+def list_databases(csr):
+    """
+    List the databases that accept connections, without templates and rdsadmin
+    @param csr: psycopg2 cursor
+    @return: list of database names
+    """
+    csr.execute(DATABASES_QUERY)
+    return [row[0] for row in csr.fetchall()]
+
+
+def install_extensions(logger, connect, databases, extension_sql, pool_size=None):
+    """
+    Install or verify the extensions of create-extension.sql in each database
+    @param logger:
+    @param connect: function taking a database name and returning a new autocommit psycopg2 connection
+    @param databases: database names
+    @param extension_sql: rendered create-extension.sql
+    @param pool_size: connection limit, POSTGRES_CONNECTION_POOL_SIZE when None
+    @return: dict of database: 'verified', 'installed' or the error message
+    """
+    extensions = created_extensions(extension_sql)
+    if not databases or not extensions:
+        return {}
+
+    def install(database):
+        conn = None
+        try:
+            conn = connect(database)
+            csr = conn.cursor()
+            csr.execute(EXTENSIONS_QUERY, (extensions,))
+            if {row[0] for row in csr.fetchall()} >= set(extensions):
+                return database, 'verified'
+            csr.execute(extension_sql)
+            return database, 'installed'
+        except Exception as err:  # pylint: disable=broad-except
+            logger.error(f'Extensions {extensions} for database={database} failed. Details={err}')
+            return database, str(err)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    workers = min(pool_size or POSTGRES_CONNECTION_POOL_SIZE, len(databases))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(executor.map(install, databases))
+    logger.info(f'Extensions {extensions}: {results}')
+    return results
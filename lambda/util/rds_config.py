@@ -1,3 +1,5 @@
+import os
+
 # The following items are for RDS.
 ORACLE_FAMILY = 'oracle-ee'
 MYSQL_FAMILY = ['mysql', 'aurora-mysql']
@@ -8,6 +10,18 @@ MSSQL_S3_BUCKET_ARN = ""
 MSSQL_IAM_ROLE_ARN = ""
 MSSQL_IAM_ROLE_NAME = "ms-admin-sqlserver-to-s3"
 
+# MySQL 8.0 versions before this do not support the MARIADB_AUDIT_PLUGIN option
+MYSQL_MIN_AUDIT_VERSION = '8.0.25'
+
+# 'diff' reads current parameter values and only modifies parameters that differ, skipping modify_db_instance and
+# modify_db_cluster when the group and log exports are already in place. 'full' pushes every audit parameter each run
+PARAMETER_APPLY_MODE = os.environ.get('parameter_apply_mode', 'diff')
+
+# 'true' gives all members of an Aurora cluster one shared instance-level audit parameter group, named
+# <cluster>-<engine>-<major>-<minor>-members, instead of one group per member
+SHARED_MEMBER_PARAMETER_GROUP = os.environ.get('shared_member_parameter_group', 'false').lower() == 'true'
+SHARED_MEMBER_PARAMETER_GROUP_SUFFIX = '-members'
+
 # Changes to dynamic parameters are applied immediately. Changes to static parameters require a reboot without
 # fail-over to the DB cluster associated with the parameter group before the change can take effect.
 # hence for static param only pending-reboot and immediate for all else
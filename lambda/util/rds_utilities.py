@@ -1,24 +1,51 @@
 """
 Utilities to enable audit logging for RDS instances
+DB drivers and jinja2 are imported by the engine path that uses them, so Aurora and validation cold starts do not
+load the Oracle, ODBC or Postgres shared libraries
 """
+# pylint: disable=import-outside-toplevel
 import json
 import string
 import os
 import sys
 import platform
-import jinja2
+import threading
 import time
-import psycopg2
-import pyodbc
-import cx_Oracle
+import weakref
 from botocore.exceptions import ClientError
-from retry import retry
 
 THIS_DIR = os.path.dirname(os.path.realpath(__file__))
 UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../util'))  # util/
 sys.path.append(UTIL_DIR)
 import rds_config
-from exceptions import InvalidInputError, InvalidDataOrConfigurationError, FailedAuditLogEnableError
+import sql_templates
+import engine_capabilities
+from retry_policy import retry_with_policy
+from parameter_utilities import read_parameter_values, parameters_to_apply, log_types_enabled
+from option_utilities import with_option_settings
+from oracle_utilities import split_statements, pending_statements, run_statements
+from postgres_utilities import POSTGRES_EXTENSION_SCOPE, missing_roles, list_databases, install_extensions
+from sqlserver_utilities import SQLSERVER_AUDIT_FAST_PATH, FINGERPRINT_SCRIPT, SERVER_AUDIT_SCRIPT, \
+    SERVER_SPEC_SCRIPT, SINGLE_DATABASE_SPEC_SCRIPT, JOB_SCRIPT, action_groups, audit_settings, \
+    read_audit_fingerprint, plan_audit_scripts, expand_database_specs, apply_database_specs
+from exceptions import InvalidInputError, InvalidDataOrConfigurationError, FailedAuditLogEnableError, \
+    ResourceNotInStateError
+
+# group type: (describe method, name argument, response list key, not found error codes)
+GROUP_LOOKUPS = {
+    'db_parameter_group': ('describe_db_parameter_groups', 'DBParameterGroupName', 'DBParameterGroups',
+                           ['DBParameterGroupNotFound']),
+    'db_cluster_parameter_group': ('describe_db_cluster_parameter_groups', 'DBClusterParameterGroupName',
+                                   'DBClusterParameterGroups', ['DBParameterGroupNotFound']),
+    'option_group': ('describe_option_groups', 'OptionGroupName', 'OptionGroupsList', ['OptionGroupNotFoundFault']),
+}
+
+# Names of groups known to exist, per rds client. Pooled clients are bound to one account and region, so this is a
+# per account/region index. Only existing names are recorded; a name not in the index costs one targeted describe.
+# Pooled clients outlive the invocation, so the handler clears the index at the start of each invocation and a group
+# deleted out of band between warm invocations is looked up again
+_group_name_index = weakref.WeakKeyDictionary()
+_group_name_index_lock = threading.RLock()
 
 
 def set_log_types_db_instance(rds_client,
@@ -64,10 +91,13 @@ def set_log_types_db_instance(rds_client,
     # MySQL v5.x and 8.x (uses Option groups)
     if db_engine in rds_config.MYSQL_FAMILY:
         # For 8.0 engine_versions start from 8.0.11
-        if (major == '8' and minor == "0") and (db_engine_version < '8.0.25'):
-            raise InvalidInputError("Unsupported engine type detected. MySQL 8.0 version < 8.0.25")
+        if (major == '8' and minor == "0") and engine_capabilities.version_tuple(db_engine_version) < \
+                engine_capabilities.version_tuple(rds_config.MYSQL_MIN_AUDIT_VERSION):
+            raise InvalidInputError(f"Unsupported engine type detected. MySQL 8.0 version < "
+                                    f"{rds_config.MYSQL_MIN_AUDIT_VERSION}")
         logger.info('In db_engine=mysql')
-        enable_log_types = ["audit"]
+        enable_log_types = engine_capabilities.resolve_log_types(logger, rds_client, db_engine, db_engine_version,
+                                                                 ["audit"])
         option_group_changes(
             logger,
             rds_client,
@@ -85,41 +115,36 @@ def set_log_types_db_instance(rds_client,
 
         rds_to_s3_iam_role_arn, s3_log_bucket_with_prefix_arn = get_s3logbucket_and_role(logger, project_id, iam_client,
                                                                                          region)
-        rds_config.MSSQL_S3_BUCKET_ARN = s3_log_bucket_with_prefix_arn
-        rds_config.MSSQL_IAM_ROLE_ARN = rds_to_s3_iam_role_arn
+        # The bucket and role differ per account and region, so they are passed down instead of set in rds_config
+        option_settings = {'S3_BUCKET_ARN': s3_log_bucket_with_prefix_arn, 'IAM_ROLE_ARN': rds_to_s3_iam_role_arn}
 
+        # Option Group and Parameter Group are assigned in a single modify_db_instance
+        change_set = InstanceChangeSet(db_instance)
         # Enable Option Group to set Audit Logs. Apply=true enables SQLServer Audit logs else scripts won't run
         enable_log_types = []
         option_group_changes(logger, rds_client, db_instance, db_engine, db_major_version, db_instance_identifier,
-                             enable_log_types, apply_immediately=True)
+                             enable_log_types, apply_immediately=True, change_set=change_set,
+                             option_settings=option_settings)
 
         # Enable Parameter Group to enforce TLS 1.2
         instance_parameter_group_changes(logger, rds_client, db_instance, db_engine, major, minor,
                                          db_instance_identifier, enable_log_types=enable_log_types,
-                                         apply_immediately=db_apply_immediate)
+                                         apply_immediately=db_apply_immediate, change_set=change_set)
 
         # Transition from Available > Modifying > Available
-        logger.info('Wait for Option/Parameter group changes to take effect and for instance to go to Modifying state')
-        check_instance_state(logger, rds_client, db_instance_identifier, 'modifying')
+        if change_set.apply(logger, rds_client):
+            logger.info('Wait for Option/Parameter group changes to take effect and for instance to go to Modifying '
+                        'state')
+            check_instance_state(logger, rds_client, db_instance_identifier, 'modifying')
 
         logger.info('Waiting for instance to be in Available state with Audit Log enabled, before running SQL cmds')
         waiter = rds_client.get_waiter('db_instance_available')
         waiter.wait(DBInstanceIdentifier=db_instance_identifier)
 
         # Run SQL cmds
-        sql_server_run_sql_cmds(logger, host=db_instance["Endpoint"]['Address'], user=db_user, pwd=db_password)
-        # Enable Option Group
-        enable_log_types = []
-        option_group_changes(
-            logger,
-            rds_client,
-            db_instance,
-            db_engine,
-            db_major_version,
-            db_instance_identifier,
-            enable_log_types,
-            apply_immediately=db_apply_immediate,
-        )
+        sql_results = sql_server_run_sql_cmds(logger, host=db_instance["Endpoint"]['Address'], user=db_user,
+                                              pwd=db_password)
+        logger.info(f'SQL Server audit results={sql_results}')
     #
     # MySQL v8+ only (uses Param groups)
     elif (db_engine in rds_config.MYSQL_FAMILY) and (db_engine_version.startswith("8.")):
@@ -133,14 +158,16 @@ def set_log_types_db_instance(rds_client,
     elif db_engine in rds_config.POSTGRESQL_FAMILY:
         logger.info('In db_engine=postgres')
         # Run SQL cmds
-        postgresql_server_run_sql_cmds(
+        sql_results = postgresql_server_run_sql_cmds(
             logger,
             host=db_instance["Endpoint"]['Address'],
             user=db_user,
             pwd=db_password,
         )
+        logger.info(f'Postgres extension results={sql_results}')
         # Enable Parameter Group
-        enable_log_types = ["postgresql"]
+        enable_log_types = engine_capabilities.resolve_log_types(logger, rds_client, db_engine, db_engine_version,
+                                                                 ["postgresql"])
         instance_parameter_group_changes(logger, rds_client, db_instance, db_engine, major, minor,
                                          db_instance_identifier, enable_log_types=enable_log_types,
                                          apply_immediately=db_apply_immediate)
@@ -171,11 +198,13 @@ def set_log_types_db_instance(rds_client,
         if response['statusCode'] != 200:
             raise FailedAuditLogEnableError(response['body'])
 
-        # Enable Parameter Group
-        enable_log_types = ["audit"]
+        # Enable Parameter Group and Option Group in a single modify_db_instance
+        change_set = InstanceChangeSet(db_instance)
+        enable_log_types = engine_capabilities.resolve_log_types(logger, rds_client, db_engine, db_engine_version,
+                                                                 ["audit"])
         instance_parameter_group_changes(logger, rds_client, db_instance, db_engine, major, minor,
                                          db_instance_identifier, enable_log_types=enable_log_types,
-                                         apply_immediately=db_apply_immediate)
+                                         apply_immediately=db_apply_immediate, change_set=change_set)
         option_group_engine = major if db_major_version.startswith('19') else db_major_version
         option_group_changes(
             logger,
@@ -186,19 +215,21 @@ def set_log_types_db_instance(rds_client,
             db_instance_identifier,
             enable_log_types,
             apply_immediately=db_apply_immediate,
+            change_set=change_set,
         )
+        change_set.apply(logger, rds_client)
     else:
         raise InvalidDataOrConfigurationError('enable_mssql_handler > logTypes_db_instance: unsupported engine type')
 
     logger.info('Exiting set_log_types_db_instance()')
 
 
-@retry(tries=15, delay=2, backoff=1.5)
+@retry_with_policy()
 def check_instance_state(logger, rds_client, db_identifier, desired_state):
     response = rds_client.describe_db_instances(DBInstanceIdentifier=db_identifier)
     current_state = response['DBInstances'][0]['DBInstanceStatus']
     if current_state != desired_state:
-        raise FailedAuditLogEnableError(f'Instance not in state={desired_state}. Current state={current_state}')
+        raise ResourceNotInStateError(f'Instance not in state={desired_state}. Current state={current_state}')
     else:
         logger.info(f'Instance: {db_identifier} in state={desired_state}. Proceeding')
 
@@ -342,9 +373,60 @@ def create_iam_role_for_rds_to_s3(logger, iam_role_name, iam_client, s3_log_buck
     return rds_to_s3_role_arn
 
 
+# Parameter and Option group name index
+def group_exists(logger, rds_client, group_type, group_name):
+    """
+    Check if a parameter or option group exists with a single describe call by name
+    @param logger:
+    @param rds_client:
+    @param group_type: key of GROUP_LOOKUPS
+    @param group_name:
+    @return: True if group exists
+    """
+    if group_name in _group_names(rds_client, group_type):
+        logger.info(f'{group_type} {group_name} found in name index')
+        return True
+
+    describe_method, name_argument, list_key, not_found_codes = GROUP_LOOKUPS[group_type]
+    try:
+        response = getattr(rds_client, describe_method)(**{name_argument: group_name})
+    except ClientError as err:
+        if err.response['Error']['Code'] in not_found_codes:
+            logger.info(f'{group_type} {group_name} does not exist')
+            return False
+        raise
+    if not response.get(list_key):
+        return False
+    record_group_name(rds_client, group_type, group_name)
+    return True
+
+
+def record_group_name(rds_client, group_type, group_name):
+    """
+    Record an existing or newly created group in the name index
+    @param rds_client:
+    @param group_type: key of GROUP_LOOKUPS
+    @param group_name:
+    @return:
+    """
+    with _group_name_index_lock:
+        _group_names(rds_client, group_type).add(group_name)
+
+
+def clear_group_name_index():
+    with _group_name_index_lock:
+        _group_name_index.clear()
+
+
+def _group_names(rds_client, group_type):
+    with _group_name_index_lock:
+        return _group_name_index.setdefault(rds_client, {}).setdefault(group_type, set())
+
+
 # Start Instance Parameter Group changes
 def instance_parameter_group_changes(logger, rds_client, db_instance, db_engine, major, minor, db_instance_identifier,
-                                     enable_log_types=None, is_cluster=False, apply_immediately=True):
+                                     enable_log_types=None, is_cluster=False, apply_immediately=True,
+                                     change_set=None):
     """
     function to initialize rules associated with DB Engine
     @param is_cluster:
@@ -357,15 +439,11 @@ def instance_parameter_group_changes(logger, rds_client, db_instance, db_engine,
     @param db_instance_identifier:
     @param enable_log_types:
     @param apply_immediately:
-    @return:
+    @param change_set: InstanceChangeSet to add the parameter group to. None to modify the instance right away
+    @return: True if modify_db_instance was called
     """
     logger.info('Entering instance_parameter_group_changes()')
 
-    parameter_group_names = [
-        parameter_group["DBParameterGroupName"]
-        for parameter_group in rds_client.describe_db_parameter_groups()["DBParameterGroups"]
-    ]
-
     logger.info('In db_instance[DBParameterGroups]')
     db_parameter_group_name = db_instance["DBParameterGroups"][0]["DBParameterGroupName"]
 
@@ -383,66 +461,150 @@ def instance_parameter_group_changes(logger, rds_client, db_instance, db_engine,
     ###
     if db_parameter_group_name.startswith("default."):
         logger.info('In db_parameter_group_name.startswith(default.)')
-        if new_parameter_group_name not in parameter_group_names:
+        if not group_exists(logger, rds_client, 'db_parameter_group', new_parameter_group_name):
             # create new_parameter_group_name and assign params
             modify_instance_parameter_groups(logger, rds_client, "create", db_engine, major, minor,
-                                             new_parameter_group_name, is_cluster, db_parameter_group_name)
-        # update new_parameter_group_name and assign params
-        modify_instance_parameter_groups(logger, rds_client, "update", db_engine, major, minor,
-                                         new_parameter_group_name, is_cluster)
+                                             new_parameter_group_name, is_cluster, db_parameter_group_name,
+                                             db_engine_version=db_instance.get("EngineVersion"))
+        else:
+            # update new_parameter_group_name and assign params
+            modify_instance_parameter_groups(logger, rds_client, "update", db_engine, major, minor,
+                                             new_parameter_group_name, is_cluster,
+                                             db_engine_version=db_instance.get("EngineVersion"))
         db_parameter_group_name = new_parameter_group_name
     else:
         logger.info('db_parameter_group_name does not startswith(default.)')
         # update existing db_parameter_group_name and assign params
         modify_instance_parameter_groups(logger, rds_client, "update", db_engine, major, minor,
-                                         db_parameter_group_name, is_cluster)
-
-    modify_db_instance_parameter_group(logger, rds_client, db_instance_identifier, db_parameter_group_name,
-                                       apply_immediately, enable_log_types)
+                                         db_parameter_group_name, is_cluster,
+                                         db_engine_version=db_instance.get("EngineVersion"))
+
+    modified = False
+    if change_set is None:
+        change_set = InstanceChangeSet(db_instance)
+        change_set.add(parameter_group_name=db_parameter_group_name, enable_log_types=enable_log_types,
+                       apply_immediately=apply_immediately)
+        modified = change_set.apply(logger, rds_client)
+    else:
+        change_set.add(parameter_group_name=db_parameter_group_name, enable_log_types=enable_log_types,
+                       apply_immediately=apply_immediately)
 
     logger.info('Exiting instance_parameter_group_changes()')
+    return modified
 
 
-@retry(tries=15, delay=2, backoff=1.5)
-def modify_db_instance_parameter_group(logger, rds_client, db_instance_identifier, db_parameter_group_name,
-                                       apply_immediately,
-                                       enable_log_types):
+def instance_in_sync(db_instance, enable_log_types, parameter_group_name=None, option_group_name=None):
     """
-    Function to modify database instance param groups based on log_types
-    Retry settings provides a duration sufficient for database to be available before raising an exception
+    Check if DB instance already uses the audit parameter/option group and exports the requested log types
+    @param db_instance: DB instance description
+    @param enable_log_types:
+    @param parameter_group_name: expected DB parameter group, None to skip the check
+    @param option_group_name: expected option group, None to skip the check
+    @return: True if modify_db_instance would change nothing
+    """
+    if parameter_group_name and \
+            parameter_group_name not in [group["DBParameterGroupName"] for group in db_instance["DBParameterGroups"]]:
+        return False
+    if option_group_name and option_group_name not in \
+            [group["OptionGroupName"] for group in db_instance.get("OptionGroupMemberships", [])]:
+        return False
+    return log_types_enabled(enable_log_types, db_instance.get("EnabledCloudwatchLogsExports"))
+
+
+class InstanceChangeSet:
+    """
+    Collects the parameter group, option group and CloudWatch log exports for one DB instance, so an enablement sends
+    them in a single modify_db_instance instead of one per group
+    """
+
+    def __init__(self, db_instance):
+        self.db_instance = db_instance
+        self.db_instance_identifier = db_instance["DBInstanceIdentifier"]
+        self.parameter_group_name = None
+        self.option_group_name = None
+        self.enable_log_types = []
+        self.apply_immediately = False
+
+    def add(self, parameter_group_name=None, option_group_name=None, enable_log_types=None, apply_immediately=False):
+        """
+        Add changes to the change set. ApplyImmediately is set if any change asks for it
+        @param parameter_group_name:
+        @param option_group_name:
+        @param enable_log_types:
+        @param apply_immediately:
+        @return:
+        """
+        if parameter_group_name:
+            self.parameter_group_name = parameter_group_name
+        if option_group_name:
+            self.option_group_name = option_group_name
+        for log_type in enable_log_types or []:
+            if log_type and log_type not in self.enable_log_types:
+                self.enable_log_types.append(log_type)
+        self.apply_immediately = self.apply_immediately or bool(apply_immediately)
+
+    def is_empty(self):
+        return not (self.parameter_group_name or self.option_group_name or self.enable_log_types)
+
+    def in_sync(self):
+        return instance_in_sync(self.db_instance, self.enable_log_types, parameter_group_name=self.parameter_group_name,
+                                option_group_name=self.option_group_name)
+
+    def modify_kwargs(self):
+        """
+        @return: keyword arguments for rds_client.modify_db_instance
+        """
+        modify_kwargs = {
+            'DBInstanceIdentifier': self.db_instance_identifier,
+            'ApplyImmediately': self.apply_immediately,
+        }
+        if self.parameter_group_name:
+            modify_kwargs['DBParameterGroupName'] = self.parameter_group_name
+        if self.option_group_name:
+            modify_kwargs['OptionGroupName'] = self.option_group_name
+        if self.enable_log_types:
+            modify_kwargs['CloudwatchLogsExportConfiguration'] = {"EnableLogTypes": self.enable_log_types}
+        return modify_kwargs
+
+    def apply(self, logger, rds_client):
+        """
+        Send the collected changes in one modify_db_instance
+        @param logger:
+        @param rds_client:
+        @return: True if modify_db_instance was called
+        """
+        if self.is_empty():
+            return False
+        if rds_config.PARAMETER_APPLY_MODE == 'diff' and self.in_sync():
+            logger.info(f'Parameter group {self.parameter_group_name}, option group {self.option_group_name} and log '
+                        f'types {self.enable_log_types} already applied to {self.db_instance_identifier}. '
+                        f'Skipping modify_db_instance')
+            return False
+        modify_db_instance(logger, rds_client, self.modify_kwargs())
+        return True
+
+
+@retry_with_policy()
+def modify_db_instance(logger, rds_client, modify_kwargs):
+    """
+    Function to modify database instance with backoff/retry on exception
+    Retried by retry_policy while the database is busy, throttled or briefly unavailable
     @param logger:
     @param rds_client:
-    @param db_instance_identifier:
-    @param db_parameter_group_name:
-    @param apply_immediately:
-    @param enable_log_types:
+    @param modify_kwargs: keyword arguments built by InstanceChangeSet
     @return:
     """
-    logger.info('Entering modify_db_instance_parameter_group()')
-
-    if enable_log_types is not None:
-        logger.info('rds_client.modify_db_instance_parameter_group with enable_log_types != None')
-        rds_client.modify_db_instance(
-            DBInstanceIdentifier=db_instance_identifier,
-            DBParameterGroupName=db_parameter_group_name,
-            ApplyImmediately=apply_immediately,
-            CloudwatchLogsExportConfiguration={
-                "EnableLogTypes": enable_log_types
-            },
-        )
-    else:
-        logger.info('rds_client.modify_db_instance with enable_log_types == None')
-        rds_client.modify_db_instance(
-            DBInstanceIdentifier=db_instance_identifier,
-            DBParameterGroupName=db_parameter_group_name,
-            ApplyImmediately=apply_immediately,
-        )
+    logger.info(f'Entering modify_db_instance() with {modify_kwargs}')
+    rds_client.modify_db_instance(**modify_kwargs)
+    logger.info('Exiting modify_db_instance()')
 
 
 def get_instance_parameter_group_family(logger, parameter_group_name, db_engine, default_parameter_group_name, major,
-                                        minor, rds_client, task):
+                                        minor, rds_client, task, db_engine_version=None):
     """
     function to return instance parameter group family
+    The family comes from the engine capability cache. The parameter group or engine name is only used when the
+    engine version is not listed by describe_db_engine_versions
     @param logger:
     @param parameter_group_name:
     @param db_engine:
@@ -451,9 +613,17 @@ def get_instance_parameter_group_family(logger, parameter_group_name, db_engine,
     @param minor:
     @param rds_client:
     @param task:
+    @param db_engine_version:
     @return:
     """
     logger.info('Entering get_instance_parameter_group_family')
+    if db_engine_version:
+        instance_parameter_group_family = engine_capabilities.parameter_group_family(logger, rds_client, db_engine,
+                                                                                     db_engine_version)
+        if instance_parameter_group_family:
+            logger.info(f'instance_parameter_group_family = {instance_parameter_group_family}')
+            return instance_parameter_group_family
+
     if db_engine in ['aurora-postgresql', 'postgres', 'oracle-ee', 'oracle-se2'] or \
             db_engine in rds_config.MSSQL_FAMILY:
         # During 'create' use default_cluster_parameter_group else use existing or newly created group name
@@ -476,7 +646,7 @@ def get_instance_parameter_group_family(logger, parameter_group_name, db_engine,
 
 
 def modify_instance_parameter_groups(logger, rds_client, task, db_engine, major, minor, parameter_group_name,
-                                     is_cluster, default_parameter_group_name=None):
+                                     is_cluster, default_parameter_group_name=None, db_engine_version=None):
     """
     function to set instance parameters based on engine type
     @param logger:
@@ -487,6 +657,7 @@ def modify_instance_parameter_groups(logger, rds_client, task, db_engine, major,
     @param minor:
     @param parameter_group_name:
     @param default_parameter_group_name:
+    @param db_engine_version:
     @return:
     """
     logger.info('Entering modify_instance_parameter_groups()')
@@ -496,7 +667,7 @@ def modify_instance_parameter_groups(logger, rds_client, task, db_engine, major,
     # Get instance param group family
     parameter_group_family = get_instance_parameter_group_family(logger, parameter_group_name, db_engine,
                                                                  default_parameter_group_name, major,
-                                                                 minor, rds_client, task)
+                                                                 minor, rds_client, task, db_engine_version)
     #
     # Engine= MySQL. Applies to both Aurora cluster and RDS instances
     #
@@ -523,7 +694,8 @@ def modify_instance_parameter_groups(logger, rds_client, task, db_engine, major,
                     "ParameterValue": "1",
                     "ApplyMethod": "immediate",
                 }
-                parameters.append(ssl_param)
+                # copy so the shared rds_config list does not grow on every warm invocation
+                parameters = parameters + [ssl_param]
     # Engine= MS-SQLSERVER. Instance only
     #
     elif db_engine in rds_config.MSSQL_FAMILY:
@@ -541,12 +713,12 @@ def modify_instance_parameter_groups(logger, rds_client, task, db_engine, major,
     logger.info('Exiting modify_instance_parameter_groups()')
 
 
-@retry(tries=15, delay=2, backoff=1.5)
+@retry_with_policy()
 def create_modify_parameter_groups(logger, rds_client, task, parameter_group_name, parameter_group_family, parameters,
                                    description):
     """
     Function to create or modify database param group
-    Retry settings provides a duration sufficient for database to be available before raising an exception
+    Retried by retry_policy while the database is busy, throttled or briefly unavailable
     @param logger:
     @param rds_client:
     @param task:
@@ -554,17 +726,32 @@ def create_modify_parameter_groups(logger, rds_client, task, parameter_group_nam
     @param parameter_group_family:
     @param parameters:
     @param description:
-    @return:
+    @return: True if parameters were modified
     """
     logger.info('Entering create_modify_parameter_groups()')
+    if task == "update" and rds_config.PARAMETER_APPLY_MODE == 'diff':
+        current_values = read_parameter_values(rds_client, parameter_group_name, parameters,
+                                               family=parameter_group_family)
+        parameters = parameters_to_apply(parameters, current_values)
+        if not parameters:
+            logger.info(f'Parameter group {parameter_group_name} already has audit parameters. Skipping modify')
+            return False
+        logger.info(f'Modifying {[parameter["ParameterName"] for parameter in parameters]} in {parameter_group_name}')
     if task == "create":
         logger.info('In task == "create" for rds_client.create_db_parameter_group')
         # Create RDS Option Group
-        rds_client.create_db_parameter_group(
-            DBParameterGroupName=parameter_group_name,
-            DBParameterGroupFamily=parameter_group_family,
-            Description=description,
-        )
+        try:
+            rds_client.create_db_parameter_group(
+                DBParameterGroupName=parameter_group_name,
+                DBParameterGroupFamily=parameter_group_family,
+                Description=description,
+            )
+        except ClientError as err:
+            # Created by a concurrent enablement or an earlier attempt of this retry loop
+            if err.response['Error']['Code'] != 'DBParameterGroupAlreadyExists':
+                raise
+            logger.info(f'Parameter group {parameter_group_name} already exists')
+        record_group_name(rds_client, 'db_parameter_group', parameter_group_name)
     if task in ["create", "update"]:
         logger.info('In task=="create" or task=="update" for rds_client.create_db_parameter_group')
         # Add options to RDS Option Group
@@ -573,11 +760,12 @@ def create_modify_parameter_groups(logger, rds_client, task, parameter_group_nam
             Parameters=parameters
         )
     logger.info('Exiting create_modify_parameter_groups()')
+    return True
 
 
 # Start Option Group changes
 def option_group_changes(logger, rds_client, db_instance, db_engine, db_major_version, db_instance_identifier,
-                         enable_log_types, apply_immediately=True):
+                         enable_log_types, apply_immediately=True, change_set=None, option_settings=None):
     """
     function to apply option group changes
     @param logger:
@@ -588,15 +776,12 @@ def option_group_changes(logger, rds_client, db_instance, db_engine, db_major_ve
     @param db_instance_identifier:
     @param enable_log_types:
     @param apply_immediately:
-    @return:
+    @param change_set: InstanceChangeSet to add the option group to. None to modify the instance right away
+    @param option_settings: values for option settings configured as '', e.g. the SQL Server S3 bucket and IAM role ARNs
+    @return: True if modify_db_instance was called
     """
     logger.info('Entering option_group_changes()')
-
-    logger.info('In task=create')
-    option_group_names = [
-        option_group["OptionGroupName"]
-        for option_group in rds_client.describe_option_groups()["OptionGroupsList"]
-    ]
+    modified = False
 
     if db_instance["OptionGroupMemberships"]:
         logger.info('In db_instance["OptionGroupMemberships"]')
@@ -614,53 +799,40 @@ def option_group_changes(logger, rds_client, db_instance, db_engine, db_major_ve
         if option_group_name.startswith("default:"):
             logger.info('In option_group_name.startswith("default:")')
 
-            if new_option_group_name not in option_group_names:
+            if not group_exists(logger, rds_client, 'option_group', new_option_group_name):
                 # create new_option_group_name and assign audit plugin
-                modify_option_groups(logger, rds_client, "create", db_engine, db_major_version, new_option_group_name)
-
-            # update new_parameter_group_name and assign params
-            modify_option_groups(logger, rds_client, "update", db_engine, db_major_version, new_option_group_name)
+                modify_option_groups(logger, rds_client, "create", db_engine, db_major_version, new_option_group_name,
+                                     option_settings)
+            else:
+                # update new_parameter_group_name and assign params
+                modify_option_groups(logger, rds_client, "update", db_engine, db_major_version, new_option_group_name,
+                                     option_settings)
 
             option_group_name = new_option_group_name
         else:
             logger.info('Not in option_group_name.startswith("default:")')
 
             # update option_group_name with audit plugin
-            modify_option_groups(logger, rds_client, "update", db_engine, db_major_version, option_group_name)
+            modify_option_groups(logger, rds_client, "update", db_engine, db_major_version, option_group_name,
+                                 option_settings)
 
         # assign option_group_name and LogTypes to DB
-        modify_db_instance_option_group(logger, rds_client, db_instance_identifier, option_group_name,
-                                        apply_immediately, enable_log_types)
+        if change_set is None:
+            change_set = InstanceChangeSet(db_instance)
+            change_set.add(option_group_name=option_group_name, enable_log_types=enable_log_types,
+                           apply_immediately=apply_immediately)
+            modified = change_set.apply(logger, rds_client)
+        else:
+            change_set.add(option_group_name=option_group_name, enable_log_types=enable_log_types,
+                           apply_immediately=apply_immediately)
 
     logger.info('Exiting option_group_changes()')
-
-
-@retry(tries=15, delay=2, backoff=1.5)
-def modify_db_instance_option_group(logger, rds_client, db_instance_identifier, option_group_name, apply_immediately,
-                                    enable_log_types):
-    """
-    Function to modify db instance with backoff/retry on exception
-    Retry settings provides a duration sufficient for database to be available before raising an exception
-    @param logger:
-    @param rds_client:
-    @param db_instance_identifier:
-    @param option_group_name:
-    @param apply_immediately:
-    @param enable_log_types:
-    @return:
-    """
-    logger.info('Entering modify_db_instance_option_group()')
-    rds_client.modify_db_instance(
-        DBInstanceIdentifier=db_instance_identifier,
-        OptionGroupName=option_group_name,
-        ApplyImmediately=apply_immediately,
-        CloudwatchLogsExportConfiguration={"EnableLogTypes": enable_log_types},
-    )
-    logger.info('Exiting modify_db_instance_option_group()')
+    return modified
 
 
 # Options Groups - Create or Update
-def modify_option_groups(logger, rds_client, task, db_engine, db_major_version, option_group_name):
+def modify_option_groups(logger, rds_client, task, db_engine, db_major_version, option_group_name,
+                         option_settings=None):
     """
     function to apply option group changes
     @param logger:
@@ -669,6 +841,7 @@ def modify_option_groups(logger, rds_client, task, db_engine, db_major_version,
     @param db_engine:
     @param db_major_version:
     @param option_group_name:
+    @param option_settings: values for option settings configured as '', e.g. the SQL Server S3 bucket and IAM role ARNs
     @return:
     """
     logger.info('Entering modify_option_groups()')
@@ -682,11 +855,7 @@ def modify_option_groups(logger, rds_client, task, db_engine, db_major_version,
         logger.info('In db_engine=sqlserver')
         options_to_include = rds_config.AUDIT_LOG_PARAMS['SQLSERVER_OPTIONS']
         if len(options_to_include) == 1:
-            for options in (options_to_include[0]["OptionSettings"]):
-                if options['Name'] == 'S3_BUCKET_ARN' and options['Value'] == '':
-                    options['Value'] = rds_config.MSSQL_S3_BUCKET_ARN
-                if options['Name'] == 'IAM_ROLE_ARN' and options['Value'] == '':
-                    options['Value'] = rds_config.MSSQL_IAM_ROLE_ARN
+            options_to_include = with_option_settings(options_to_include, option_settings or {})
         else:
             raise FailedAuditLogEnableError("Invalid rds_config.MSSQL_FAMILY configuration")
 
@@ -694,6 +863,13 @@ def modify_option_groups(logger, rds_client, task, db_engine, db_major_version,
         logger.info('In db_engine=ORACLE_FAMILY')
         options_to_include = rds_config.AUDIT_LOG_PARAMS['ORACLE_OPTIONS']
 
+    # Fail here rather than after the create/modify retries when the engine version does not offer an option
+    missing_options = engine_capabilities.unsupported_options(logger, rds_client, db_engine, db_major_version,
+                                                              [option['OptionName'] for option in options_to_include])
+    if missing_options:
+        raise InvalidDataOrConfigurationError(f'{db_engine} {db_major_version} option groups do not offer '
+                                              f'{missing_options}')
+
     description = "For %s %s audit logging" % (db_engine, db_major_version)
 
     create_or_update_option_groups(logger, rds_client, task, option_group_name, options_to_include, True, db_engine,
@@ -702,12 +878,12 @@ def modify_option_groups(logger, rds_client, task, db_engine, db_major_version,
     logger.info('Exiting modify_option_groups()')
 
 
-@retry(tries=15, delay=2, backoff=1.5)
+@retry_with_policy()
 def create_or_update_option_groups(logger, rds_client, task, option_group_name, options_to_include, apply_immediately,
                                    db_engine, db_major_version, description):
     """
     Function to create or modify option group changes
-    Retry settings provides a duration sufficient for database to be available before raising an exception
+    Retried by retry_policy while the database is busy, throttled or briefly unavailable
     @param logger:
     @param rds_client:
     @param task:
@@ -723,12 +899,20 @@ def create_or_update_option_groups(logger, rds_client, task, option_group_name,
     if task == "create":
         logger.info('In task=create')
         # Create RDS Option Group
-        rds_client.create_option_group(
-            OptionGroupName=option_group_name,
-            OptionGroupDescription=description,
-            EngineName=db_engine,
-            MajorEngineVersion=db_major_version,
-        )
+        try:
+            rds_client.create_option_group(
+                OptionGroupName=option_group_name,
+                OptionGroupDescription=description,
+                EngineName=db_engine,
+                MajorEngineVersion=db_major_version,
+            )
+        except ClientError as err:
+            # Option group names are shared by every DB of the engine version, so a concurrent enablement may have
+            # created it first
+            if err.response['Error']['Code'] != 'OptionGroupAlreadyExistsFault':
+                raise
+            logger.info(f'Option group {option_group_name} already exists')
+        record_group_name(rds_client, 'option_group', option_group_name)
     if task in ["create", "update"]:
         logger.info('In task=create or update')
         # Add options to RDS Option Group
@@ -769,7 +953,7 @@ def valid_file_name_creator(file_name):
 #
 def render_sql(logger, sql_file, engine_type, kwargs=None):
     """
-    Renders the sql file located in the path ./sql/<engine>/<sql_file>
+    Renders the sql file located in the path ./sql/<engine>/<sql_file> using the compiled template cache
 
     Args
         sql_file (str): The sql file name.
@@ -781,20 +965,7 @@ def render_sql(logger, sql_file, engine_type, kwargs=None):
         statement as a string otherwise.
     """
     logger.info('Entering render_sql()')
-
-    if not kwargs:
-        kwargs = {}
-    this_dir = os.path.dirname(__file__)
-    try:
-        f = open(os.path.join(this_dir, 'sql', engine_type, sql_file))
-    except Exception as err:  # pylint: disable=broad-except
-        print(f'render_sql() exception: {err}')
-        return ''
-
-    raw = f.read()
-    t = jinja2.Template(raw)
-    result = t.render(**kwargs)
-
+    result = sql_templates.render_sql(logger, sql_file, engine_type, kwargs)
     logger.info('Exiting render_sql()')
 
     return result
@@ -804,40 +975,57 @@ def render_sql(logger, sql_file, engine_type, kwargs=None):
 def postgresql_server_run_sql_cmds(logger, host, user, pwd):
     """
     Runs the SQL files on the server
+    The roles are created on the postgres database when pg_roles does not have them. The extensions are installed in
+    every database listed in pg_database that does not have them in pg_extension, over a bounded pool of connections.
+    With POSTGRES_EXTENSION_SCOPE=postgres only the postgres database gets the extensions
     :param logger:
     :param host:
     :param user:
     :param pwd:
-    :return:
+    :return: dict of database: 'verified', 'installed' or the error message
     """
     logger.info('Entering postgresql_server_run_sql_cmds()')
+    import psycopg2
 
     database_name = "postgres"
 
-    logger.info(f'Connecting.. database={database_name}, user={user}, password=***, host={host}')
-    conn = psycopg2.connect(
-        database=database_name,
-        user=user,
-        password=pwd,
-        host=host,
-    )
-    conn.autocommit = True
-    csr = conn.cursor()
+    def connect(database):
+        conn = psycopg2.connect(
+            database=database,
+            user=user,
+            password=pwd,
+            host=host,
+        )
+        conn.autocommit = True
+        return conn
 
-    files = ['create-role.sql', 'create-extension.sql']
+    logger.info(f'Connecting.. database={database_name}, user={user}, password=***, host={host}')
+    conn = connect(database_name)
+    try:
+        csr = conn.cursor()
 
-    for file in files:
+        role_sql = render_sql(logger, 'create-role.sql', 'postgres')
         try:
-            sql = render_sql(logger, file, 'postgres')
-            if not sql:
-                continue
-            csr.execute(sql)
-            logger.info(f'Executed SQL: {sql}')
+            if role_sql and missing_roles(csr, role_sql):
+                csr.execute(role_sql)
+                logger.info(f'Executed SQL: {role_sql}')
         except Exception as err:  # pylint: disable=broad-except
             logger.error(f'Exception: {err}')
-            continue
+
+        databases = [database_name]
+        if POSTGRES_EXTENSION_SCOPE == 'all':
+            try:
+                databases = list_databases(csr)
+            except Exception as err:  # pylint: disable=broad-except
+                logger.error(f'Unable to list the databases, using {database_name} only. Details={err}')
+    finally:
+        conn.close()
+
+    extension_sql = render_sql(logger, 'create-extension.sql', 'postgres')
+    results = install_extensions(logger, connect, databases, extension_sql) if extension_sql else {}
 
     logger.info('Exiting postgresql_server_run_sql_cmds()')
+    return results
 
 
 #
@@ -846,54 +1034,96 @@ def postgresql_server_run_sql_cmds(logger, host, user, pwd):
 def sql_server_run_sql_cmds(logger, host, user, pwd, port=1433):
     """
     Runs the SQL files on the server
+    Server level scripts run on one connection to master. Database audit specifications are applied per database over
+    a bounded pool of connections
     :param logger:
     :param host:
     :param user:
     :param pwd:
     :param port:
-    :return:
+    :return: dict with the result of each script and of each database specification, None on success else the error
     """
+    import pyodbc
+
     db = "master"
     logger.info(f'Connecting.. database={db}, user={user}, password=***, host={host}')
-    try:
-        if platform.system() == "Windows":
+    if platform.system() == "Windows":
+        connstr = (
+            f"DRIVER={{SQL Server}};SERVER={host},{port};"
+            f"DATABASE={db};UID={user};PWD={pwd};"
+        )
+    else:
+        if db:
             connstr = (
-                f"DRIVER={{SQL Server}};SERVER={host},{port};"
-                f"DATABASE={db};UID={user};PWD={pwd};"
+                f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={host},{port};"
+                f"DB={db};UID={user};PWD={pwd};"
             )
         else:
-            if db:
-                connstr = (
-                    f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={host},{port};"
-                    f"DB={db};UID={user};PWD={pwd};"
-                )
-            else:
-                connstr = (
-                    f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={host},{port};"
-                    f"UID={user};PWD={pwd};"
-                )
+            connstr = (
+                f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={host},{port};"
+                f"UID={user};PWD={pwd};"
+            )
 
-        conn = pyodbc.connect(connstr, autocommit=True)
+    def connect():
+        return pyodbc.connect(connstr, autocommit=True)
+
+    results = {'scripts': {}, 'databases': {}}
+    try:
+        conn = connect()
         csr = conn.cursor()
 
-        files = ['configure-server-audit.sql',
-                 'configure-server-level-audit-spec.sql',
-                 'configure-database-level-audit-spec.sql',
-                 'create-s3-events-job-and-add-audit-to-new-dbs.sql']
+        scripts = expand_database_specs(plan_sql_server_scripts(logger, csr), csr)
+        database_sqls = [(kwargs['DBNAME'], render_sql(logger, file, 'sqlserver', kwargs=kwargs))
+                         for file, kwargs in scripts if file == SINGLE_DATABASE_SPEC_SCRIPT]
+        server_scripts = [file for file, _ in scripts if file != SINGLE_DATABASE_SPEC_SCRIPT]
 
-        for file in files:
+        # The server audit and server specification come before the database specifications, the job after them
+        for file in server_scripts:
+            if file == JOB_SCRIPT:
+                results['databases'] = apply_database_specs(logger, connect, database_sqls)
+                database_sqls = []
             try:
                 sql = render_sql(logger, file, 'sqlserver')
                 if not sql:
                     continue
                 csr.execute(sql)
                 print("Executed: ", sql)
+                results['scripts'][file] = None
             except Exception as err:  # pylint: disable=broad-except
                 print("Exception: ", err)
+                results['scripts'][file] = str(err)
                 continue
+        if database_sqls:
+            results['databases'] = apply_database_specs(logger, connect, database_sqls)
     except Exception as err:
         logger.error(f"connecting {host}:{port} exception: {err}")
         raise InvalidDataOrConfigurationError(str(err))
+    return results
+
+
+def plan_sql_server_scripts(logger, csr):
+    """
+    Fingerprint the existing audit objects and return the scripts still needed
+    Every script is returned if the fast path is off or the fingerprint cannot be read
+    @param logger:
+    @param csr: pyodbc cursor on master
+    @return: list of (script, render kwargs)
+    """
+    if not SQLSERVER_AUDIT_FAST_PATH:
+        return plan_audit_scripts(None, set(), set())
+    try:
+        fingerprint = read_audit_fingerprint(csr, render_sql(logger, FINGERPRINT_SCRIPT, 'sqlserver'))
+    except Exception as err:  # pylint: disable=broad-except
+        logger.info(f'Unable to fingerprint audit objects, running every script. Details={err}')
+        return plan_audit_scripts(None, set(), set())
+
+    server_spec_groups = action_groups(render_sql(logger, SERVER_SPEC_SCRIPT, 'sqlserver'))
+    database_spec_groups = action_groups(render_sql(logger, SINGLE_DATABASE_SPEC_SCRIPT, 'sqlserver',
+                                                    kwargs={'DBNAME': 'db'}))
+    expected_audit_settings = audit_settings(render_sql(logger, SERVER_AUDIT_SCRIPT, 'sqlserver'))
+    scripts = plan_audit_scripts(fingerprint, server_spec_groups, database_spec_groups, expected_audit_settings)
+    logger.info(f'SQL Server audit fingerprint={fingerprint}, scripts to run={scripts}')
+    return scripts
 
 
 #
@@ -912,6 +1142,8 @@ def oracle_server_run_sql_cmds(logger, host, user, pwd, db_name, db_engine_versi
     :return:
     """
     logger.info('Entering oracle_server_run_sql_cmds()')
+    import cx_Oracle
+
     try:
         logger.info(f'Connecting.. database={db_name}, user={user}, password=***, host={host}')
         dsn = cx_Oracle.makedsn(host, port, db_name)
@@ -921,18 +1153,15 @@ def oracle_server_run_sql_cmds(logger, host, user, pwd, db_name, db_engine_versi
         kwargs = {'VERSION': db_engine_version, 'MASTER_USERNAME': user}
         sql_query = render_sql(logger, 'set-audit-parameters.sql', 'oracle', kwargs=kwargs)
 
-        sql_statement_list = []
-        for sql in sql_query.split("\n"):
-            if sql:
-                sql_statement_list.append(sql)
+        # Statements already in effect are skipped after one read of the audit configuration
+        sql_statement_list = pending_statements(logger, csr, split_statements(sql_query))
 
-        for sql_statement in sql_statement_list:
-            try:
-                csr.execute(sql_statement)
-                print('set audit parameters for RDS Database {} for sql {}'.format(host, sql_statement))
-            except Exception as err:  # pylint: disable=broad-except
+        for sql_statement, err in run_statements(logger, csr, sql_statement_list):
+            if err:
                 print(
                     f'Error while setting audit parameters for RDS Database={host}, SQL={sql_statement}. Details={err}')
+            else:
+                print('set audit parameters for RDS Database {} for sql {}'.format(host, sql_statement))
 
     except Exception as err:
         logger.error(f"connecting {host}:{port} exception: {err}")
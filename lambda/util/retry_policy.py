@@ -0,0 +1,210 @@
+"""
+Retry policy for AWS API calls
+Errors are classified as throttling (retry now with jittered backoff), wait-for-state (the resource is busy, retry
+with a longer backoff) or fail-fast (retrying cannot help). Throttling retries draw from a token bucket shared by all
+threads working on the same account and region, so concurrent work backs off together instead of retrying in step
+"""
+import functools
+import inspect
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import weakref
+
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, ReadTimeoutError
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # util/
+sys.path.append(THIS_DIR)
+
+from exceptions import ResourceNotInStateError
+
+lgr = logging.getLogger()
+
+THROTTLING = 'throttling'
+WAIT_FOR_STATE = 'wait_for_state'
+FAIL_FAST = 'fail_fast'
+
+THROTTLING_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException', 'RequestThrottled',
+    'TooManyRequestsException', 'RequestLimitExceeded', 'SlowDown', 'PriorRequestNotComplete',
+    'InternalFailure', 'InternalError', 'ServiceUnavailable', 'RequestTimeout', 'RequestTimeoutException',
+}
+WAIT_FOR_STATE_ERROR_CODES = {
+    'InvalidDBInstanceState', 'InvalidDBInstanceStateFault', 'InvalidDBClusterStateFault',
+    'InvalidDBParameterGroupState', 'InvalidDBParameterGroupStateFault', 'InvalidOptionGroupStateFault',
+}
+
+# category: (max attempts, base delay in seconds, max delay in seconds)
+# Waiting for state allows ~10m in the worst case and ~5m on average with full jitter
+RETRY_SETTINGS = {
+    THROTTLING: (8, 0.5, 20),
+    WAIT_FOR_STATE: (15, 2, 60),
+}
+
+# Shared retry budget per (account, region). Each throttling retry takes a token and tokens refill over time. Once
+# the bucket is empty, throttled calls fail instead of adding load
+RETRY_BUDGET_CAPACITY = 100
+RETRY_BUDGET_REFILL_PER_SECOND = 1.0
+
+_retry_budgets = {}
+_retry_budgets_lock = threading.Lock()
+# client: account id, filled in by client_utilities.ClientPool
+_client_accounts = weakref.WeakKeyDictionary()
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket
+    """
+
+    def __init__(self, capacity=RETRY_BUDGET_CAPACITY, refill_per_second=RETRY_BUDGET_REFILL_PER_SECOND):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Take tokens if available
+        @param tokens:
+        @return: True if the tokens were taken
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+            self._updated = now
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    @property
+    def tokens(self):
+        with self._lock:
+            return self._tokens
+
+
+def register_client(client, account_id):
+    """
+    Record the account of a client so its retries use that account's budget
+    @param client: boto3 client
+    @param account_id:
+    @return:
+    """
+    try:
+        _client_accounts[client] = account_id
+    except TypeError:
+        # not weak referenceable
+        pass
+
+
+def retry_budget_for(client):
+    """
+    Return the retry budget shared by all clients for the same account and region
+    Clients not created by the client pool share a budget per region
+    @param client: boto3 client or None
+    @return: TokenBucket
+    """
+    region = getattr(getattr(client, 'meta', None), 'region_name', None)
+    try:
+        account_id = _client_accounts.get(client)
+    except TypeError:
+        account_id = None
+    key = (account_id, region)
+    with _retry_budgets_lock:
+        if key not in _retry_budgets:
+            _retry_budgets[key] = TokenBucket()
+        return _retry_budgets[key]
+
+
+def clear_retry_budgets():
+    with _retry_budgets_lock:
+        _retry_budgets.clear()
+
+
+def classify(err):
+    """
+    Classify an exception raised by an AWS call
+    @param err:
+    @return: THROTTLING, WAIT_FOR_STATE or FAIL_FAST
+    """
+    if isinstance(err, ResourceNotInStateError):
+        return WAIT_FOR_STATE
+    if isinstance(err, (BotoConnectionError, ReadTimeoutError)):
+        return THROTTLING
+    if isinstance(err, ClientError):
+        code = err.response.get('Error', {}).get('Code', '')
+        if code in THROTTLING_ERROR_CODES:
+            return THROTTLING
+        if code in WAIT_FOR_STATE_ERROR_CODES:
+            return WAIT_FOR_STATE
+        if err.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500:
+            return THROTTLING
+    return FAIL_FAST
+
+
+def backoff_delay(attempt, base, cap):
+    """
+    Full jitter backoff: a random delay between 0 and min(cap, base * 2 ** attempt)
+    @param attempt: retries already made, starting at 0
+    @param base:
+    @param cap:
+    @return: delay in seconds
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def call(func, args=(), kwargs=None, client=None, logger=None):
+    """
+    Call func, retrying according to the classification of the errors it raises
+    @param func:
+    @param args:
+    @param kwargs:
+    @param client: boto3 client used by func, selects the retry budget
+    @param logger:
+    @return: result of func
+    """
+    kwargs = kwargs or {}
+    logger = logger or lgr
+    attempts = {THROTTLING: 0, WAIT_FOR_STATE: 0}
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except Exception as err:  # pylint: disable=broad-except
+            category = classify(err)
+            if category == FAIL_FAST:
+                raise
+            max_attempts, base, cap = RETRY_SETTINGS[category]
+            attempt = attempts[category]
+            if attempt + 1 >= max_attempts:
+                raise
+            name = getattr(func, '__name__', func)
+            if category == THROTTLING and not retry_budget_for(client).acquire():
+                logger.info(f'Retry budget exhausted, not retrying {name}: {err}')
+                raise
+            delay = backoff_delay(attempt, base, cap)
+            logger.info(f'{name} failed with {category} error, retry {attempt + 1} in {delay:.1f}s: {err}')
+            attempts[category] += 1
+            time.sleep(delay)
+
+
+def retry_with_policy(client_arg='rds_client'):
+    """
+    Decorator that applies call() to a function
+    The client and logger are taken from the function's client_arg and logger arguments
+    @param client_arg: name of the boto3 client argument
+    @return:
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            return call(func, args, kwargs, client=arguments.get(client_arg), logger=arguments.get('logger'))
+        return wrapper
+    return decorator
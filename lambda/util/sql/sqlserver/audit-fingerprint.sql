@@ -0,0 +1,38 @@
+/****************************FINGERPRINT EXISTING AUDIT OBJECTS IN ONE CATALOG QUERY************************************/
+/* One row per object or setting: kind, name, detail. detail is 1 for an enabled audit or job, the QUEUE_DELAY,        */
+/* ON_FAILURE and WHERE predicate of SQL_NATIVE_AUDIT, and the comma separated action groups of audit specifications   */
+/* that are enabled and write to SQL_NATIVE_AUDIT, NULL for databases without such a spec                             */
+SET NOCOUNT ON
+
+DECLARE @audit_guid UNIQUEIDENTIFIER = (SELECT audit_guid FROM sys.server_audits WHERE name = N'SQL_NATIVE_AUDIT')
+DECLARE @sql NVARCHAR(MAX) = N''
+
+SELECT @sql = @sql + N' UNION ALL SELECT ''DB_SPEC'', N' + QUOTENAME(name, '''') + N', ' +
+	N'(SELECT STRING_AGG(g.audit_action_name, N'','') FROM (SELECT DISTINCT d.audit_action_name ' +
+	N'FROM ' + QUOTENAME(name) + N'.sys.database_audit_specifications s ' +
+	N'JOIN ' + QUOTENAME(name) + N'.sys.database_audit_specification_details d ' +
+	N'ON d.database_specification_id = s.database_specification_id ' +
+	N'WHERE s.name = N' + QUOTENAME(name + '_DB_MGMT_SPEC', '''') + N' AND s.is_state_enabled = 1 ' +
+	N'AND s.audit_guid = @audit_guid) g)'
+FROM sys.databases
+WHERE name NOT IN ('master','tempdb','model','msdb','rdsadmin') AND state_desc = 'ONLINE'
+
+SET @sql = N'SELECT ''AUDIT'' AS kind, name, CAST(is_state_enabled AS NVARCHAR(MAX)) AS detail ' +
+	N'FROM sys.server_audits WHERE name = N''SQL_NATIVE_AUDIT'' ' +
+	N'UNION ALL SELECT ''AUDIT_QUEUE_DELAY'', name, CAST(queue_delay AS NVARCHAR(MAX)) ' +
+	N'FROM sys.server_audits WHERE name = N''SQL_NATIVE_AUDIT'' ' +
+	N'UNION ALL SELECT ''AUDIT_ON_FAILURE'', name, on_failure_desc ' +
+	N'FROM sys.server_audits WHERE name = N''SQL_NATIVE_AUDIT'' ' +
+	N'UNION ALL SELECT ''AUDIT_PREDICATE'', name, predicate ' +
+	N'FROM sys.server_audits WHERE name = N''SQL_NATIVE_AUDIT'' ' +
+	N'UNION ALL SELECT ''SERVER_SPEC'', s.name, ' +
+	N'(SELECT STRING_AGG(g.audit_action_name, N'','') FROM (SELECT DISTINCT d.audit_action_name ' +
+	N'FROM sys.server_audit_specification_details d ' +
+	N'WHERE d.server_specification_id = s.server_specification_id) g) ' +
+	N'FROM sys.server_audit_specifications s ' +
+	N'WHERE s.name = N''SERVER_MGMT_SPEC'' AND s.is_state_enabled = 1 AND s.audit_guid = @audit_guid ' +
+	N'UNION ALL SELECT ''JOB'', name, CAST(enabled AS NVARCHAR(MAX)) FROM msdb.dbo.sysjobs ' +
+	N'WHERE name = N''SQLNATIVEAUDIT_JOB''' +
+	@sql
+
+EXEC sp_executesql @sql, N'@audit_guid UNIQUEIDENTIFIER', @audit_guid = @audit_guid
@@ -0,0 +1,23 @@
+/*****************************CONFIGURE AUDIT SPECIFICATION EVENT GROUPS FOR ONE DATABASE*******************************/
+USE [{{ DBNAME | replace("]", "]]") }}]
+
+IF EXISTS (SELECT * FROM sys.database_audit_specifications WHERE name = N'{{ DBNAME | replace("'", "''") }}_DB_MGMT_SPEC')
+BEGIN
+ALTER DATABASE AUDIT SPECIFICATION [{{ DBNAME | replace("]", "]]") }}_DB_MGMT_SPEC] WITH (STATE = OFF)
+DROP DATABASE AUDIT SPECIFICATION [{{ DBNAME | replace("]", "]]") }}_DB_MGMT_SPEC]
+END
+
+CREATE DATABASE AUDIT SPECIFICATION [{{ DBNAME | replace("]", "]]") }}_DB_MGMT_SPEC]
+	FOR SERVER AUDIT [SQL_NATIVE_AUDIT]
+		ADD (AUDIT_CHANGE_GROUP),
+		ADD (DATABASE_OBJECT_CHANGE_GROUP),
+		ADD (DATABASE_OBJECT_OWNERSHIP_CHANGE_GROUP),
+		ADD (DATABASE_OWNERSHIP_CHANGE_GROUP),
+		ADD (DATABASE_PRINCIPAL_CHANGE_GROUP),
+		ADD (DATABASE_PRINCIPAL_IMPERSONATION_GROUP),
+		ADD (DATABASE_ROLE_MEMBER_CHANGE_GROUP),
+		ADD (SCHEMA_OBJECT_OWNERSHIP_CHANGE_GROUP),
+		ADD (DATABASE_OBJECT_PERMISSION_CHANGE_GROUP),
+		ADD (DATABASE_PERMISSION_CHANGE_GROUP),
+		ADD (SCHEMA_OBJECT_PERMISSION_CHANGE_GROUP)
+	WITH (STATE = ON)
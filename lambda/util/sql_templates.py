@@ -0,0 +1,105 @@
+"""
+Compiled SQL template cache shared by the render_sql helpers
+
+A single jinja2 Environment is created per process. Templates are compiled on first use and kept in memory for
+warm invocations, with a bytecode cache in /tmp so new containers skip parsing. Templates precompiled at build time
+(python sql_templates.py --precompile) are loaded from the sql_compiled package and need no template files at all.
+"""
+# pylint: disable=import-outside-toplevel, global-statement
+import argparse
+import os
+import tempfile
+import threading
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # util/
+SQL_DIR = os.path.join(THIS_DIR, 'sql')  # util/sql/
+COMPILED_DIR = os.path.join(THIS_DIR, 'sql_compiled')  # util/sql_compiled/
+# /tmp is the only writable path in Lambda
+BYTECODE_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'rds-audit-log-sql-cache')
+
+_environment = None
+_environment_lock = threading.Lock()
+
+
+def get_environment():
+    """
+    Return the process-wide jinja2 Environment, creating it on first use
+    @return: jinja2.Environment
+    """
+    global _environment
+    if _environment is None:
+        with _environment_lock:
+            if _environment is None:
+                _environment = create_environment()
+    return _environment
+
+
+def create_environment(use_compiled=True):
+    """
+    Create jinja2 Environment loading precompiled templates first, then the files under util/sql
+    @param use_compiled: False to ignore precompiled templates, e.g. when precompiling
+    @return: jinja2.Environment
+    """
+    import jinja2
+
+    loaders = []
+    if use_compiled and os.path.isdir(COMPILED_DIR):
+        loaders.append(jinja2.ModuleLoader(COMPILED_DIR))
+    loaders.append(jinja2.FileSystemLoader(SQL_DIR))
+
+    bytecode_cache = None
+    try:
+        os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(BYTECODE_CACHE_DIR)
+    except OSError:
+        pass
+
+    return jinja2.Environment(loader=jinja2.ChoiceLoader(loaders), bytecode_cache=bytecode_cache)
+
+
+def render_sql(logger, sql_file, engine_type, kwargs=None):
+    """
+    Renders the sql file located in the path ./sql/<engine>/<sql_file>
+
+    Args
+        sql_file (str): The sql file name.
+        engine_type (str): The engine type; e.g. sqlserver
+        kwargs: Keyword arguments.
+
+    Returns:
+        str: Blank string if the file or directory cannot be found, sql
+        statement as a string otherwise.
+    """
+    import jinja2
+
+    if not kwargs:
+        kwargs = {}
+    try:
+        template = get_environment().get_template(f'{engine_type}/{sql_file}')
+    except jinja2.TemplateNotFound as err:
+        logger.error(f'render_sql() template not found: {err}')
+        return ''
+    return template.render(**kwargs)
+
+
+def precompile(target_dir=COMPILED_DIR):
+    """
+    Compile every template under util/sql into the importable sql_compiled package
+    @param target_dir:
+    @return: number of templates compiled
+    """
+    compiled = []
+    environment = create_environment(use_compiled=False)
+    os.makedirs(target_dir, exist_ok=True)
+    environment.compile_templates(target_dir, zip=None, log_function=compiled.append, ignore_errors=False)
+    with open(os.path.join(target_dir, '__init__.py'), 'w') as init_file:
+        init_file.write('"""Templates precompiled from util/sql by sql_templates.py"""\n')
+    return len([line for line in compiled if line.startswith('Compiled')])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SQL template utilities')
+    parser.add_argument('--precompile', action='store_true', help='compile util/sql into util/sql_compiled')
+    args = parser.parse_args()
+    if args.precompile:
+        print(f'Precompiled {precompile()} SQL templates into {COMPILED_DIR}')
@@ -0,0 +1,201 @@
+"""
+Skip SQL Server audit scripts whose objects are already in place
+audit-fingerprint.sql reads the server audit and its settings, the action groups of the server audit specification and
+of every database audit specification, and the SQLNATIVEAUDIT_JOB job in one catalog query. plan_audit_scripts() then
+picks only the scripts that change something, and only the databases whose <db>_DB_MGMT_SPEC is missing or has other
+action groups get a specification.
+Database specifications are applied concurrently, one database per statement, over a bounded pool of connections
+"""
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 'true' fingerprints the audit objects first and skips scripts already in effect, 'false' runs every script
+SQLSERVER_AUDIT_FAST_PATH = os.environ.get('sqlserver_audit_fast_path', 'true').lower() == 'true'
+
+SERVER_AUDIT_SCRIPT = 'configure-server-audit.sql'
+SERVER_SPEC_SCRIPT = 'configure-server-level-audit-spec.sql'
+DATABASE_SPEC_SCRIPT = 'configure-database-level-audit-spec.sql'
+SINGLE_DATABASE_SPEC_SCRIPT = 'configure-single-database-audit-spec.sql'
+JOB_SCRIPT = 'create-s3-events-job-and-add-audit-to-new-dbs.sql'
+FINGERPRINT_SCRIPT = 'audit-fingerprint.sql'
+
+# Every script, as run before the fast path. DATABASE_SPEC_SCRIPT stands for every user database and is expanded into
+# one SINGLE_DATABASE_SPEC_SCRIPT per database by expand_database_specs()
+ALL_SCRIPTS = [SERVER_AUDIT_SCRIPT, SERVER_SPEC_SCRIPT, DATABASE_SPEC_SCRIPT, JOB_SCRIPT]
+
+# Connections used to apply database audit specifications concurrently
+SQLSERVER_CONNECTION_POOL_SIZE = int(os.environ.get('sqlserver_connection_pool_size', '4'))
+
+USER_DATABASES_QUERY = ("SELECT name FROM sys.databases "
+                        "WHERE name NOT IN ('master','tempdb','model','msdb','rdsadmin') AND state_desc = 'ONLINE' "
+                        "ORDER BY name")
+
+
+def action_groups(sql):
+    """
+    Return the audit action groups a script adds
+    @param sql: rendered audit specification script
+    @return: set of action group names
+    """
+    return set(re.findall(r'ADD \((\w+)\)', sql))
+
+
+def normalize_predicate(predicate):
+    """
+    Normalize an audit WHERE predicate for comparison: no whitespace, no enclosing parentheses, lower case
+    @param predicate: predicate as written in configure-server-audit.sql or as stored in sys.server_audits
+    @return:
+    """
+    predicate = re.sub(r'\s+', '', predicate or '').lower()
+    while predicate.startswith('(') and predicate.endswith(')') and _balanced(predicate[1:-1]):
+        predicate = predicate[1:-1]
+    return predicate
+
+
+def audit_settings(sql):
+    """
+    Return the SQL_NATIVE_AUDIT settings a script creates the audit with
+    @param sql: rendered configure-server-audit.sql
+    @return: dict with queue_delay, on_failure and predicate
+    """
+    queue_delay = re.search(r'QUEUE_DELAY\s*=\s*(\d+)', sql)
+    on_failure = re.search(r'ON_FAILURE\s*=\s*(\w+)', sql)
+    predicate = re.search(r'\bWHERE\s*(\(.*?\))\s*ALTER SERVER AUDIT', sql, re.DOTALL)
+    return {'queue_delay': queue_delay.group(1) if queue_delay else None,
+            'on_failure': on_failure.group(1).upper() if on_failure else None,
+            'predicate': normalize_predicate(predicate.group(1) if predicate else '')}
+
+
+def read_audit_fingerprint(csr, fingerprint_sql):
+    """
+    Run the fingerprint query
+    @param csr: pyodbc cursor
+    @param fingerprint_sql: rendered audit-fingerprint.sql
+    @return: dict with audit (bool), audit_settings (dict as returned by audit_settings()), server_spec_groups (set),
+    job (bool) and database_spec_groups ({db: set})
+    """
+    csr.execute(fingerprint_sql)
+    fingerprint = {'audit': False, 'audit_settings': {'queue_delay': None, 'on_failure': None, 'predicate': ''},
+                   'server_spec_groups': set(), 'job': False, 'database_spec_groups': {}}
+    for kind, name, detail in csr.fetchall():
+        if kind == 'AUDIT':
+            fingerprint['audit'] = str(detail) == '1'
+        elif kind == 'AUDIT_QUEUE_DELAY':
+            fingerprint['audit_settings']['queue_delay'] = None if detail is None else str(detail)
+        elif kind == 'AUDIT_ON_FAILURE':
+            fingerprint['audit_settings']['on_failure'] = (detail or '').upper()
+        elif kind == 'AUDIT_PREDICATE':
+            fingerprint['audit_settings']['predicate'] = normalize_predicate(detail)
+        elif kind == 'SERVER_SPEC':
+            fingerprint['server_spec_groups'] = _group_set(detail)
+        elif kind == 'JOB':
+            fingerprint['job'] = str(detail) == '1'
+        elif kind == 'DB_SPEC':
+            fingerprint['database_spec_groups'][name] = _group_set(detail)
+    return fingerprint
+
+
+def plan_audit_scripts(fingerprint, server_spec_groups, database_spec_groups, expected_audit_settings=None):
+    """
+    Choose the scripts to run from a fingerprint
+    Without an enabled SQL_NATIVE_AUDIT with the expected settings every script runs, since the specifications must be
+    recreated against the new audit
+    @param fingerprint: read_audit_fingerprint() result, None to run every script
+    @param server_spec_groups: action groups of SERVER_MGMT_SPEC
+    @param database_spec_groups: action groups of each <db>_DB_MGMT_SPEC
+    @param expected_audit_settings: audit_settings() of configure-server-audit.sql, None to not compare settings
+    @return: list of (script, render kwargs) in run order
+    """
+    if fingerprint is None or not fingerprint['audit'] or \
+            (expected_audit_settings is not None and fingerprint['audit_settings'] != expected_audit_settings):
+        return [(script, None) for script in ALL_SCRIPTS]
+
+    scripts = []
+    if fingerprint['server_spec_groups'] != server_spec_groups:
+        scripts.append((SERVER_SPEC_SCRIPT, None))
+    scripts += [(SINGLE_DATABASE_SPEC_SCRIPT, {'DBNAME': database})
+                for database, groups in sorted(fingerprint['database_spec_groups'].items())
+                if groups != database_spec_groups]
+    if not fingerprint['job']:
+        scripts.append((JOB_SCRIPT, None))
+    return scripts
+
+
+def expand_database_specs(scripts, csr):
+    """
+    Replace DATABASE_SPEC_SCRIPT with one SINGLE_DATABASE_SPEC_SCRIPT per user database, listed with one query
+    @param scripts: list of (script, render kwargs)
+    @param csr: pyodbc cursor on master
+    @return: list of (script, render kwargs)
+    """
+    if (DATABASE_SPEC_SCRIPT, None) not in scripts:
+        return scripts
+    csr.execute(USER_DATABASES_QUERY)
+    databases = [row[0] for row in csr.fetchall()]
+    expanded = []
+    for script, kwargs in scripts:
+        if script == DATABASE_SPEC_SCRIPT:
+            expanded += [(SINGLE_DATABASE_SPEC_SCRIPT, {'DBNAME': database}) for database in databases]
+        else:
+            expanded.append((script, kwargs))
+    return expanded
+
+
+def apply_database_specs(logger, connect, database_sqls, pool_size=None):
+    """
+    Run the rendered audit specification of each database over a bounded pool of connections
+    Each worker thread opens one connection and reuses it for the databases it picks up
+    @param logger:
+    @param connect: function returning a new autocommit pyodbc connection
+    @param database_sqls: list of (database, rendered SINGLE_DATABASE_SPEC_SCRIPT)
+    @param pool_size: connection limit, SQLSERVER_CONNECTION_POOL_SIZE when None
+    @return: dict of database: None on success, else the error message
+    """
+    if not database_sqls:
+        return {}
+    local = threading.local()
+    connections = []
+    connections_lock = threading.Lock()
+
+    def apply(database_sql):
+        database, sql = database_sql
+        try:
+            if not hasattr(local, 'conn'):
+                local.conn = connect()
+                with connections_lock:
+                    connections.append(local.conn)
+            local.conn.cursor().execute(sql)
+            return database, None
+        except Exception as err:  # pylint: disable=broad-except
+            logger.error(f'Audit specification for database={database} failed. Details={err}')
+            return database, str(err)
+
+    workers = min(pool_size or SQLSERVER_CONNECTION_POOL_SIZE, len(database_sqls))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = dict(executor.map(apply, database_sqls))
+    finally:
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:  # pylint: disable=broad-except
+                pass
+    logger.info(f'Applied audit specifications to {len(results)} databases over {len(connections)} connections, '
+                f'failed={[database for database, error in results.items() if error]}')
+    return results
+
+
+def _group_set(detail):
+    # Comma separated action groups from STRING_AGG, NULL when the specification is missing
+    return {group for group in (detail or '').split(',') if group}
+
+
+def _balanced(text):
+    depth = 0
+    for char in text:
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if depth < 0:
+            return False
+    return depth == 0
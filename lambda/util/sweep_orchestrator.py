@@ -0,0 +1,114 @@
+"""
+Run validation or enablement across many accounts and regions
+Roles are assumed in parallel up front, then one task per (account, region) is fanned out over a worker pool. At most
+SWEEP_ACCOUNT_CONCURRENCY tasks run per account at a time, so one account's RDS API rate limits are not exhausted
+while other accounts still have work. Results are yielded as each task finishes
+"""
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # util/
+sys.path.append(THIS_DIR)
+
+from client_utilities import ClientUtilities
+
+lgr = logging.getLogger()
+
+# Upper bound on tasks running at once across all accounts
+SWEEP_MAX_WORKERS = int(os.environ.get('sweep_max_workers', '32'))
+# Upper bound on tasks running at once in one account, across its regions
+SWEEP_ACCOUNT_CONCURRENCY = int(os.environ.get('sweep_account_concurrency', '4'))
+
+
+def assume_roles(account_ids, client_utilities=None, max_workers=None):
+    """
+    Assume the audit log role in every account in parallel. Credentials are cached by ClientUtilities for the tasks
+    @param account_ids:
+    @param client_utilities: ClientUtilities, a new one when None
+    @param max_workers: worker limit, SWEEP_MAX_WORKERS when None
+    @return: dict of account id: error message for accounts whose role could not be assumed
+    """
+    client_utilities = client_utilities or ClientUtilities()
+    account_ids = list(account_ids)
+    if not account_ids:
+        return {}
+
+    def assume(account_id):
+        try:
+            client_utilities.get_credentials_for_account(account_id)
+            return None
+        except Exception as err:  # pylint: disable=broad-except
+            return str(err)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers or SWEEP_MAX_WORKERS, len(account_ids))) as executor:
+        errors = dict(zip(account_ids, executor.map(assume, account_ids)))
+    return {account_id: error for account_id, error in errors.items() if error}
+
+
+def sweep(account_ids, regions, task, max_workers=None, account_concurrency=None, client_utilities=None,
+          logger=None):
+    """
+    Run task(account_id, region) for every account and region
+    @param account_ids:
+    @param regions:
+    @param task: function taking an account id and a region, returning a JSON serializable result
+    @param max_workers: worker limit, SWEEP_MAX_WORKERS when None
+    @param account_concurrency: per-account limit, SWEEP_ACCOUNT_CONCURRENCY when None
+    @param client_utilities: ClientUtilities used to assume roles
+    @param logger:
+    @return: generator of dicts with account_id, region, status ('success' or 'failed'), seconds and result or
+    message, in completion order
+    """
+    logger = logger or lgr
+    max_workers = max_workers or SWEEP_MAX_WORKERS
+    account_concurrency = account_concurrency or SWEEP_ACCOUNT_CONCURRENCY
+    account_ids = list(dict.fromkeys(account_ids))
+    regions = list(dict.fromkeys(regions))
+
+    start = time.perf_counter()
+    role_errors = assume_roles(account_ids, client_utilities, max_workers)
+    logger.info(f'Assumed roles in {len(account_ids) - len(role_errors)} of {len(account_ids)} accounts in '
+                f'{time.perf_counter() - start:.1f}s')
+    for account_id, error in role_errors.items():
+        for region in regions:
+            yield {'account_id': account_id, 'region': region, 'status': 'failed', 'seconds': 0,
+                   'message': f'Unable to assume role: {error}'}
+
+    pending = {account_id: deque(regions) for account_id in account_ids if account_id not in role_errors}
+    running = {account_id: 0 for account_id in pending}
+
+    def run_task(account_id, region):
+        task_start = time.perf_counter()
+        try:
+            result = {'status': 'success', 'result': task(account_id, region)}
+        except Exception as err:  # pylint: disable=broad-except
+            logger.error(f'Sweep of {account_id} {region} failed: {err}')
+            result = {'status': 'failed', 'message': str(err)}
+        return dict(result, account_id=account_id, region=region, seconds=round(time.perf_counter() - task_start, 3))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+
+        def submit_ready():
+            # Round robin over accounts so no account waits behind another account's regions
+            submitted = True
+            while submitted and len(futures) < max_workers:
+                submitted = False
+                for account_id, regions_left in pending.items():
+                    if regions_left and running[account_id] < account_concurrency and len(futures) < max_workers:
+                        future = executor.submit(run_task, account_id, regions_left.popleft())
+                        futures[future] = account_id
+                        running[account_id] += 1
+                        submitted = True
+
+        submit_ready()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                running[futures.pop(future)] -= 1
+                yield future.result()
+            submit_ready()
@@ -0,0 +1,111 @@
+"""
+Status-driven wait before audit log validation
+The validation state machine polls the database until its modifications are applied instead of sleeping a fixed
+time. The poll interval starts short and grows, and polling stops at a deadline so validation always runs
+"""
+import math
+import os
+
+# Poll interval in seconds: starts at SYNC_POLL_INITIAL_SECONDS, grows by SYNC_POLL_GROWTH up to
+# SYNC_POLL_MAX_SECONDS. After SYNC_POLL_TIMEOUT_SECONDS validation runs whether or not the database is in sync
+SYNC_POLL_INITIAL_SECONDS = int(os.environ.get('sync_poll_initial_seconds', '5'))
+SYNC_POLL_MAX_SECONDS = int(os.environ.get('sync_poll_max_seconds', '60'))
+SYNC_POLL_GROWTH = float(os.environ.get('sync_poll_growth', '1.5'))
+SYNC_POLL_TIMEOUT_SECONDS = int(os.environ.get('sync_poll_timeout_seconds', '1800'))
+
+# 'poll' waits on the database status when changes are applied immediately, 'fixed' always sleeps wait_till_seconds
+VALIDATION_WAIT_MODE = os.environ.get('validation_wait_mode', 'poll')
+
+# pending-reboot is in sync for validation: static parameters are set in the group and apply on the next reboot
+PARAMETER_GROUP_SYNC_STATES = ('in-sync', 'pending-reboot')
+OPTION_GROUP_SYNC_STATES = ('in-sync', 'pending-reboot')
+
+
+def initial_poll_state():
+    """
+    Poll state passed to the state machine with the execution input
+    @return:
+    """
+    return {
+        'in_sync': False,
+        'timed_out': False,
+        'poll_count': 0,
+        'elapsed_seconds': 0,
+        'next_poll_seconds': SYNC_POLL_INITIAL_SECONDS,
+        'reason': 'not checked',
+    }
+
+
+def next_poll_state(poll_state, in_sync, reason):
+    """
+    Poll state after one status check
+    @param poll_state: state returned by the previous check, initial_poll_state() for the first one
+    @param in_sync: result of this check
+    @param reason: why the database is not in sync, for the execution history
+    @return:
+    """
+    elapsed_seconds = poll_state.get('elapsed_seconds', 0) + poll_state.get('next_poll_seconds', 0)
+    next_poll_seconds = min(SYNC_POLL_MAX_SECONDS,
+                            math.ceil(poll_state.get('next_poll_seconds', SYNC_POLL_INITIAL_SECONDS) * SYNC_POLL_GROWTH))
+    return {
+        'in_sync': in_sync,
+        'timed_out': not in_sync and elapsed_seconds >= SYNC_POLL_TIMEOUT_SECONDS,
+        'poll_count': poll_state.get('poll_count', 0) + 1,
+        'elapsed_seconds': elapsed_seconds,
+        'next_poll_seconds': next_poll_seconds,
+        'reason': reason,
+    }
+
+
+def instance_sync_status(db_instance):
+    """
+    Check whether modifications to a DB instance have been applied
+    @param db_instance: describe_db_instances item
+    @return: (in_sync, reason)
+    """
+    status = db_instance.get('DBInstanceStatus')
+    if status != 'available':
+        return False, f'DBInstanceStatus={status}'
+
+    pending = db_instance.get('PendingModifiedValues') or {}
+    if pending:
+        return False, f'PendingModifiedValues={sorted(pending)}'
+
+    for parameter_group in db_instance.get('DBParameterGroups', []):
+        if parameter_group.get('ParameterApplyStatus') not in PARAMETER_GROUP_SYNC_STATES:
+            return False, (f'{parameter_group.get("DBParameterGroupName")} '
+                           f'ParameterApplyStatus={parameter_group.get("ParameterApplyStatus")}')
+
+    for option_group in db_instance.get('OptionGroupMemberships', []):
+        if option_group.get('Status') not in OPTION_GROUP_SYNC_STATES:
+            return False, f'{option_group.get("OptionGroupName")} Status={option_group.get("Status")}'
+
+    return True, 'in sync'
+
+
+def cluster_sync_status(db_cluster, db_cluster_instances=None):
+    """
+    Check whether modifications to a DB cluster and its members have been applied
+    @param db_cluster: describe_db_clusters item
+    @param db_cluster_instances: describe_db_instances items of the members, not checked when None
+    @return: (in_sync, reason)
+    """
+    status = db_cluster.get('Status')
+    if status != 'available':
+        return False, f'Status={status}'
+
+    pending = db_cluster.get('PendingModifiedValues') or {}
+    if pending:
+        return False, f'PendingModifiedValues={sorted(pending)}'
+
+    for member in db_cluster.get('DBClusterMembers', []):
+        if member.get('DBClusterParameterGroupStatus') not in PARAMETER_GROUP_SYNC_STATES:
+            return False, (f'{member.get("DBInstanceIdentifier")} '
+                           f'DBClusterParameterGroupStatus={member.get("DBClusterParameterGroupStatus")}')
+
+    for db_instance in db_cluster_instances or []:
+        in_sync, reason = instance_sync_status(db_instance)
+        if not in_sync:
+            return False, f'{db_instance.get("DBInstanceIdentifier")} {reason}'
+
+    return True, 'in sync'
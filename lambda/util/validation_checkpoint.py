@@ -0,0 +1,79 @@
+"""
+Per-call retries and memoized describe results for audit log validation
+A transient error retries only the call that failed. Responses read before it are reused instead of being read again
+"""
+import json
+import os
+import sys
+import threading
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # util/
+sys.path.append(THIS_DIR)
+
+import retry_policy
+from exceptions import ResourceNotInStateError
+
+
+class ValidationCheckpoint:
+    """
+    Wraps an rds client for one validation. describe_* calls are retried individually by retry_policy and their
+    responses are kept for the rest of the validation. Other attributes are passed through to the client
+    """
+
+    def __init__(self, client, logger=None):
+        self._client = client
+        self._logger = logger
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not name.startswith('describe_') or not callable(attr):
+            return attr
+
+        def describe(**kwargs):
+            return self._describe(name, kwargs)
+        return describe
+
+    def invalidate(self, name=None):
+        """
+        Drop kept responses so the next call reads again
+        @param name: describe method name, None for all
+        @return:
+        """
+        with self._lock:
+            for key in [key for key in self._responses if name is None or key[0] == name]:
+                del self._responses[key]
+
+    def wait_for(self, name, state_of, desired_state, **kwargs):
+        """
+        Read name(**kwargs) again until the resource reaches desired_state, with the retry_policy wait-for-state
+        settings
+        @param name: describe method name, e.g. 'describe_db_instances'
+        @param state_of: function returning the current state from a describe response
+        @param desired_state:
+        @param kwargs: describe arguments
+        @return: describe response in desired_state
+        """
+        def read_state():
+            self.invalidate(name)
+            response = self._describe(name, kwargs)
+            current_state = state_of(response)
+            if current_state != desired_state:
+                resource = ', '.join(str(value) for value in kwargs.values())
+                raise ResourceNotInStateError(f'{resource} not "{desired_state}". Current state={current_state}')
+            return response
+
+        return retry_policy.call(read_state, client=self._client, logger=self._logger)
+
+    def _describe(self, name, kwargs):
+        key = (name, json.dumps(kwargs, sort_keys=True, default=str))
+        with self._lock:
+            if key in self._responses:
+                return self._responses[key]
+
+        response = retry_policy.call(getattr(self._client, name), kwargs=kwargs, client=self._client,
+                                     logger=self._logger)
+        with self._lock:
+            self._responses[key] = response
+        return response
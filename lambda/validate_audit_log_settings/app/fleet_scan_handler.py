@@ -0,0 +1,155 @@
+"""
+Module to scan every database in an account and region for audit log compliance
+Runs the validate_audit_log_settings_handler checks concurrently across all DB clusters and DB instances and returns
+one compliance report, instead of one validation state machine execution per database
+"""
+import sys
+import os
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # app/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../'))  # util/
+sys.path.append(THIS_DIR)
+sys.path.append(UTIL_DIR)
+
+from util.auth_utilities import Logger
+from util import rds_config
+from util.client_utilities import ClientUtilities
+from util.concurrency_utilities import run_concurrently
+from util.validation_checkpoint import ValidationCheckpoint
+import validate_audit_log_settings_handler as validator
+
+# Engines the audit log settings are validated and enabled for. Other engines found in the account, e.g. neptune,
+# docdb or custom-*, are reported as skipped
+SUPPORTED_ENGINES = set(rds_config.MYSQL_FAMILY + rds_config.POSTGRESQL_FAMILY + rds_config.MSSQL_FAMILY +
+                        [rds_config.ORACLE_FAMILY, 'oracle-se2'])
+
+
+def handler(event, context):
+    """
+    entry function to the fleet compliance scan
+    """
+    global logger
+
+    logger = Logger()
+    logger.set_uuid(id=event.get("logger_uuid") or logger.get_uuid())
+    # validation checks log through the validator module logger
+    validator.logger = logger
+
+    try:
+        return scan_account_region(event.get('db_account_id'), event.get('db_region'))
+    except Exception as err:
+        logger.error(f'Error: {err}')
+        return {'status': 'failed', 'message': 'Failure details: ' + str(err)}
+
+
+def scan_account_region(db_account_id, db_region):
+    """
+    Validate audit log settings of every DB cluster and DB instance in an account and region
+    Aurora instances are validated with their cluster. Databases that are not available or whose engine is not
+    supported are reported as skipped
+    @param db_account_id:
+    @param db_region:
+    @return: compliance report
+    """
+    logger.info(f'Entering scan_account_region(): account={db_account_id}, region={db_region}')
+
+    target_client = ClientUtilities()
+    # One checkpoint for the scan, so option and parameter groups shared by several databases are read once
+    rds_client = ValidationCheckpoint(target_client.boto3_client(db_account_id, 'rds', db_region), logger)
+    sm_client = target_client.boto3_client(db_account_id, 'secretsmanager', db_region)
+
+    targets = [('cluster', db_cluster) for db_cluster in describe_all(rds_client, 'describe_db_clusters', 'DBClusters')]
+    targets += [('instance', db_instance)
+                for db_instance in describe_all(rds_client, 'describe_db_instances', 'DBInstances')
+                if 'DBClusterIdentifier' not in db_instance]
+    logger.info(f'Scanning {len(targets)} databases')
+
+    def scan(target):
+        db_type, description = target
+        return scan_database(rds_client, sm_client, db_account_id, db_region, db_type, description)
+
+    results = run_concurrently(scan, targets)
+    return compliance_report(db_account_id, db_region, results)
+
+
+def describe_all(rds_client, operation, key):
+    """
+    Read every page of a describe operation
+    @param rds_client:
+    @param operation: e.g. 'describe_db_instances'
+    @param key: list key of the response, e.g. 'DBInstances'
+    @return: list of descriptions
+    """
+    items = []
+    for page in rds_client.get_paginator(operation).paginate():
+        items.extend(page[key])
+    return items
+
+
+def scan_database(rds_client, sm_client, db_account_id, db_region, db_type, description):
+    """
+    Validate one DB cluster or DB instance. Errors are reported as failed instead of stopping the scan
+    @param rds_client:
+    @param sm_client:
+    @param db_account_id:
+    @param db_region:
+    @param db_type: 'cluster' or 'instance'
+    @param description: describe_db_clusters or describe_db_instances item
+    @return: result for the report
+    """
+    if db_type == 'cluster':
+        db_identifier = description['DBClusterIdentifier']
+        db_status = description['Status']
+    else:
+        db_identifier = description['DBInstanceIdentifier']
+        db_status = description['DBInstanceStatus']
+    result = {'db_type': db_type, 'db_identifier': db_identifier, 'engine': description['Engine'],
+              'engine_version': description['EngineVersion']}
+
+    if description['Engine'] not in SUPPORTED_ENGINES:
+        return dict(result, status='skipped', message=f'Unsupported engine={description["Engine"]}')
+    if db_status != 'available':
+        return dict(result, status='skipped', message=f'Database status={db_status}')
+
+    try:
+        if db_type == 'cluster':
+            db_cluster, db_engine, db_engine_version, db_engine_mode = validator.get_cluster_info(
+                {'DBClusters': [description]})
+            response = validator.initialize_cluster_validation(rds_client, db_cluster, db_engine, db_engine_version,
+                                                               db_engine_mode)
+        else:
+            db_engine = description['Engine']
+            db_engine = db_engine if not db_engine.startswith('aurora') else 'aurora'
+            response = validator.initialize_instance_validation(rds_client, sm_client, db_account_id, db_region,
+                                                                description, db_engine, description['EngineVersion'])
+    except Exception as err:
+        logger.error(f'Error validating {db_type} {db_identifier}: {err}')
+        response = {'status': 'failed', 'message': 'Failure details: ' + str(err)}
+
+    return dict(result, status=response['status'], message=response['message'])
+
+
+def compliance_report(db_account_id, db_region, results):
+    """
+    Summarize scan results
+    @param db_account_id:
+    @param db_region:
+    @param results: scan_database results
+    @return:
+    """
+    compliant = [result for result in results if result['status'] == 'success']
+    non_compliant = [result for result in results if result['status'] == 'failed']
+    skipped = [result for result in results if result['status'] == 'skipped']
+    logger.info(f'Scan of {db_account_id} {db_region}: total={len(results)}, compliant={len(compliant)}, '
+                f'non_compliant={len(non_compliant)}, skipped={len(skipped)}')
+    return {
+        'status': 'success' if not non_compliant else 'failed',
+        'message': f'{len(compliant)} of {len(results)} databases compliant',
+        'db_account_id': db_account_id,
+        'db_region': db_region,
+        'total': len(results),
+        'compliant': len(compliant),
+        'non_compliant': len(non_compliant),
+        'skipped': len(skipped),
+        'results': results,
+    }
@@ -0,0 +1,75 @@
+"""
+Module to check whether audit log changes have been applied to a database
+Called by the validation state machine between polls, so validation runs as soon as the database is in sync
+"""
+import sys
+import os
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # app/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../'))  # util/
+sys.path.append(THIS_DIR)
+sys.path.append(UTIL_DIR)
+
+from util.auth_utilities import Logger
+from util.client_utilities import ClientUtilities
+from util.aurora_utilities import describe_cluster_members
+from util.sync_status import next_poll_state, instance_sync_status, cluster_sync_status, initial_poll_state
+import retry_policy
+
+
+def handler(event, context):
+    """
+    entry function to the sync status check
+    """
+    global logger
+
+    logger_uuid = event.get("logger_uuid")
+    logger = Logger()
+    logger.set_uuid(id=logger_uuid)
+
+    poll_state = event.get('poll_state') or initial_poll_state()
+    try:
+        in_sync, reason = check_sync_status(event)
+    except Exception as err:
+        # Keep polling until the deadline, validation reports the error if it persists
+        logger.error(f'Error: {err}')
+        in_sync, reason = False, f'Failure details: {err}'
+
+    poll_state = next_poll_state(poll_state, in_sync, reason)
+    logger.info(f'Sync status={poll_state}')
+    return poll_state
+
+
+def check_sync_status(event):
+    """
+    Describe the database and check whether its modifications have been applied
+    @param event:
+    @return: (in_sync, reason)
+    """
+    db_type = event.get('db_type')
+    db_identifier = event.get('db_identifier')
+    db_region = event.get('db_region')
+    db_account_id = event.get('db_account_id')
+
+    logger.info(f'Entering check_sync_status(): Event = {event}')
+
+    rds_client = ClientUtilities().boto3_client(db_account_id, 'rds', db_region)
+
+    if db_type == 'cluster':
+        dbs_clusters = retry_policy.call(rds_client.describe_db_clusters,
+                                         kwargs={'DBClusterIdentifier': db_identifier},
+                                         client=rds_client, logger=logger)
+        db_cluster = dbs_clusters["DBClusters"][0]
+        # Serverless clusters have no member instances
+        db_cluster_instances = retry_policy.call(describe_cluster_members, args=(rds_client, db_cluster),
+                                                 client=rds_client, logger=logger)
+        return cluster_sync_status(db_cluster, db_cluster_instances)
+
+    if db_type == 'instance':
+        db_instances = retry_policy.call(rds_client.describe_db_instances,
+                                         kwargs={'DBInstanceIdentifier': db_identifier},
+                                         client=rds_client, logger=logger)
+        return instance_sync_status(db_instances["DBInstances"][0])
+
+    # Nothing to wait for, validation reports the unknown event
+    return True, f'Unknown db_type={db_type}'
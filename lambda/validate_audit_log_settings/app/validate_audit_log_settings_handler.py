@@ -3,8 +3,6 @@ Module to validate audit log settings
 """
 import sys
 import os
-import boto3
-from retry import retry
 
 THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # app/
 UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../'))  # util/
@@ -12,8 +10,13 @@ sys.path.append(THIS_DIR)
 sys.path.append(UTIL_DIR)
 
 from util.auth_utilities import Logger
-from util import rds_config
-from util.client_utilities import ClientUtilities
+from util import rds_config, engine_capabilities
+from util.client_utilities import ClientUtilities, client_pool
+from util.parameter_utilities import read_parameter_values, parameter_matches
+from util.option_utilities import expected_options, count_matching_options
+from util.aurora_utilities import describe_cluster_members
+from util.concurrency_utilities import run_concurrently
+from util.validation_checkpoint import ValidationCheckpoint
 from exceptions import FailedAuditLogEnableError
 
 
@@ -34,11 +37,11 @@ def handler(event, context):
         return {'status': 'failed', 'message': 'Failure details: ' + str(err)}
 
 
-@retry(tries=15, delay=2, backoff=1.5)
 def initialize_audit_log_settings(event):
     """
     Initializes settings of audit log
-    Retry settings gives it a duration of <5m for database to retry before raising an exception
+    rds calls are retried one at a time and their responses kept by ValidationCheckpoint, so a transient error does
+    not restart the validation. Waiting for the database to be available has the same <5m duration
     @param event:
     @return:
     """
@@ -51,7 +54,8 @@ def initialize_audit_log_settings(event):
 
     # RDS resources will be created in test account
     target_client = ClientUtilities()
-    rds_client = target_client.boto3_client(db_account_id, 'rds', db_region)  # Target account client
+    # Target account client
+    rds_client = ValidationCheckpoint(target_client.boto3_client(db_account_id, 'rds', db_region), logger)
 
     sm_client = target_client.boto3_client(db_account_id, 'secretsmanager', db_region)
 
@@ -61,31 +65,29 @@ def initialize_audit_log_settings(event):
     # DB Cluster: Aurora Serverless
     if db_type == 'cluster':
         logger.info('In db_type == "cluster"')
-        dbs_clusters = rds_client.describe_db_clusters(DBClusterIdentifier=db_identifier)
+        # Wait for cluster to be in available state before proceeding
+        dbs_clusters = rds_client.wait_for('describe_db_clusters', lambda response: response["DBClusters"][0]['Status'],
+                                           'available', DBClusterIdentifier=db_identifier)
         db_cluster, db_engine, db_engine_version, db_engine_mode = get_cluster_info(dbs_clusters)
 
-        # RETRY here - Check if cluster is in available state before proceeding
-        if db_cluster['Status'] != 'available':
-            raise FailedAuditLogEnableError('Cluster not \"available\". Current state=' + db_cluster['Status'])
-
         return initialize_cluster_validation(rds_client, db_cluster, db_engine, db_engine_version, db_engine_mode)
 
     elif db_type == 'instance':
         # DB Instance: Aurora provisioned and RDS Instance
         logger.info('In db_type == "instance"')
-        db_instances = rds_client.describe_db_instances(DBInstanceIdentifier=db_identifier)
+        # Wait for instance to be in available state before proceeding
+        db_instances = rds_client.wait_for('describe_db_instances',
+                                           lambda response: response["DBInstances"][0]['DBInstanceStatus'],
+                                           'available', DBInstanceIdentifier=db_identifier)
         db_instance = db_instances["DBInstances"][0]
         db_engine = db_instance['Engine']
         db_engine = db_engine if not db_engine.startswith('aurora') else 'aurora'
         db_engine_version = db_instance["EngineVersion"]
 
-        # RETRY here - Check if instance is in available state before proceeding
-        if db_instance['DBInstanceStatus'] != 'available':
-            raise FailedAuditLogEnableError('Instance not \"available\". Current state=' + db_instance['DBInstanceStatus'])
-
         if db_engine == 'aurora' and 'DBClusterIdentifier' in db_instance:
             db_cluster_id = db_instance.get('DBClusterIdentifier')
-            db_cluster, db_engine, db_engine_version, db_engine_mode = get_cluster_info(db_cluster_id)
+            dbs_clusters = rds_client.describe_db_clusters(DBClusterIdentifier=db_cluster_id)
+            db_cluster, db_engine, db_engine_version, db_engine_mode = get_cluster_info(dbs_clusters)
             return initialize_cluster_validation(rds_client, db_cluster, db_engine, db_engine_version, db_engine_mode)
         else:
             return initialize_instance_validation(rds_client, sm_client, db_account_id, db_region, db_instance,
@@ -108,6 +110,21 @@ def get_cluster_info(dbs_clusters):
     return db_cluster, db_engine, db_engine_version, db_engine_mode
 
 
+def expected_log_types(rds_client, db_engine, db_engine_version, db_engine_mode, log_types):
+    """
+    Log types enablement exports for the engine version. Serverless clusters export none
+    @param rds_client:
+    @param db_engine:
+    @param db_engine_version:
+    @param db_engine_mode:
+    @param log_types: log types wanted for audit logging
+    @return:
+    """
+    if db_engine_mode != "provisioned":
+        return [""]
+    return engine_capabilities.resolve_log_types(logger, rds_client, db_engine, db_engine_version, log_types)
+
+
 # Aurora
 def initialize_cluster_validation(rds_client, db_cluster, db_engine, db_engine_version, db_engine_mode):
     """
@@ -126,7 +143,7 @@ def initialize_cluster_validation(rds_client, db_cluster, db_engine, db_engine_v
         if (db_engine in rds_config.MYSQL_FAMILY) and (db_engine_version.startswith("5.")):
             logger.info('In dbEngine=mysql and db_engine_version.startswith("5.")')
             parameters = rds_config.AUDIT_LOG_PARAMS['MYSQL_CLUSTER_FAMILY']
-            enable_log_types = ["audit"] if db_engine_mode == "provisioned" else [""]
+            enable_log_types = expected_log_types(rds_client, db_engine, db_engine_version, db_engine_mode, ["audit"])
             return validate_cluster_parameter_groups(rds_client, parameters, db_cluster, enable_log_types,
                                                      db_engine_mode,
                                                      db_engine, db_engine_version)
@@ -135,7 +152,8 @@ def initialize_cluster_validation(rds_client, db_cluster, db_engine, db_engine_v
         elif db_engine in rds_config.POSTGRESQL_FAMILY:
             logger.info('In postgres')
             parameters = rds_config.AUDIT_LOG_PARAMS['POSTGRESQL_CLUSTER_FAMILY']
-            enable_log_types = ["postgresql"] if db_engine_mode == "provisioned" else [""]
+            enable_log_types = expected_log_types(rds_client, db_engine, db_engine_version, db_engine_mode,
+                                                  ["postgresql"])
             return validate_cluster_parameter_groups(rds_client, parameters, db_cluster, enable_log_types,
                                                      db_engine_mode,
                                                      db_engine, db_engine_version)
@@ -189,37 +207,9 @@ def validate_cluster_parameter_groups(rds_client, parameters, db_cluster, enable
         output += "Assigned parameter group \"not default\" test: Passed. "
 
     # Validate if cluster parameters match
-    checked_count = 0
     valid_count = len(parameters)
-
-    # Read all parameters found in clusters Parameter Group Name
-    # describe_db_parameters only reads 100 at a time so use marker to read full list into rds_db_parameters
-    marker = None
-    rds_db_parameters = []
-    while True:
-        if not marker:
-            response = rds_client.describe_db_cluster_parameters(
-                DBClusterParameterGroupName=db_cluster_parameter_group_name)
-        else:
-            response = rds_client.describe_db_cluster_parameters(
-                DBClusterParameterGroupName=db_cluster_parameter_group_name,
-                Marker=marker)
-        rds_db_parameters.extend(response.get('Parameters'))
-        marker = response.get('Marker')
-        if not marker:
-            break
-
-    # Check for matching parameter settings in parameter groups
-    for rds_db_parameter in rds_db_parameters:
-        for parameter in parameters:
-            if rds_db_parameter['ParameterName'] == parameter['ParameterName']:
-                # If key 'ParameterValue' does not exist when value set is empty
-                if parameter['ParameterValue'] == "" and 'ParameterValue' not in rds_db_parameter:
-                    checked_count += 1
-                # If key 'ParameterValue' exists and value set is not empty
-                if 'ParameterValue' in parameter and 'ParameterValue' in rds_db_parameter and \
-                        rds_db_parameter['ParameterValue'] == parameter['ParameterValue']:
-                    checked_count += 1
+    checked_count = count_matching_parameters(rds_client, db_cluster_parameter_group_name, parameters,
+                                              is_cluster=True)
     if checked_count != valid_count:
         return {"status": "failed", "message": f"ClusterParameterSettings test failed with valid count={valid_count} "
                                                f"and checked_count={checked_count}"}
@@ -229,13 +219,15 @@ def validate_cluster_parameter_groups(rds_client, parameters, db_cluster, enable
     if not db_cluster["DBClusterMembers"]:
         return {"status": "success", "message": output}
 
-    # if Provisioned cluster then validate instances
-    for db_cluster_member in db_cluster["DBClusterMembers"]:
-        db_instance_id = db_cluster_member["DBInstanceIdentifier"]
-        db_cluster_instance = rds_client.describe_db_instances(DBInstanceIdentifier=db_instance_id)["DBInstances"][0]
-        logger.info(f'db_instance_identifier = {db_instance_id}, db_cluster_instance = {db_cluster_instance}')
-        response = initialize_cluster_instance_validation(rds_client, db_cluster_instance, db_engine, db_engine_version,
-                                                          db_engine_mode)
+    # if Provisioned cluster then validate instances, all members are read with one describe and validated
+    # concurrently
+    def validate_member(db_cluster_instance):
+        logger.info(f'db_instance_identifier = {db_cluster_instance["DBInstanceIdentifier"]}, '
+                    f'db_cluster_instance = {db_cluster_instance}')
+        return initialize_cluster_instance_validation(rds_client, db_cluster_instance, db_engine, db_engine_version,
+                                                      db_engine_mode)
+
+    for response in run_concurrently(validate_member, describe_cluster_members(rds_client, db_cluster)):
         if response['status'] == 'failed':
             return response
 
@@ -259,14 +251,15 @@ def initialize_cluster_instance_validation(rds_client, db_cluster_instance, db_e
     if (db_engine in rds_config.MYSQL_FAMILY) and (db_engine_version.startswith("5.")):
         logger.info('In dbEngine=mysql and db_engine_version.startswith("5.")')
         parameters = rds_config.AUDIT_LOG_PARAMS['MYSQL_CLUSTER_INSTANCE_FAMILY']
-        enable_log_types = ["audit"] if db_engine_mode == "provisioned" else [""]
+        enable_log_types = expected_log_types(rds_client, db_engine, db_engine_version, db_engine_mode, ["audit"])
         return validate_instance_parameter_groups(rds_client, parameters, db_cluster_instance, enable_log_types)
     #
     # Postgres (uses Parameter groups)
     elif db_engine in rds_config.POSTGRESQL_FAMILY:
         logger.info('In dbEngine=postgres')
         parameters = rds_config.AUDIT_LOG_PARAMS['POSTGRESQL_CLUSTER_INSTANCE_FAMILY']
-        enable_log_types = ["postgresql"] if db_engine_mode == "provisioned" else [""]
+        enable_log_types = expected_log_types(rds_client, db_engine, db_engine_version, db_engine_mode,
+                                              ["postgresql"])
         return validate_instance_parameter_groups(rds_client, parameters, db_cluster_instance, enable_log_types)
     #
     else:
@@ -291,12 +284,15 @@ def initialize_instance_validation(rds_client, sm_client, db_account_id, db_regi
     if "mysql" in db_engine:
         major, minor = map(str, db_engine_version.split('.')[0:2])
         # For 8.0 engine_versions start from 8.0.11
-        if (major == '8' and minor == "0") and (db_engine_version < '8.0.25'):
-            return {"status": "failed", "message": "Unsupported engine type detected. MySQL 8.0 version is < 8.0.25"}
+        if (major == '8' and minor == "0") and engine_capabilities.version_tuple(db_engine_version) < \
+                engine_capabilities.version_tuple(rds_config.MYSQL_MIN_AUDIT_VERSION):
+            return {"status": "failed", "message": f"Unsupported engine type detected. MySQL 8.0 version is < "
+                                                   f"{rds_config.MYSQL_MIN_AUDIT_VERSION}"}
 
         logger.info('In dbEngine=mysql')
-        options = rds_config.AUDIT_LOG_PARAMS['MYSQL_OPTIONS']
-        enable_log_types = ["audit"]
+        options = expected_options('MYSQL_OPTIONS')
+        enable_log_types = expected_log_types(rds_client, db_instance['Engine'], db_engine_version, 'provisioned',
+                                              ["audit"])
         return validate_instance_option_groups(rds_client, options, db_instance, enable_log_types)
     #
     # SQLServer (uses Option groups)
@@ -309,45 +305,89 @@ def initialize_instance_validation(rds_client, sm_client, db_account_id, db_regi
         rds_to_s3_iam_role_name = rds_config.MSSQL_IAM_ROLE_NAME + '-' + db_region
         mssql_iam_role_arn = f"arn:aws:iam::{db_account_id}:role/service-role/{rds_to_s3_iam_role_name}"
 
-        options_to_include = rds_config.AUDIT_LOG_PARAMS['SQLSERVER_OPTIONS']
-        enable_log_types = []
-        if len(options_to_include) == 1:
-            for options in (options_to_include[0]["OptionSettings"]):
-                if options['Name'] == 'S3_BUCKET_ARN' and options['Value'] == '':
-                    options['Value'] = s3_log_bucket_with_prefix_arn
-                if options['Name'] == 'IAM_ROLE_ARN' and options['Value'] == '':
-                    options['Value'] = mssql_iam_role_arn
-        else:
+        if len(rds_config.AUDIT_LOG_PARAMS['SQLSERVER_OPTIONS']) != 1:
             raise FailedAuditLogEnableError("Invalid rds_config.MSSQL_FAMILY configuration")
+        # The bucket and role differ per account and region, so they are filled in without changing rds_config
+        options = expected_options('SQLSERVER_OPTIONS', {'S3_BUCKET_ARN': s3_log_bucket_with_prefix_arn,
+                                                         'IAM_ROLE_ARN': mssql_iam_role_arn})
+        enable_log_types = []
 
-        return validate_instance_option_groups(rds_client, options_to_include, db_instance, enable_log_types)
+        return validate_instance_option_groups(rds_client, options, db_instance, enable_log_types)
 
     #
     # Postgres (uses Parameter groups)
     elif "postgres" in db_engine:
         logger.info('In dbEngine=postgres')
         parameters = rds_config.AUDIT_LOG_PARAMS['POSTGRESQL_INSTANCE_FAMILY']
-        enable_log_types = ["postgresql"]
+        enable_log_types = expected_log_types(rds_client, db_instance['Engine'], db_engine_version, 'provisioned',
+                                              ["postgresql"])
         return validate_instance_parameter_groups(rds_client, parameters, db_instance, enable_log_types)
     #
     # Oracle (uses Parameter groups)
     elif "oracle" in db_engine:
         logger.info('In dbEngine=oracle')
         parameters = rds_config.AUDIT_LOG_PARAMS['ORACLE_INSTANCE_FAMILY']
-        enable_log_types = ["audit"]
-        res = validate_instance_parameter_groups(rds_client, parameters, db_instance, enable_log_types)
-        logger.info('In validate parameter group success')
-        if res['status'] == 'failed':
-            return res
-        options = rds_config.AUDIT_LOG_PARAMS['ORACLE_OPTIONS']
-        logger.info('In validate parameter group success')
-        return validate_instance_oracle_option_groups(rds_client, options, db_instance, enable_log_types)
+        enable_log_types = expected_log_types(rds_client, db_instance['Engine'], db_engine_version, 'provisioned',
+                                              ["audit"])
+        options = expected_options('ORACLE_OPTIONS')
+        # Log exports are checked once here, so the group checks below skip them
+        log_exports = validate_log_exports(db_instance, enable_log_types)
+        if log_exports['status'] == 'failed':
+            return log_exports
+        # The parameter group and option group reads are independent, so they run side by side
+        checks = [
+            lambda: validate_instance_parameter_groups(rds_client, parameters, db_instance, None),
+            lambda: validate_instance_oracle_option_groups(rds_client, options, db_instance, None),
+        ]
+        return merge_validation_results(
+            [log_exports] + run_concurrently(lambda check: check(), checks, max_workers=len(checks)))
 
     #
     else:
         return {"status": "failed", "message": "Unsupported engine type detected"}
 
 
+def validate_log_exports(db_instance, enable_log_types):
+    """
+    Check the log types exported to CloudWatch Logs
+    @param db_instance:
+    @param enable_log_types: expected log types
+    @return: {"status", "message"} response
+    """
+    if "EnabledCloudwatchLogsExports" not in db_instance:
+        return {"status": "failed", "message": f"Validation failed: Log types={enable_log_types} not enabled"}
+    if not sorted(db_instance["EnabledCloudwatchLogsExports"]) == sorted(enable_log_types):
+        return {"status": "failed",
+                "message": f"Validation failed: Log types={enable_log_types} don't match whats enabled"}
+    return {"status": "success", "message": "EnabledCloudwatchLogsExports test: Passed."}
+
+
+def merge_validation_results(results):
+    """
+    Merge the results of independent checks of one database
+    @param results: list of {"status", "message"} responses, in check order
+    @return: the first failed response, else success with the messages of every check
+    """
+    for result in results:
+        if result['status'] == 'failed':
+            return result
+    return {"status": "success", "message": " ".join(result['message'] for result in results)}
+
+
+def count_matching_parameters(rds_client, parameter_group_name, parameters, is_cluster=False):
+    """
+    Count the expected parameters whose value matches the parameter group
+    Only the expected parameters are read: user-modified parameters first, and paging stops once all have been seen
+    @param rds_client:
+    @param parameter_group_name:
+    @param parameters: expected parameters from rds_config.AUDIT_LOG_PARAMS
+    @param is_cluster: True for a DB cluster parameter group
+    @return:
+    """
+    current_values = read_parameter_values(rds_client, parameter_group_name, parameters, is_cluster=is_cluster)
+    return sum(1 for parameter in parameters if parameter_matches(parameter, current_values))
+
+
 def validate_instance_parameter_groups(rds_client, parameters, db_instance, enable_log_types):
     output = ""
 
@@ -380,35 +420,8 @@ def validate_instance_parameter_groups(rds_client, parameters, db_instance, enab
     else:
         output += "Assigned parameter group \"not default\" test: Passed. "
 
-    checked_count = 0
     valid_count = len(parameters)
-
-    # describe_db_parameters only reads 100 at a time so use marker to read full list into rds_db_parameters
-    marker = None
-    rds_db_parameters = []
-    while True:
-        if not marker:
-            response = rds_client.describe_db_parameters(DBParameterGroupName=db_parameter_group_name)
-        else:
-            response = rds_client.describe_db_parameters(DBParameterGroupName=db_parameter_group_name,
-                                                         Marker=marker)
-        rds_db_parameters.extend(response.get('Parameters'))
-        marker = response.get('Marker')
-        if not marker:
-            break
-
-    # check for matching parameter settings in parameter groups
-    # parameters = parameters[0]['ParameterSettings']
-    for rds_db_parameter in rds_db_parameters:
-        for parameter in parameters:
-            if rds_db_parameter['ParameterName'] == parameter['ParameterName']:
-                # If key 'ParameterValue' does not exist when value set is empty
-                if parameter['ParameterValue'] == "" and 'ParameterValue' not in rds_db_parameter:
-                    checked_count += 1
-                # If key 'ParameterValue' exists and value set is not empty
-                if 'ParameterValue' in parameter and 'ParameterValue' in rds_db_parameter and \
-                        rds_db_parameter['ParameterValue'] == parameter['ParameterValue']:
-                    checked_count += 1
+    checked_count = count_matching_parameters(rds_client, db_parameter_group_name, parameters)
 
     if checked_count == valid_count:
         output += "ParameterSettings test: Passed."
@@ -419,6 +432,15 @@ def validate_instance_parameter_groups(rds_client, parameters, db_instance, enab
 
 
 def validate_instance_option_groups(rds_client, options, db_instance, enable_log_types):
+    """
+    Fn to validate instance option group settings
+    @param rds_client: describe_option_groups responses are kept for the validation run, so instances sharing an
+    option group read it once
+    @param options: compiled options returned by option_utilities.expected_options
+    @param db_instance:
+    @param enable_log_types:
+    @return:
+    """
     output = ""
     logger.info('In db_instance["OptionGroupMemberships"]')
 
@@ -450,21 +472,8 @@ def validate_instance_option_groups(rds_client, options, db_instance, enable_log
         output += "Assigned options group \"not default\" test: Passed. "
 
     # check for matching settings in options group
-    option_groups = rds_client.describe_option_groups(OptionGroupName=db_option_group_name)['OptionGroupsList'][0]
-    checked_count = 0
-    valid_count = 0
-
-    for option in options:
-        # valid_count = option['valid_count']
-        valid_count = len(option['OptionSettings'])
-        for option_group in option_groups['Options']:
-            if option_group['OptionName'] == option['OptionName']:
-                option_settings = option_group['OptionSettings']
-                for option_setting in option_settings:
-                    for incoming_option_setting in option['OptionSettings']:
-                        if option_setting['Name'] == incoming_option_setting['Name'] and \
-                                option_setting['Value'] == incoming_option_setting['Value']:
-                            checked_count += 1
+    option_group = rds_client.describe_option_groups(OptionGroupName=db_option_group_name)['OptionGroupsList'][0]
+    checked_count, valid_count = count_matching_options(options, option_group)
 
     if checked_count == valid_count:
         output += "ParameterSettings test: Passed."
@@ -475,67 +484,17 @@ def validate_instance_option_groups(rds_client, options, db_instance, enable_log
 
 
 def validate_instance_oracle_option_groups(rds_client, options, db_instance, enable_log_types):
-    output = ""
-    logger.info('In db_instance["OptionGroupMemberships"]')
-
-    db_option_group_name = db_instance["OptionGroupMemberships"][0]["OptionGroupName"]
-
-    # check for CloudwatchLogExport settings
-    if enable_log_types:
-        if "EnabledCloudwatchLogsExports" in db_instance:
-            log_exports = db_instance["EnabledCloudwatchLogsExports"]
-            if not sorted(log_exports) == sorted(enable_log_types):
-                return {"status": "failed",
-                        "message": f"Validation failed: Log types={enable_log_types} don't match whats enabled"}
-            else:
-                output += "EnabledCloudwatchLogsExports test: Passed. "
-        else:
-            return {"status": "failed", "message": f"Validation failed: Log types={enable_log_types} not enabled"}
-
     """
-    If OptionGroupName == default, newOptionGroupName either does not exist or not applied
-    If OptionGroupName == default, existing Option group exists but not applied
+    Fn to validate Oracle instance option group settings. S3_INTEGRATION has no option settings and always counts
+    as checked
+    @param rds_client:
+    @param options: compiled options returned by option_utilities.expected_options
+    @param db_instance:
+    @param enable_log_types:
+    @return:
     """
-    # check for default parameter group setting
-    if db_option_group_name.startswith("default:"):
-        logger.info('In db_option_group_name.startswith("default.")')
-        return {"status": "failed",
-                "message": f"Validation failed: Assigned options group={db_option_group_name} should not be the "
-                           f"default"}
-    else:
-        output += "Assigned options group \"not default\" test: Passed. "
-
-    # check for matching settings in options group
-    option_groups = rds_client.describe_option_groups(OptionGroupName=db_option_group_name)['OptionGroupsList'][0]
-    checked_count = 0
-    valid_count = 0
-
-    for option in options:
-        if option['OptionName'] == 'S3_INTEGRATION':  # no option settings for oracle
-            checked_count += 1
-            valid_count += 1
-            continue
-        valid_count += len(option['OptionSettings'])
-        for option_group in option_groups['Options']:
-            if option_group['OptionName'] == option['OptionName']:
-                option_settings = option_group['OptionSettings']
-                for option_setting in option_settings:
-                    for incoming_option_setting in option['OptionSettings']:
-                        if option_setting['Name'] == incoming_option_setting['Name'] and \
-                                option_setting['Value'] == incoming_option_setting['Value']:
-                            checked_count += 1
-
-    if checked_count == valid_count:
-        output += "ParameterSettings test: Passed."
-        return {"status": "success", "message": output}
-    else:
-        output += f"ParameterSettings test failed with valid count={valid_count} and checked_count={checked_count}"
-        return {"status": "failed", "message": output}
+    return validate_instance_option_groups(rds_client, options, db_instance, enable_log_types)
 
 
 def boto3_client(region, service):
-    rds_client = boto3.client(
-        region_name=region,
-        service_name=service,
-    )
-    return rds_client
+    return client_pool.get_client(None, service, region)
@@ -0,0 +1,92 @@
+"""
+Unit tests for the fleet compliance scan
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+from nose.tools import assert_equal
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+APP_DIR = os.path.normpath(os.path.join(THIS_DIR, '../app'))  # app/
+sys.path.append(APP_DIR)
+
+import fleet_scan_handler
+
+CLUSTER = {'DBClusterIdentifier': 'cluster-1', 'Status': 'available', 'Engine': 'aurora-postgresql',
+           'EngineVersion': '13.7', 'EngineMode': 'provisioned'}
+INSTANCES = [
+    {'DBInstanceIdentifier': 'cluster-1-member', 'DBClusterIdentifier': 'cluster-1', 'DBInstanceStatus': 'available',
+     'Engine': 'aurora-postgresql', 'EngineVersion': '13.7'},
+    {'DBInstanceIdentifier': 'mysql-1', 'DBInstanceStatus': 'available', 'Engine': 'mysql',
+     'EngineVersion': '8.0.28'},
+    {'DBInstanceIdentifier': 'postgres-1', 'DBInstanceStatus': 'creating', 'Engine': 'postgres',
+     'EngineVersion': '14.3'},
+]
+
+
+def paginator(pages):
+    mock_paginator = Mock()
+    mock_paginator.paginate.return_value = pages
+    return mock_paginator
+
+
+@patch('fleet_scan_handler.ClientUtilities')
+@patch.object(fleet_scan_handler.validator, 'initialize_instance_validation')
+@patch.object(fleet_scan_handler.validator, 'initialize_cluster_validation')
+class TestFleetScan(unittest.TestCase):
+
+    def setUp(self):
+        fleet_scan_handler.logger = Mock()
+
+    def test_report_covers_clusters_and_standalone_instances(self, cluster_validation, instance_validation,
+                                                             client_utilities):
+        rds_client = Mock()
+        rds_client.get_paginator.side_effect = lambda operation: {
+            'describe_db_clusters': paginator([{'DBClusters': [CLUSTER]}]),
+            'describe_db_instances': paginator([{'DBInstances': INSTANCES[:1]}, {'DBInstances': INSTANCES[1:]}]),
+        }[operation]
+        client_utilities.return_value.boto3_client.side_effect = \
+            lambda account, service, region: rds_client if service == 'rds' else Mock()
+        cluster_validation.return_value = {'status': 'success', 'message': 'cluster and instance validation passed'}
+        instance_validation.side_effect = Exception('Access denied')
+
+        report = fleet_scan_handler.scan_account_region('111111111111', 'us-east-1')
+
+        assert_equal(report['status'], 'failed')
+        assert_equal((report['total'], report['compliant'], report['non_compliant'], report['skipped']), (3, 1, 1, 1))
+        assert_equal([(result['db_identifier'], result['status']) for result in report['results']],
+                     [('cluster-1', 'success'), ('mysql-1', 'failed'), ('postgres-1', 'skipped')])
+        assert_equal(cluster_validation.call_count, 1)
+        assert_equal(instance_validation.call_args[0][4]['DBInstanceIdentifier'], 'mysql-1')
+
+    def test_unsupported_engines_are_skipped(self, cluster_validation, instance_validation, client_utilities):
+        neptune = {'DBClusterIdentifier': 'graph-1', 'Status': 'available', 'Engine': 'neptune',
+                   'EngineVersion': '1.2.0.2', 'EngineMode': 'provisioned'}
+        neptune_member = {'DBInstanceIdentifier': 'graph-1-member', 'DBClusterIdentifier': 'graph-1',
+                          'DBInstanceStatus': 'available', 'Engine': 'neptune', 'EngineVersion': '1.2.0.2'}
+        db2 = {'DBInstanceIdentifier': 'db2-1', 'DBInstanceStatus': 'available', 'Engine': 'db2-se',
+               'EngineVersion': '11.5'}
+        rds_client = Mock()
+        rds_client.get_paginator.side_effect = lambda operation: {
+            'describe_db_clusters': paginator([{'DBClusters': [neptune]}]),
+            'describe_db_instances': paginator([{'DBInstances': [neptune_member, db2]}]),
+        }[operation]
+        client_utilities.return_value.boto3_client.side_effect = \
+            lambda account, service, region: rds_client if service == 'rds' else Mock()
+
+        report = fleet_scan_handler.scan_account_region('111111111111', 'us-east-1')
+
+        assert_equal(report['status'], 'success')
+        assert_equal((report['total'], report['compliant'], report['non_compliant'], report['skipped']), (2, 0, 0, 2))
+        assert_equal([(result['db_identifier'], result['status']) for result in report['results']],
+                     [('graph-1', 'skipped'), ('db2-1', 'skipped')])
+        cluster_validation.assert_not_called()
+        instance_validation.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Unit tests for option group validation
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from nose.tools import assert_equal
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+APP_DIR = os.path.normpath(os.path.join(THIS_DIR, '../app'))  # app/
+sys.path.append(APP_DIR)
+
+import validate_audit_log_settings_handler
+from util import rds_config
+from util.option_utilities import expected_options, count_matching_options, with_option_settings
+from util.validation_checkpoint import ValidationCheckpoint
+
+MYSQL_OPTION_GROUP = {'OptionGroupName': 'mysql-8-0-audit', 'Options': [
+    {'OptionName': 'MARIADB_AUDIT_PLUGIN', 'OptionSettings': [
+        {'Name': 'SERVER_AUDIT_EVENTS', 'Value': 'CONNECT,QUERY_DDL,QUERY_DML,QUERY_DCL'},
+        {'Name': 'SERVER_AUDIT_FILE_ROTATIONS', 'Value': '9'}]}]}
+
+
+def db_instance(identifier, option_group_name):
+    return {'DBInstanceIdentifier': identifier, 'EnabledCloudwatchLogsExports': ['audit'],
+            'OptionGroupMemberships': [{'OptionGroupName': option_group_name, 'Status': 'in-sync'}]}
+
+
+class TestOptionValidation(unittest.TestCase):
+
+    def setUp(self):
+        validate_audit_log_settings_handler.logger = Mock()
+
+    def test_oracle_options_without_settings_count_once(self):
+        oracle_option_group = {'Options': [
+            {'OptionName': 'SQLT', 'OptionSettings': [{'Name': 'LICENSE_PACK', 'Value': 'T'}]},
+            {'OptionName': 'NATIVE_NETWORK_ENCRYPTION', 'OptionSettings': [
+                {'Name': 'SQLNET.ENCRYPTION_SERVER', 'Value': 'REQUIRED'},
+                {'Name': 'SQLNET.ENCRYPTION_CLIENT', 'Value': 'REJECTED'}]}]}
+        assert_equal(count_matching_options(expected_options('ORACLE_OPTIONS'), oracle_option_group), (3, 10))
+
+    def test_sqlserver_settings_filled_without_changing_config(self):
+        options = expected_options('SQLSERVER_OPTIONS', {'S3_BUCKET_ARN': 'arn:aws:s3:::bucket',
+                                                         'IAM_ROLE_ARN': 'arn:aws:iam::111111111111:role/r'})
+        assert_equal(options['SQLSERVER_AUDIT'], {'S3_BUCKET_ARN': 'arn:aws:s3:::bucket',
+                                                  'IAM_ROLE_ARN': 'arn:aws:iam::111111111111:role/r',
+                                                  'ENABLE_COMPRESSION': 'true'})
+        filled = with_option_settings(rds_config.AUDIT_LOG_PARAMS['SQLSERVER_OPTIONS'], {'S3_BUCKET_ARN': 'x'})
+        assert_equal(filled[0]['OptionSettings'][0]['Value'], 'x')
+        assert_equal(rds_config.AUDIT_LOG_PARAMS['SQLSERVER_OPTIONS'][0]['OptionSettings'][0]['Value'], '')
+
+    def test_shared_option_group_read_once_per_run(self):
+        client = Mock()
+        client.describe_option_groups.return_value = {'OptionGroupsList': [MYSQL_OPTION_GROUP]}
+        rds_client = ValidationCheckpoint(client)
+        for identifier in ('mysql-1', 'mysql-2'):
+            response = validate_audit_log_settings_handler.validate_instance_option_groups(
+                rds_client, expected_options('MYSQL_OPTIONS'), db_instance(identifier, 'mysql-8-0-audit'), ['audit'])
+            assert_equal(response['status'], 'success')
+        client.describe_option_groups.assert_called_once_with(OptionGroupName='mysql-8-0-audit')
+
+
+    def test_oracle_checks_run_concurrently_and_merge(self):
+        both_started = threading.Barrier(2, timeout=5)
+
+        def check(message):
+            def run(*_):
+                both_started.wait()
+                return {'status': 'success', 'message': message}
+            return run
+
+        instance = {'Engine': 'oracle-ee', 'EnabledCloudwatchLogsExports': ['audit']}
+        with patch.object(validate_audit_log_settings_handler, 'validate_instance_parameter_groups',
+                          side_effect=check('ParameterSettings test: Passed.')) as parameter_check, \
+                patch.object(validate_audit_log_settings_handler, 'validate_instance_oracle_option_groups',
+                             side_effect=check('OptionSettings test: Passed.')) as option_check, \
+                patch.object(validate_audit_log_settings_handler, 'expected_log_types', return_value=['audit']):
+            response = validate_audit_log_settings_handler.initialize_instance_validation(
+                Mock(), Mock(), '111111111111', 'us-east-1', instance, 'oracle-ee', '19.0.0.0')
+        assert_equal(response, {'status': 'success',
+                                'message': 'EnabledCloudwatchLogsExports test: Passed. '
+                                           'ParameterSettings test: Passed. OptionSettings test: Passed.'})
+        # Log exports are checked once, not by each group check
+        assert_equal(parameter_check.call_args[0][3], None)
+        assert_equal(option_check.call_args[0][3], None)
+
+    def test_oracle_log_exports_checked_once_in_message(self):
+        client = Mock()
+        client.describe_db_parameters.return_value = {'Parameters': [
+            dict(parameter, Source='user') for parameter in rds_config.AUDIT_LOG_PARAMS['ORACLE_INSTANCE_FAMILY']]}
+        client.describe_option_groups.return_value = {'OptionGroupsList': [{'Options': [
+            {'OptionName': name, 'OptionSettings': [{'Name': setting, 'Value': value}
+                                                    for setting, value in settings.items()]}
+            for name, settings in expected_options('ORACLE_OPTIONS').items()]}]}
+        instance = {'Engine': 'oracle-ee', 'EnabledCloudwatchLogsExports': ['audit'],
+                    'DBParameterGroups': [{'DBParameterGroupName': 'oracle-audit'}],
+                    'OptionGroupMemberships': [{'OptionGroupName': 'oracle-audit-options'}]}
+        with patch.object(validate_audit_log_settings_handler, 'expected_log_types', return_value=['audit']):
+            response = validate_audit_log_settings_handler.initialize_instance_validation(
+                client, Mock(), '111111111111', 'us-east-1', instance, 'oracle-ee', '19.0.0.0')
+        assert_equal(response, {'status': 'success', 'message':
+                                'EnabledCloudwatchLogsExports test: Passed. '
+                                'Assigned parameter group "not default" test: Passed. ParameterSettings test: Passed. '
+                                'Assigned options group "not default" test: Passed. ParameterSettings test: Passed.'})
+
+    def test_first_failed_check_is_returned(self):
+        results = [{'status': 'success', 'message': 'a'}, {'status': 'failed', 'message': 'b'},
+                   {'status': 'failed', 'message': 'c'}]
+        assert_equal(validate_audit_log_settings_handler.merge_validation_results(results),
+                     {'status': 'failed', 'message': 'b'})
+
+
+if __name__ == '__main__':
+    unittest.main()
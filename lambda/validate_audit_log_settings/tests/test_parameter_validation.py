@@ -0,0 +1,106 @@
+"""
+Unit tests for parameter group validation
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import os
+import sys
+import unittest
+from unittest.mock import Mock
+
+from botocore.exceptions import ClientError
+
+from nose.tools import assert_equal
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+APP_DIR = os.path.normpath(os.path.join(THIS_DIR, '../app'))  # app/
+sys.path.append(APP_DIR)
+
+import validate_audit_log_settings_handler
+from util import parameter_utilities
+
+PARAMETERS = [{'ParameterName': 'server_audit_logging', 'ParameterValue': '1', 'ApplyMethod': 'immediate'},
+              {'ParameterName': 'server_audit_events', 'ParameterValue': 'CONNECT,QUERY', 'ApplyMethod': 'immediate'},
+              {'ParameterName': 'server_audit_excl_users', 'ParameterValue': '', 'ApplyMethod': 'immediate'}]
+
+
+
+
+def instance_rds_client(engine_defaults):
+    rds_client = Mock()
+    rds_client.meta.region_name = 'us-east-1'
+    rds_client.describe_db_parameter_groups.return_value = {'DBParameterGroups': [
+        {'DBParameterGroupName': 'mydb-aurora-mysql-5-7', 'DBParameterGroupFamily': 'aurora-mysql5.7'}]}
+    rds_client.describe_engine_default_parameters.return_value = {'EngineDefaults': {'Parameters': engine_defaults}}
+    return rds_client
+
+
+class TestParameterValidation(unittest.TestCase):
+
+    def setUp(self):
+        parameter_utilities.clear_engine_defaults()
+
+    def test_user_modified_parameters_read_only(self):
+        rds_client = Mock()
+        rds_client.describe_db_cluster_parameters.return_value = {'Parameters': [
+            {'ParameterName': 'server_audit_logging', 'ParameterValue': '1'},
+            {'ParameterName': 'server_audit_events', 'ParameterValue': 'CONNECT,QUERY'},
+            {'ParameterName': 'server_audit_excl_users', 'ParameterValue': ''},
+        ], 'Marker': 'next'}
+        checked_count = validate_audit_log_settings_handler.count_matching_parameters(
+            rds_client, 'cluster-aurora-mysql-5-7', PARAMETERS, is_cluster=True)
+        assert_equal(checked_count, 3)
+        rds_client.describe_db_cluster_parameters.assert_called_once_with(
+            DBClusterParameterGroupName='cluster-aurora-mysql-5-7', Source='user')
+
+    def test_unset_parameters_read_from_full_list(self):
+        rds_client = instance_rds_client([{'ParameterName': 'server_audit_excl_users'}])
+        rds_client.describe_db_parameters.side_effect = [
+            {'Parameters': [{'ParameterName': 'server_audit_logging', 'ParameterValue': '1'}]},
+            {'Parameters': [{'ParameterName': 'autocommit', 'ParameterValue': '1'}], 'Marker': 'next'},
+            {'Parameters': [{'ParameterName': 'server_audit_events', 'ParameterValue': 'CONNECT'}], 'Marker': 'last'},
+        ]
+        checked_count = validate_audit_log_settings_handler.count_matching_parameters(
+            rds_client, 'mydb-aurora-mysql-5-7', PARAMETERS)
+        assert_equal(checked_count, 2)
+        assert_equal(rds_client.describe_db_parameters.call_count, 3)
+
+    def test_expected_empty_parameter_read_from_engine_defaults(self):
+        rds_client = instance_rds_client([{'ParameterName': 'autocommit', 'ParameterValue': '1'},
+                                          {'ParameterName': 'server_audit_excl_users'}])
+        rds_client.describe_db_parameters.return_value = {'Parameters': [
+            {'ParameterName': 'server_audit_logging', 'ParameterValue': '1'},
+            {'ParameterName': 'server_audit_events', 'ParameterValue': 'CONNECT,QUERY'}]}
+        for _ in range(2):
+            checked_count = validate_audit_log_settings_handler.count_matching_parameters(
+                rds_client, 'mydb-aurora-mysql-5-7', PARAMETERS)
+            assert_equal(checked_count, 3)
+        assert_equal(rds_client.describe_db_parameters.call_count, 2)
+        rds_client.describe_db_parameters.assert_called_with(DBParameterGroupName='mydb-aurora-mysql-5-7',
+                                                             Source='user')
+        # Engine defaults are read once per family
+        rds_client.describe_engine_default_parameters.assert_called_once_with(DBParameterGroupFamily='aurora-mysql5.7')
+
+    def test_non_empty_engine_default_does_not_match(self):
+        rds_client = instance_rds_client([{'ParameterName': 'server_audit_excl_users', 'ParameterValue': 'rdsadmin'}])
+        rds_client.describe_db_parameters.return_value = {'Parameters': [
+            {'ParameterName': 'server_audit_logging', 'ParameterValue': '1'},
+            {'ParameterName': 'server_audit_events', 'ParameterValue': 'CONNECT,QUERY'}]}
+        checked_count = validate_audit_log_settings_handler.count_matching_parameters(
+            rds_client, 'mydb-aurora-mysql-5-7', PARAMETERS)
+        assert_equal(checked_count, 2)
+        assert_equal(rds_client.describe_db_parameters.call_count, 1)
+
+    def test_full_list_used_when_engine_defaults_unreadable(self):
+        rds_client = instance_rds_client([])
+        rds_client.describe_engine_default_parameters.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDenied', 'Message': 'denied'}}, 'DescribeEngineDefaultParameters')
+        rds_client.describe_db_parameters.side_effect = [
+            {'Parameters': [{'ParameterName': 'server_audit_logging', 'ParameterValue': '1'},
+                            {'ParameterName': 'server_audit_events', 'ParameterValue': 'CONNECT,QUERY'}]},
+            {'Parameters': [{'ParameterName': 'server_audit_excl_users', 'ParameterValue': 'rdsadmin'}]},
+        ]
+        checked_count = validate_audit_log_settings_handler.count_matching_parameters(
+            rds_client, 'mydb-aurora-mysql-5-7', PARAMETERS)
+        assert_equal(checked_count, 2)
+        assert_equal(rds_client.describe_db_parameters.call_count, 2)
@@ -0,0 +1,75 @@
+"""
+Unit tests for the status-driven wait before validation
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import os
+import sys
+import unittest
+
+from nose.tools import assert_equal, assert_true, assert_false
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+import sync_status
+
+
+def db_instance(**overrides):
+    instance = {
+        'DBInstanceIdentifier': 'db-1',
+        'DBInstanceStatus': 'available',
+        'PendingModifiedValues': {},
+        'DBParameterGroups': [{'DBParameterGroupName': 'audit-pg', 'ParameterApplyStatus': 'in-sync'}],
+        'OptionGroupMemberships': [{'OptionGroupName': 'audit-og', 'Status': 'in-sync'}],
+    }
+    instance.update(overrides)
+    return instance
+
+
+class TestSyncStatus(unittest.TestCase):
+
+    def test_instance_in_sync(self):
+        assert_true(sync_status.instance_sync_status(db_instance())[0])
+        pending_reboot = [{'DBParameterGroupName': 'audit-pg', 'ParameterApplyStatus': 'pending-reboot'}]
+        assert_true(sync_status.instance_sync_status(db_instance(DBParameterGroups=pending_reboot))[0])
+
+    def test_instance_not_in_sync(self):
+        assert_false(sync_status.instance_sync_status(db_instance(DBInstanceStatus='modifying'))[0])
+        assert_false(sync_status.instance_sync_status(
+            db_instance(PendingModifiedValues={'PendingCloudwatchLogsExports': {}}))[0])
+        applying = [{'DBParameterGroupName': 'audit-pg', 'ParameterApplyStatus': 'applying'}]
+        assert_equal(sync_status.instance_sync_status(db_instance(DBParameterGroups=applying)),
+                     (False, 'audit-pg ParameterApplyStatus=applying'))
+
+    def test_cluster_checks_members(self):
+        db_cluster = {'Status': 'available', 'DBClusterMembers': [
+            {'DBInstanceIdentifier': 'db-1', 'DBClusterParameterGroupStatus': 'in-sync'}]}
+        assert_true(sync_status.cluster_sync_status(db_cluster, [db_instance()])[0])
+        assert_equal(sync_status.cluster_sync_status(db_cluster, [db_instance(DBInstanceStatus='rebooting')]),
+                     (False, 'db-1 DBInstanceStatus=rebooting'))
+        db_cluster['DBClusterMembers'][0]['DBClusterParameterGroupStatus'] = 'applying'
+        assert_false(sync_status.cluster_sync_status(db_cluster)[0])
+
+    def test_poll_interval_grows_until_timeout(self):
+        poll_state = sync_status.initial_poll_state()
+        intervals = []
+        while not poll_state['timed_out']:
+            intervals.append(poll_state['next_poll_seconds'])
+            poll_state = sync_status.next_poll_state(poll_state, False, 'modifying')
+        assert_equal(intervals[0], sync_status.SYNC_POLL_INITIAL_SECONDS)
+        assert_equal(intervals, sorted(intervals))
+        assert_equal(max(intervals), sync_status.SYNC_POLL_MAX_SECONDS)
+        assert_true(poll_state['elapsed_seconds'] >= sync_status.SYNC_POLL_TIMEOUT_SECONDS)
+        assert_equal(poll_state['poll_count'], len(intervals))
+
+    def test_in_sync_is_not_timed_out(self):
+        poll_state = dict(sync_status.initial_poll_state(), elapsed_seconds=sync_status.SYNC_POLL_TIMEOUT_SECONDS)
+        poll_state = sync_status.next_poll_state(poll_state, True, 'in sync')
+        assert_true(poll_state['in_sync'])
+        assert_false(poll_state['timed_out'])
+
+
+if __name__ == '__main__':
+    unittest.main()
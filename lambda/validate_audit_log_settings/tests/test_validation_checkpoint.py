@@ -0,0 +1,73 @@
+"""
+Unit tests for per-call retries and memoized describe results
+"""
+# pylint: disable=missing-class-docstring, wrong-import-position, import-error, no-self-use, missing-function-docstring
+
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+from botocore.exceptions import ClientError
+from nose.tools import assert_equal
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # tests/
+UTIL_DIR = os.path.normpath(os.path.join(THIS_DIR, '../../util'))  # util/
+sys.path.append(UTIL_DIR)
+
+import retry_policy
+from exceptions import ResourceNotInStateError
+from validation_checkpoint import ValidationCheckpoint
+
+NO_DELAY_SETTINGS = {retry_policy.THROTTLING: (3, 0, 0), retry_policy.WAIT_FOR_STATE: (3, 0, 0)}
+
+
+def throttled():
+    return ClientError({'Error': {'Code': 'Throttling', 'Message': 'Rate exceeded'}}, 'DescribeDBInstances')
+
+
+@patch.dict(retry_policy.RETRY_SETTINGS, NO_DELAY_SETTINGS)
+class TestValidationCheckpoint(unittest.TestCase):
+
+    def test_only_failed_call_is_retried(self):
+        rds_client = Mock()
+        rds_client.describe_db_instances.return_value = {'DBInstances': [{'DBInstanceIdentifier': 'mydb'}]}
+        rds_client.describe_option_groups.side_effect = [throttled(), {'OptionGroupsList': []}]
+        checkpoint = ValidationCheckpoint(rds_client)
+
+        checkpoint.describe_db_instances(DBInstanceIdentifier='mydb')
+        assert_equal(checkpoint.describe_option_groups(OptionGroupName='audit-log-mysql-8-0'),
+                     {'OptionGroupsList': []})
+        checkpoint.describe_db_instances(DBInstanceIdentifier='mydb')
+
+        assert_equal(rds_client.describe_db_instances.call_count, 1)
+        assert_equal(rds_client.describe_option_groups.call_count, 2)
+
+    def test_non_describe_calls_passed_through(self):
+        rds_client = Mock()
+        checkpoint = ValidationCheckpoint(rds_client)
+        checkpoint.get_paginator('describe_db_instances')
+        rds_client.get_paginator.assert_called_once_with('describe_db_instances')
+
+    def test_wait_for_reads_until_available(self):
+        rds_client = Mock()
+        rds_client.describe_db_instances.side_effect = [
+            {'DBInstances': [{'DBInstanceStatus': 'modifying'}]},
+            {'DBInstances': [{'DBInstanceStatus': 'available'}]},
+        ]
+        checkpoint = ValidationCheckpoint(rds_client)
+        response = checkpoint.wait_for('describe_db_instances',
+                                       lambda response: response['DBInstances'][0]['DBInstanceStatus'], 'available',
+                                       DBInstanceIdentifier='mydb')
+        assert_equal(response['DBInstances'][0]['DBInstanceStatus'], 'available')
+        assert_equal(checkpoint.describe_db_instances(DBInstanceIdentifier='mydb'), response)
+        assert_equal(rds_client.describe_db_instances.call_count, 2)
+
+    def test_wait_for_gives_up(self):
+        rds_client = Mock()
+        rds_client.describe_db_clusters.return_value = {'DBClusters': [{'Status': 'backing-up'}]}
+        checkpoint = ValidationCheckpoint(rds_client)
+        with self.assertRaises(ResourceNotInStateError):
+            checkpoint.wait_for('describe_db_clusters', lambda response: response['DBClusters'][0]['Status'],
+                                'available', DBClusterIdentifier='orders')
+        assert_equal(rds_client.describe_db_clusters.call_count, 3)
@@ -0,0 +1,148 @@
+"""
+Builds the per-function Lambda images and benchmarks image size, handler import time and handler init time.
+Exits non-zero when a function exceeds its budget in image_budgets.json so size and cold start regressions show up.
+Images are built with the buildArgs of serverless.yml provider.ecr.images, so the measured images are the deployed ones.
+Requires PyYAML.
+
+Usage: python scripts/benchmark_images.py [--skip-build] [--runs 5] [--function EnableAuditServiceFunc]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # scripts/
+ROOT_DIR = os.path.normpath(os.path.join(THIS_DIR, '..'))  # repository root
+BUDGETS_FILE = os.path.join(THIS_DIR, 'image_budgets.json')
+SERVERLESS_FILE = os.path.join(ROOT_DIR, 'serverless.yml')
+
+# function: (image, handler)
+FUNCTIONS = {
+    'EnableAuditServiceFunc': ('enableauditimage', 'lambda.enable_audit_service.app.enable_audit_handler.handler'),
+    'EnableAuditServiceFuncOracle': ('enableauditoracleimage',
+                                     'lambda.enable_audit_service.app.enable_audit_handler_oracle.handler'),
+    'ValidateAuditLogSettingsFunc': (
+        'validateauditimage', 'lambda.validate_audit_log_settings.app.validate_audit_log_settings_handler.handler'),
+    'event_bridge_lambda': ('eventbridgeimage', 'lambda.event_bridge.app.event_bridge_lambda.handler'),
+}
+
+# Runs inside the image. Import time is measured in-process; init time is a fresh interpreter resolving the handler,
+# less the cost of starting an empty interpreter
+MEASURE_SCRIPT = '''
+import importlib, json, subprocess, sys, time
+module_name, handler_name = sys.argv[1].rsplit(".", 1)
+start = time.perf_counter()
+module = importlib.import_module(module_name)
+import_ms = (time.perf_counter() - start) * 1000
+getattr(module, handler_name)
+
+def timed(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return (time.perf_counter() - start) * 1000
+
+init_code = "import importlib; getattr(importlib.import_module(%r), %r)" % (module_name, handler_name)
+init_ms = timed(init_code) - timed("pass")
+print(json.dumps({"import_ms": import_ms, "init_ms": init_ms}))
+'''
+
+
+def run(cmd, **kwargs):
+    """
+    Run command and return stdout
+    @param cmd:
+    @return:
+    """
+    return subprocess.run(cmd, check=True, capture_output=True, text=True, **kwargs).stdout.strip()
+
+
+def load_build_args():
+    """
+    Read the build args of each image from serverless.yml provider.ecr.images
+    @return: dict of image: dict of build arg: value
+    """
+    import yaml  # only needed to build images
+
+    class ServerlessLoader(yaml.SafeLoader):  # pylint: disable=too-many-ancestors
+        pass
+
+    # CloudFormation tags such as !Ref are not needed here
+    ServerlessLoader.add_multi_constructor('!', lambda loader, suffix, node: None)
+    with open(SERVERLESS_FILE) as serverless_file:
+        serverless = yaml.load(serverless_file, Loader=ServerlessLoader)  # nosec - SafeLoader subclass
+    return {image: spec.get('buildArgs') or {} for image, spec in serverless['provider']['ecr']['images'].items()}
+
+
+def build_image(image, build_args):
+    """
+    Build function image with the build args serverless.yml deploys it with
+    @param image:
+    @param build_args: dict of build arg: value, e.g. REQUIREMENTS and PRECOMPILE_SQL
+    @return: image tag
+    """
+    tag = f'{image}:benchmark'
+    cmd = ['docker', 'build', '--platform', 'linux/amd64']
+    for name, value in build_args.items():
+        cmd += ['--build-arg', f'{name}={value}']
+    run(cmd + ['-t', tag, '.'], cwd=ROOT_DIR)
+    return tag
+
+
+def benchmark_image(tag, handler, runs):
+    """
+    Measure image size and median import/init time over a number of cold container starts
+    @param tag:
+    @param handler:
+    @param runs:
+    @return: dict with size_mb, import_ms and init_ms
+    """
+    size_mb = int(run(['docker', 'image', 'inspect', '-f', '{{.Size}}', tag])) / (1024 * 1024)
+    samples = []
+    for _ in range(runs):
+        output = run(['docker', 'run', '--rm', '--platform', 'linux/amd64', '--entrypoint', 'python3', tag, '-c',
+                      MEASURE_SCRIPT, handler])
+        samples.append(json.loads(output.splitlines()[-1]))
+    return {
+        'size_mb': round(size_mb, 1),
+        'import_ms': round(statistics.median(sample['import_ms'] for sample in samples), 1),
+        'init_ms': round(statistics.median(sample['init_ms'] for sample in samples), 1),
+    }
+
+
+def over_budget(result, budget):
+    """
+    Return the metrics that exceed the function budget
+    @param result:
+    @param budget:
+    @return: list of metric names
+    """
+    return [metric for metric, limit in budget.items() if result.get(metric, 0) > limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-function Lambda images')
+    parser.add_argument('--function', action='append', choices=list(FUNCTIONS), help='function(s) to benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='cold container starts per image')
+    parser.add_argument('--skip-build', action='store_true', help='reuse previously built benchmark images')
+    args = parser.parse_args()
+
+    with open(BUDGETS_FILE) as budgets_file:
+        budgets = json.load(budgets_file)
+
+    build_args = {} if args.skip_build else load_build_args()
+    failed = False
+    for function in args.function or FUNCTIONS:
+        image, handler = FUNCTIONS[function]
+        tag = f'{image}:benchmark' if args.skip_build else build_image(image, build_args[image])
+        result = benchmark_image(tag, handler, args.runs)
+        exceeded = over_budget(result, budgets.get(function, {}))
+        failed = failed or bool(exceeded)
+        print(json.dumps({'function': function, 'image': tag, **result, 'over_budget': exceeded}))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Sweeps audit log compliance across accounts and regions and prints one JSON line per account and region as it finishes.
+In enable mode, every database that fails validation is sent to the enablement API, as the EventBridge lambda does
+for new databases.
+
+Usage: python scripts/fleet_sweep.py --accounts 111111111111 222222222222 --regions us-east-1 us-west-2
+       [--mode enable --api-url http://<alb-host>/v1/rdsauditlog] [--max-workers 32] [--account-concurrency 4]
+"""
+import argparse
+import json
+import os
+import sys
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))  # scripts/
+ROOT_DIR = os.path.normpath(os.path.join(THIS_DIR, '..'))  # repository root
+LAMBDA_DIR = os.path.join(ROOT_DIR, 'lambda')  # lambda/
+VALIDATE_APP_DIR = os.path.join(LAMBDA_DIR, 'validate_audit_log_settings', 'app')
+sys.path.append(LAMBDA_DIR)
+sys.path.append(VALIDATE_APP_DIR)
+
+from util.auth_utilities import Logger
+from util.client_utilities import ClientUtilities
+from util.sweep_orchestrator import sweep
+import fleet_scan_handler
+
+
+def enable_non_compliant(api_url, account_id, region, report):
+    """
+    Send databases that failed validation to the enablement API
+    @param api_url:
+    @param account_id:
+    @param region:
+    @param report: compliance report of the account and region
+    @return: list of enablement responses
+    """
+    import requests  # only needed in enable mode
+
+    responses = []
+    for result in report['results']:
+        if result['status'] != 'failed':
+            continue
+        body = json.dumps(dict(account_id=account_id, region=region, instance_or_cluster=result['db_type'],
+                               db_identifier=result['db_identifier']))
+        response = requests.post(api_url, data=body, headers={'authorization': 'Bearer ',
+                                                               'Content-Type': 'application/json'}, timeout=900)
+        responses.append({'db_identifier': result['db_identifier'], 'status_code': response.status_code})
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', nargs='+', required=True)
+    parser.add_argument('--regions', nargs='+', required=True)
+    parser.add_argument('--mode', choices=['validate', 'enable'], default='validate')
+    parser.add_argument('--api-url', help='enablement API url, required in enable mode')
+    parser.add_argument('--max-workers', type=int)
+    parser.add_argument('--account-concurrency', type=int)
+    args = parser.parse_args()
+    if args.mode == 'enable' and not args.api_url:
+        parser.error('--api-url is required in enable mode')
+
+    # The scan functions log through their module loggers, which the Lambda handlers normally set
+    logger = Logger()
+    fleet_scan_handler.logger = fleet_scan_handler.validator.logger = logger
+
+    def task(account_id, region):
+        report = fleet_scan_handler.scan_account_region(account_id, region)
+        if args.mode == 'enable':
+            report['enablement'] = enable_non_compliant(args.api_url, account_id, region, report)
+        return report
+
+    failed = 0
+    for result in sweep(args.accounts, args.regions, task, max_workers=args.max_workers,
+                        account_concurrency=args.account_concurrency, client_utilities=ClientUtilities(logger),
+                        logger=logger):
+        if result['status'] != 'success' or result['result']['status'] != 'success':
+            failed += 1
+        print(json.dumps(result, default=str), flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())